@@ -1,4 +1,8 @@
 from django.contrib import admin
-from .models import ChatRoom
+from .models import LIVE_STATE_FIELDS, ChatRoom
 
-admin.site.register(ChatRoom)
+
+@admin.register(ChatRoom)
+class ChatRoomAdmin(admin.ModelAdmin):
+    # 참가자/모집·정산 여부는 Redis 방 상태가 원본이므로 관리 화면에서는 읽기만 함
+    readonly_fields = LIVE_STATE_FIELDS
@@ -1,35 +1,76 @@
 from channels.generic.websocket import AsyncWebsocketConsumer
 from asgiref.sync import sync_to_async
-import aioredis
-from signup.models import UserInfo
+from signup.profiles import aget_user_profile
+from .message_queue import STREAM_REDIS_URL, WRITE_BEHIND, enqueue_message
 from .models import ChatRoom, ChatMessage
+from .participants import CLOSED
+from .presence import PresenceHeartbeat, RoomPresence
+from .redis_pool import get_async_redis
+from .response_cache import invalidate_room
+from .room_state import REASSIGN_OPEN, AsyncRoomStateStore
 import json
 import logging
 from datetime import datetime, timezone
 
 logger = logging.getLogger(__name__)
 
-# Initialize Redis for WebSocket connections
-redis = aioredis.from_url('redis://127.0.0.1:6379')
-
-class ChatConsumer(AsyncWebsocketConsumer):
+# 프로세스 공용 Redis 연결 풀 (연결 수 상한, 헬스 체크)
+redis = get_async_redis()
+# 참가자/방장/모집·정산 여부는 Redis 방 상태에서 읽고 쓰고, DB 에는 알림을 보낸 뒤 반영
+live_rooms = AsyncRoomStateStore(redis)
+room_presence = RoomPresence(redis)
+# write-behind 메시지는 flush_chat_messages 가 읽는 CHAT_MESSAGE_REDIS_URL 의 스트림에 넣음
+message_stream = get_async_redis(STREAM_REDIS_URL)
+
+
+def participant_list(participants):
+    return [
+        {
+            'user_id': participant['user_id'],
+            'user_name': participant['user_name'],
+            'leader': participant['leader'],
+        }
+        for participant in participants
+    ]
+
+
+async def leave_room(channel_layer, room_id, user_id):
+    """Remove a user whose last connection closed (or expired) and tell the room, leader hand-over included."""
+    group = f'chat_{room_id}'
+    user = await aget_user_profile(user_id)
+    # 모집 완료 전에만 방장 재지정
+    result = await live_rooms.leave(room_id, user_id, reassign=REASSIGN_OPEN)
+    participants = participant_list(result.participants)
+
+    await channel_layer.group_send(group, {
+        'type': 'participants_update',
+        'message': f"{user.name}님이 방을 나갔습니다." if user else None,
+        'participants': participants,
+        'is_system_message': bool(user),
+    })
+    if result.new_leader:
+        await channel_layer.group_send(group, {
+            'type': 'participants_update',
+            'message': f"{result.new_leader}님이 새로운 방장이 되었습니다.",
+            'participants': participants,
+            'is_system_message': True,
+        })
+    await live_rooms.flush(room_id, result)
+
+
+class ChatConsumer(PresenceHeartbeat, AsyncWebsocketConsumer):
     async def connect(self):
         self.room_id = self.scope['url_route']['kwargs']['room_id']
         self.room_group_name = f'chat_{self.room_id}'
         self.user_id = self.scope['query_string'].decode().split('=')[1]
-        
-        # Check if user is reconnecting
-        reconnecting = await self.is_user_reconnecting()
 
         # Authenticate user before connecting
         if not await self.is_user_authenticated():
             await self.close()
             return
 
-        # Check if the chat room exists
-        try:
-            self.chat_room = await sync_to_async(ChatRoom.objects.get)(room_id=self.room_id)
-        except ChatRoom.DoesNotExist:
+        # Check if the chat room exists (loaded from the database only on the first access)
+        if await live_rooms.get(self.room_id) is None:
             await self.close(code=404)
             return
 
@@ -37,105 +78,74 @@ class ChatConsumer(AsyncWebsocketConsumer):
         await self.channel_layer.group_add(self.room_group_name, self.channel_name)
         await self.accept()
 
-        # Clear existing Redis entries for the user to prevent duplication
-        await self.clear_existing_participant()
+        # Add the user; the first participant becomes the leader
+        user = await self.get_user_info(self.user_id)
+        result = await self.add_user_to_participants(user)
+        if not result.ok:
+            await self.close()
+            return
 
-        # Set the first user to join the room as the leader if not reconnecting
-        is_first_participant = len(self.chat_room.participants) == 0 and not reconnecting
-        await self.add_user_to_participants(as_leader=is_first_participant)
+        # Mark this connection present; if another live connection of the user exists it's a reconnect
+        presence = await room_presence.connect(self.room_group_name, self.user_id, self.channel_name)
+        self.start_presence_heartbeat(room_presence, self.room_group_name)
+        logger.info("User %s connected to room %s (%d online)", self.user_id, self.room_id, presence.count)
 
         # Notify all participants if it's a new connection, not a reconnection
-        if not reconnecting:
-            user = await self.get_user_info(self.user_id)
-            if user:
-                await self.send_participants_update(
-                    f"{user.name}님이 방에 참여하였습니다.",
-                    is_system_message=True
-                )
-        
-        # Mark the user as connected in Redis
-        await redis.sadd(self.room_group_name, self.user_id)
+        if presence.changed:
+            await self.send_participants_update(
+                f"{user.name}님이 방에 참여하였습니다.",
+                is_system_message=True,
+                participants=result.participants,
+            )
+        await live_rooms.flush(self.room_id, result)
 
     async def disconnect(self, close_code):
-        # Only handle disconnect if the user was not just temporarily away
-        if await self.is_user_in_room():
-            user = await self.get_user_info(self.user_id)
-            is_leader = any(p['leader'] for p in self.chat_room.participants if p['user_id'] == self.user_id)
-
-            # Notify all participants that the user is leaving
-            if user:
-                await self.send_participants_update(
-                    f"{user.name}님이 방을 나갔습니다.",
-                    is_system_message=True
-                )
-            
-            # Update Redis and participants in the database
-            await self.update_participants(add=False)
-            await self.remove_user_from_participants()
-
-            # Only reassign leader if recruitment is not complete
-            if not self.chat_room.recruitment_complete and is_leader:
-                new_leader_name = await self.handle_leader_reassignment()
-                if new_leader_name:
-                    await self.send_participants_update(
-                        f"{new_leader_name}님이 새로운 방장이 되었습니다.",
-                        is_system_message=True
-                    )
+        self.stop_presence_heartbeat()
+        # Only the user's last connection leaves the room (expired ones are handled by sweep_chat_presence)
+        presence = await room_presence.disconnect(self.room_group_name, self.user_id, self.channel_name)
+        if presence.changed:
+            await leave_room(self.channel_layer, self.room_id, self.user_id)
 
         await self.channel_layer.group_discard(self.room_group_name, self.channel_name)
 
-    async def is_user_reconnecting(self):
-        """Check if the user was already connected recently to avoid duplicate join messages."""
-        return await redis.sismember(self.room_group_name, self.user_id)
-
-    async def clear_existing_participant(self):
-        await redis.srem(self.room_group_name, self.user_id)
-
-    async def update_participants(self, add):
-        if add:
-            await redis.sadd(self.room_group_name, self.user_id)
-        else:
-            await redis.srem(self.room_group_name, self.user_id)
-        await self.send_participants_update(None, is_system_message=False)
-
-    async def add_user_to_participants(self, as_leader=False):
-        """Add the user as a participant. Assign as leader if specified."""
-        user = await self.get_user_info(self.user_id)
-        if user:
-            # Ensure user is added only once
-            self.chat_room.participants = [p for p in self.chat_room.participants if p['user_id'] != self.user_id]
-            participant_data = {
-                'user_id': self.user_id,
-                'user_name': user.name,
-                'leader': as_leader
-            }
-            self.chat_room.participants.append(participant_data)
-            await sync_to_async(self.chat_room.save)()
-
-    async def remove_user_from_participants(self):
-        """Remove the user from the participants list."""
-        self.chat_room.participants = [p for p in self.chat_room.participants if p['user_id'] != self.user_id]
-        await sync_to_async(self.chat_room.save)()
-
-    async def send_participants_update(self, message, is_system_message=False):
+    async def add_user_to_participants(self, user):
+        """
+        Add the user as a participant (no-op if already present). The result
+        is not ok if the room is closed or full, except for members of
+        final_participants coming back after their connection dropped.
+        """
+        result = await live_rooms.join(self.room_id, self.user_id, user.name)
+        if result.status == CLOSED and await self.is_final_participant():
+            # 모집 완료 후 연결이 끊겨 참가자 목록에서 빠졌던 확정 참가자는 다시 들어올 수 있음
+            result = await live_rooms.join(self.room_id, self.user_id, user.name, rejoin=True)
+        if not result.ok:
+            logger.info("User %s cannot join room %s: %s", self.user_id, self.room_id, result.status)
+        return result
+
+    async def is_final_participant(self):
+        """Check if the user was a participant when recruitment completed."""
+        final_participants = await sync_to_async(
+            ChatRoom.objects.filter(room_id=self.room_id).values_list('final_participants', flat=True).first
+        )()
+        return any(p.get('user_id') == self.user_id for p in final_participants or [])
+
+    async def send_participants_update(self, message, is_system_message=False, participants=None):
         """Send updated participant list to all clients."""
         await self.channel_layer.group_send(
             self.room_group_name,
             {
                 'type': 'participants_update',
                 'message': message,
-                'participants': await self.get_participants_with_leader(),
+                'participants': await self.get_participants_with_leader(participants),
                 'is_system_message': is_system_message
             }
         )
 
     async def is_user_authenticated(self):
-        try:
-            user = await sync_to_async(UserInfo.objects.get)(user_id=self.user_id)
-            return True if user else False
-        except UserInfo.DoesNotExist:
+        if await aget_user_profile(self.user_id) is None:
             logger.error(f"User with user_id {self.user_id} does not exist.")
             return False
+        return True
 
     async def receive(self, text_data):
         try:
@@ -148,8 +158,12 @@ class ChatConsumer(AsyncWebsocketConsumer):
             if command == "complete_recruitment":
                 # Only the leader can complete recruitment
                 if await self.is_user_leader(user_id):
-                    self.chat_room.recruitment_complete = True
-                    await sync_to_async(self.chat_room.save)()
+                    # 그 시점의 참가자를 final_participants 로 저장 (연결이 끊겼다 돌아온 확정 참가자의 재입장 확인용)
+                    room_state = await live_rooms.set_flag(self.room_id, 'recruitment_complete')
+                    await sync_to_async(ChatRoom.objects.filter(room_id=self.room_id).update)(
+                        recruitment_complete=True, final_participants=room_state.participants if room_state else [],
+                    )
+                    await sync_to_async(invalidate_room)(self.room_id)
                     await self.channel_layer.group_send(
                         self.room_group_name,
                         {
@@ -165,13 +179,13 @@ class ChatConsumer(AsyncWebsocketConsumer):
                     }))
             elif user_id and message:
                 user = await self.get_user_info(user_id)
-                await sync_to_async(ChatMessage.objects.create)(
-                    room_id=self.room_id,
-                    user_id=user_id,
-                    user_name=user.name,
-                    message=message,
-                    timestamp=timestamp,
-                )
+                if not WRITE_BEHIND or not await self.enqueue_message(user_id, user.name, message):
+                    await sync_to_async(ChatMessage.objects.create)(
+                        room_id=self.room_id,
+                        user_id=user_id,
+                        user_name=user.name,
+                        message=message,
+                    )
                 await self.channel_layer.group_send(
                     self.room_group_name,
                     {
@@ -187,6 +201,16 @@ class ChatConsumer(AsyncWebsocketConsumer):
         except KeyError:
             await self.send(text_data=json.dumps({'error': "Message missing 'user_id' or 'message'"}))
 
+    async def enqueue_message(self, user_id, user_name, message):
+        """Queue the message on the write-behind stream (saved later by flush_chat_messages). False if Redis refused it."""
+        try:
+            await enqueue_message(message_stream, self.room_id, user_id, user_name, message)
+            return True
+        except Exception as e:
+            # 스트림을 쓸 수 없으면 (Redis 5.0 미만, 연결 오류) 메시지를 잃지 않도록 DB 에 바로 저장
+            logger.error("Failed to queue message for room %s, saving directly: %s", self.room_id, str(e))
+            return False
+
     async def chat_message(self, event):
         """Send chat message to WebSocket."""
         await self.send(text_data=json.dumps({
@@ -219,52 +243,23 @@ class ChatConsumer(AsyncWebsocketConsumer):
             'allow_exit': True
         }))
 
-    async def is_user_in_room(self):
-        participants = await self.get_participants()
-        return self.user_id in participants
-
-    async def get_participants(self):
-        participants = await redis.smembers(self.room_group_name)
-        return [p.decode('utf-8') for p in participants]
-
-    async def get_participants_with_leader(self):
-        self.chat_room = await sync_to_async(ChatRoom.objects.get)(room_id=self.room_id)
-        return [
-            {
-                'user_id': participant['user_id'],
-                'user_name': participant['user_name'],
-                'leader': participant['leader'],
-            }
-            for participant in self.chat_room.participants
-        ]
+    async def get_participants_with_leader(self, participants=None):
+        if participants is None:
+            room_state = await live_rooms.get(self.room_id)
+            participants = room_state.participants if room_state else []
+        return participant_list(participants)
 
     async def get_user_info(self, user_id):
-        try:
-            return await sync_to_async(UserInfo.objects.get)(user_id=user_id)
-        except UserInfo.DoesNotExist:
+        # 프로세스 LRU -> Redis -> DB 순으로 조회 (평소에는 DB 를 읽지 않음)
+        user = await aget_user_profile(user_id)
+        if user is None:
             logger.error(f"UserInfo with user_id {user_id} does not exist.")
-            return None
+        return user
 
     async def is_user_leader(self, user_id):
         """Check if the user is the leader."""
-        return any(p['leader'] for p in self.chat_room.participants if p['user_id'] == user_id)
-
-    async def handle_leader_reassignment(self):
-        """Do not reassign the leader if recruitment is complete."""
-        if self.chat_room.recruitment_complete:
-            return None  # Do not reassign the leader if recruitment is complete
-
-        self.chat_room = await sync_to_async(ChatRoom.objects.get)(room_id=self.room_id)
-        is_leader = any(p['leader'] for p in self.chat_room.participants if p['user_id'] == self.user_id)
-        new_leader_name = None
-        if is_leader:
-            remaining_participants = [p for p in self.chat_room.participants if p['user_id'] != self.user_id]
-            if remaining_participants:
-                remaining_participants[0]['leader'] = True
-                new_leader_name = remaining_participants[0]['user_name']
-            self.chat_room.participants = remaining_participants
-            await sync_to_async(self.chat_room.save)()
-        return new_leader_name
+        room_state = await live_rooms.get(self.room_id)
+        return room_state is not None and room_state.is_leader(user_id)
 
     def get_current_timestamp(self):
         return datetime.now(timezone.utc).isoformat()
@@ -0,0 +1,34 @@
+import socket
+
+from django.core.management.base import BaseCommand
+
+from chat.message_queue import FLUSH_BATCH_SIZE, FLUSH_INTERVAL_MS, STREAM_REDIS_URL, MessageFlusher, check_stream_support
+from chat.redis_pool import get_redis
+
+
+class Command(BaseCommand):
+    help = 'Persist write-behind chat messages from the Redis stream to the database in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--consumer', default=socket.gethostname(), help='Stable writer name (pending entries are replayed under it)')
+        parser.add_argument('--batch-size', type=int, default=FLUSH_BATCH_SIZE, help='Flush after this many messages')
+        parser.add_argument('--interval-ms', type=int, default=FLUSH_INTERVAL_MS, help='Flush at least this often (milliseconds)')
+        parser.add_argument('--once', action='store_true', help='Replay pending entries, flush one batch and exit')
+
+    def handle(self, *args, **options):
+        client = get_redis(STREAM_REDIS_URL)
+        check_stream_support(client)
+        flusher = MessageFlusher(
+            client, options['consumer'],
+            batch_size=options['batch_size'], interval_ms=options['interval_ms'],
+        )
+        flusher.ensure_group()
+        replayed = flusher.replay()
+        if replayed:
+            self.stdout.write(f"Replayed {replayed} unflushed messages")
+        while True:
+            written = flusher.run_once()
+            if written:
+                self.stdout.write(f"Flushed {written} messages")
+            if options['once']:
+                break
@@ -0,0 +1,52 @@
+import asyncio
+
+from channels.layers import get_channel_layer
+from django.core.management.base import BaseCommand
+
+from chat.consumers import leave_room, room_presence
+from chat.presence import PRESENCE_SWEEP_INTERVAL
+
+CHAT_GROUP_PREFIX = 'chat_'
+QUICKQUICK_GROUP_PREFIX = 'quickquick_chat_'
+
+
+class Command(BaseCommand):
+    help = 'Drop presence entries whose heartbeat stopped (e.g. a crashed worker) and announce those users as left.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=PRESENCE_SWEEP_INTERVAL, help='Seconds between sweeps')
+        parser.add_argument('--once', action='store_true', help='Sweep once and exit')
+
+    def handle(self, *args, **options):
+        asyncio.run(self.run(options['interval'], options['once']))
+
+    async def run(self, interval, once):
+        channel_layer = get_channel_layer()
+        while True:
+            left = await self.sweep_once(channel_layer)
+            if left:
+                self.stdout.write(f"Announced {left} expired members")
+            if once:
+                break
+            await asyncio.sleep(interval)
+
+    async def sweep_once(self, channel_layer):
+        left = 0
+        for group in await room_presence.groups():
+            try:
+                result = await room_presence.sweep(group)
+                if not result.gone:
+                    continue
+                left += len(result.gone)
+                if group.startswith(QUICKQUICK_GROUP_PREFIX):
+                    await channel_layer.group_send(group, {
+                        'type': 'participants_update',
+                        'participants': result.members,
+                    })
+                elif group.startswith(CHAT_GROUP_PREFIX):
+                    room_id = group[len(CHAT_GROUP_PREFIX):]
+                    for user_id in result.gone:
+                        await leave_room(channel_layer, room_id, user_id)
+            except Exception as e:
+                self.stderr.write(f"Failed to sweep presence of {group}: {e}")
+        return left
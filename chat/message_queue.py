@@ -0,0 +1,171 @@
+import json
+import logging
+import time
+from datetime import datetime
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+
+from .models import ChatMessage, ChatRoom
+
+logger = logging.getLogger(__name__)
+
+# True 면 ChatConsumer 가 메시지를 DB 대신 Redis Stream 에 넣고, flush_chat_messages 가 일괄 저장
+WRITE_BEHIND = getattr(settings, 'CHAT_MESSAGE_WRITE_BEHIND', False)
+STREAM_REDIS_URL = getattr(settings, 'CHAT_MESSAGE_REDIS_URL', 'redis://127.0.0.1:6379/0')
+FLUSH_BATCH_SIZE = getattr(settings, 'CHAT_MESSAGE_FLUSH_BATCH', 500)
+FLUSH_INTERVAL_MS = getattr(settings, 'CHAT_MESSAGE_FLUSH_INTERVAL_MS', 200)
+# 이 시간 동안 ACK 되지 않은 다른 writer 의 항목은 죽은 것으로 보고 가져옴
+CLAIM_IDLE_MS = getattr(settings, 'CHAT_MESSAGE_CLAIM_IDLE_MS', 60000)
+
+STREAM_KEY = 'chat:messages'
+STREAM_GROUP = 'chat-writers'
+# Redis Stream (XADD/XREADGROUP/XCLAIM) 은 5.0 부터
+MIN_REDIS_VERSION = (5, 0)
+
+
+def check_stream_support(client):
+    """Raise ImproperlyConfigured if the Redis server behind `client` has no streams."""
+    version = client.info('server')['redis_version']
+    if tuple(int(part) for part in version.split('.')[:2]) < MIN_REDIS_VERSION:
+        raise ImproperlyConfigured(
+            f"CHAT_MESSAGE_WRITE_BEHIND needs Redis {'.'.join(map(str, MIN_REDIS_VERSION))}+ "
+            f"for streams, but CHAT_MESSAGE_REDIS_URL runs {version}"
+        )
+
+
+async def enqueue_message(redis, room_id, user_id, user_name, message):
+    """Append a chat message to the write-behind stream (redis.asyncio client)."""
+    payload = {
+        'room_id': str(room_id),
+        'user_id': user_id,
+        'user_name': user_name,
+        'message': message,
+        # 저장 시각이 아닌 수신 시각을 기록
+        'timestamp': timezone.now().isoformat(),
+    }
+    await redis.xadd(STREAM_KEY, {'data': json.dumps(payload, ensure_ascii=False)})
+
+
+def _text(value):
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def _next_id(entry_id):
+    # 배타적 범위 '(' 는 6.2 부터라 바로 다음 id 로 시작
+    ms, seq = entry_id.split('-')
+    return f'{ms}-{int(seq) + 1}'
+
+
+class MessageFlusher:
+    """
+    Drain the chat message stream into MySQL with bulk_create.
+
+    Entries are read through a consumer group and only acknowledged (and
+    deleted) after their batch is committed. Anything read but not acked
+    when a writer dies stays pending: the same writer replays it on
+    restart, and other writers claim it once it has been idle for
+    CLAIM_IDLE_MS. Each row stores its stream entry id under a unique
+    constraint, so a replayed batch never duplicates messages.
+    """
+
+    def __init__(self, client, consumer, batch_size=FLUSH_BATCH_SIZE, interval_ms=FLUSH_INTERVAL_MS):
+        self.redis = client
+        self.consumer = consumer
+        self.batch_size = batch_size
+        self.interval_ms = interval_ms
+
+    def ensure_group(self):
+        import redis
+        try:
+            self.redis.xgroup_create(STREAM_KEY, STREAM_GROUP, id='0', mkstream=True)
+        except redis.ResponseError as e:
+            if 'BUSYGROUP' not in str(e):
+                raise
+
+    def replay(self):
+        """Persist entries left pending by this writer or by writers that died. Returns the count."""
+        total = 0
+        # 자신이 읽고 ACK 하지 못한 항목 ('0' 부터 읽으면 pending 목록)
+        while True:
+            entries = self._read('0', count=self.batch_size)
+            if not entries:
+                break
+            total += self.persist(entries)
+        # 다른 writer 가 오래 붙잡고 있는 항목 (XAUTOCLAIM 은 6.2 부터라 XPENDING + XCLAIM)
+        start = '-'
+        while True:
+            pending = self.redis.xpending_range(STREAM_KEY, STREAM_GROUP, start, '+', self.batch_size)
+            stale = [
+                entry['message_id'] for entry in pending
+                if entry['time_since_delivered'] >= CLAIM_IDLE_MS and _text(entry['consumer']) != self.consumer
+            ]
+            if stale:
+                claimed = self.redis.xclaim(STREAM_KEY, STREAM_GROUP, self.consumer, CLAIM_IDLE_MS, stale)
+                entries = [entry for entry in claimed if entry and entry[1]]
+                if entries:
+                    total += self.persist(entries)
+                # 이미 XDEL 된 항목은 내용 없이 돌아오므로 ACK 만 해서 pending 목록에서 치움
+                gone = {_text(entry_id) for entry_id in stale} - {_text(entry[0]) for entry in entries}
+                if gone:
+                    self.redis.xack(STREAM_KEY, STREAM_GROUP, *gone)
+            if len(pending) < self.batch_size:
+                break
+            start = _next_id(_text(pending[-1]['message_id']))
+        return total
+
+    def run_once(self):
+        """Wait for messages, then flush once batch_size entries or interval_ms have accumulated."""
+        entries = self._read('>', count=self.batch_size, block=max(self.interval_ms, 1))
+        if not entries:
+            return 0
+        deadline = time.monotonic() + self.interval_ms / 1000
+        while len(entries) < self.batch_size:
+            remaining = int((deadline - time.monotonic()) * 1000)
+            if remaining <= 0:
+                break
+            more = self._read('>', count=self.batch_size - len(entries), block=remaining)
+            if not more:
+                break
+            entries += more
+        return self.persist(entries)
+
+    def _read(self, start, count, block=None):
+        response = self.redis.xreadgroup(STREAM_GROUP, self.consumer, {STREAM_KEY: start}, count=count, block=block)
+        return [entry for _, stream_entries in response for entry in stream_entries if entry[1]]
+
+    def persist(self, entries):
+        """bulk_create the entries, then ack and delete them. Returns the number of messages written."""
+        rows = []
+        for entry_id, fields in entries:
+            entry_id = entry_id.decode() if isinstance(entry_id, bytes) else entry_id
+            data = json.loads(fields.get(b'data') or fields.get('data'))
+            rows.append((entry_id, data))
+
+        # 그 사이 삭제된 방의 메시지는 버림 (FK 오류로 배치 전체가 실패하지 않도록)
+        room_ids = {data['room_id'] for _, data in rows}
+        existing = {str(room_id) for room_id in ChatRoom.objects.filter(room_id__in=room_ids).values_list('room_id', flat=True)}
+        messages = [
+            ChatMessage(
+                stream_id=entry_id,
+                room_id=data['room_id'],
+                user_id=data['user_id'],
+                user_name=data['user_name'],
+                message=data['message'],
+                timestamp=datetime.fromisoformat(data['timestamp']),
+            )
+            for entry_id, data in rows
+            if data['room_id'] in existing
+        ]
+        dropped = len(rows) - len(messages)
+        if dropped:
+            logger.warning("Dropping %d queued messages for deleted rooms", dropped)
+        ChatMessage.objects.bulk_create(messages, ignore_conflicts=True)
+
+        entry_ids = [entry_id for entry_id, _ in rows]
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.xack(STREAM_KEY, STREAM_GROUP, *entry_ids)
+        pipe.xdel(STREAM_KEY, *entry_ids)
+        pipe.execute()
+        return len(messages)
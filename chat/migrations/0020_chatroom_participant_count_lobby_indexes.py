@@ -0,0 +1,44 @@
+# Generated by Django 4.2.13 on 2026-10-19 03:24
+
+from django.db import migrations, models
+
+
+def fill_participant_count(apps, schema_editor):
+    ChatRoom = apps.get_model('chat', 'ChatRoom')
+    rooms = []
+    for room in ChatRoom.objects.only('room_id', 'participants').iterator(chunk_size=1000):
+        room.participant_count = len(room.participants or [])
+        rooms.append(room)
+        if len(rooms) >= 1000:
+            ChatRoom.objects.bulk_update(rooms, ['participant_count'])
+            rooms = []
+    if rooms:
+        ChatRoom.objects.bulk_update(rooms, ['participant_count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0019_alter_chatroom_final_participants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatroom',
+            name='participant_count',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_participant_count, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='chatroom',
+            index=models.Index(fields=['active', 'departure_time', 'room_id'], name='chatroom_lobby_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='chatroom',
+            index=models.Index(fields=['active', 'departure', 'departure_time', 'room_id'], name='chatroom_lobby_dep_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='chatroom',
+            index=models.Index(fields=['active', 'destination', 'departure_time', 'room_id'], name='chatroom_lobby_dest_idx'),
+        ),
+    ]
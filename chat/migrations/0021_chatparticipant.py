@@ -0,0 +1,54 @@
+# Generated by Django 4.2.13 on 2026-10-19 03:26
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_participants(apps, schema_editor):
+    ChatRoom = apps.get_model('chat', 'ChatRoom')
+    ChatParticipant = apps.get_model('chat', 'ChatParticipant')
+    rows = []
+    for room in ChatRoom.objects.only('room_id', 'participants').iterator(chunk_size=1000):
+        seen = set()
+        for p in room.participants or []:
+            if p.get('user_id') is None or p['user_id'] in seen:
+                continue
+            seen.add(p['user_id'])
+            rows.append(ChatParticipant(
+                room_id=room.room_id, user_id=p['user_id'],
+                user_name=p.get('user_name', ''), leader=bool(p.get('leader')),
+            ))
+        if len(rows) >= 1000:
+            ChatParticipant.objects.bulk_create(rows)
+            rows = []
+    if rows:
+        ChatParticipant.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0020_chatroom_participant_count_lobby_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChatParticipant',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_id', models.CharField(max_length=100)),
+                ('user_name', models.CharField(max_length=100)),
+                ('leader', models.BooleanField(default=False)),
+                ('joined_at', models.DateTimeField(auto_now_add=True)),
+                ('room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='memberships', to='chat.chatroom')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user_id', 'room'], name='chatparticipant_user_room_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='chatparticipant',
+            constraint=models.UniqueConstraint(fields=('room', 'user_id'), name='chatparticipant_room_user_uniq'),
+        ),
+        migrations.RunPython(fill_participants, migrations.RunPython.noop),
+    ]
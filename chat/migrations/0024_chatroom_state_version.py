@@ -0,0 +1,18 @@
+# Generated by Django 4.2.13 on 2026-10-19 03:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0023_chatmessage_stream_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatroom',
+            name='state_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
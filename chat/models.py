@@ -1,10 +1,17 @@
-from django.db import models
+from django.db import models, transaction
+from django.utils.timezone import now as timezone_now
 import uuid
 from datetime import datetime, timezone
 import logging
+from .response_cache import invalidate_room
 
 logger = logging.getLogger(__name__)
 
+# 한 채팅방에 참가할 수 있는 최대 인원
+MAX_PARTICIPANTS = 4
+# Redis 방 상태(room_state)가 원본인 필드. 이미 있는 방을 update_fields 없이 save() 해도 덮어쓰지 않음
+LIVE_STATE_FIELDS = ('participants', 'participant_count', 'recruitment_complete', 'settlement_complete', 'state_version')
+
 class ChatRoom(models.Model):
     room_id = models.UUIDField(default=uuid.uuid4, primary_key=True, editable=False)
     room_name = models.CharField(max_length=100, default='default_room_name')
@@ -21,29 +28,116 @@ class ChatRoom(models.Model):
     settlement_complete = models.BooleanField(default=False)
     active = models.BooleanField(default=True)
     last_active = models.DateTimeField(auto_now=True)
+    # len(participants) 를 함께 저장해 '빈자리 있는 방' 필터를 DB 에서 처리
+    participant_count = models.PositiveSmallIntegerField(default=0)
+    # Redis 방 상태(room_state)의 버전. 늦게 도착한 이전 스냅샷이 최신 참가자 목록을 덮어쓰지 않도록 사용
+    state_version = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        # 로비 목록은 (departure_time, room_id) 순서의 keyset 페이지로 조회
+        indexes = [
+            models.Index(fields=['active', 'departure_time', 'room_id'], name='chatroom_lobby_idx'),
+            models.Index(fields=['active', 'departure', 'departure_time', 'room_id'], name='chatroom_lobby_dep_idx'),
+            models.Index(fields=['active', 'destination', 'departure_time', 'room_id'], name='chatroom_lobby_dest_idx'),
+        ]
 
     def save(self, *args, **kwargs):
         # Ensure departure_time is stored as UTC without timezone info
         if isinstance(self.departure_time, datetime) and self.departure_time.tzinfo is not None:
             self.departure_time = self.departure_time.astimezone(timezone.utc).replace(tzinfo=None)
-        super().save(*args, **kwargs)
+        self.participant_count = len(self.participants)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None and not self._state.adding:
+            # 오래된 인스턴스의 참가자/플래그로 Redis 에서 바뀐 최신 상태를 되돌리지 않도록 나머지 필드만 저장
+            update_fields = kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in LIVE_STATE_FIELDS
+            ]
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if update_fields is None or 'participants' in update_fields:
+                self.sync_participants()
+
+    def sync_participants(self):
+        """Mirror the participants JSON into ChatParticipant rows."""
+        ChatParticipant.sync_room(self.room_id, self.participants)
 
     def complete_recruitment(self):
         """Set recruitment as complete and save final participants."""
+        from .room_state import live_rooms
+
+        # Redis 방 상태에 먼저 표시하고, 그 시점의 참가자를 final_participants 로 저장
+        room_state = live_rooms().set_flag(self.room_id, 'recruitment_complete')
         self.recruitment_complete = True
-        self.final_participants = self.participants.copy()
-        self.save()
+        self.final_participants = room_state.participants if room_state else self.participants.copy()
+        ChatRoom.objects.filter(room_id=self.room_id).update(
+            recruitment_complete=True, final_participants=self.final_participants,
+        )
+        invalidate_room(self.room_id)
         logger.info(f"Recruitment completed for room {self.room_id}: {self.final_participants}")
 
     def __str__(self):
         return f"{self.room_name} (ID: {self.room_id})"
 
+class ChatParticipant(models.Model):
+    """One row per (room, user) in ChatRoom.participants, so a user's rooms can be found by index."""
+    room = models.ForeignKey(ChatRoom, on_delete=models.CASCADE, related_name="memberships")
+    user_id = models.CharField(max_length=100)
+    user_name = models.CharField(max_length=100)
+    leader = models.BooleanField(default=False)
+    joined_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['room', 'user_id'], name='chatparticipant_room_user_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['user_id', 'room'], name='chatparticipant_user_room_idx'),
+        ]
+
+    @classmethod
+    def sync_room(cls, room_id, participants):
+        """Bring a room's rows in line with its participants JSON (at most a few rows per room)."""
+        wanted = {p['user_id']: p for p in participants}
+        existing = {row.user_id: row for row in cls.objects.filter(room_id=room_id)}
+
+        removed = [user_id for user_id in existing if user_id not in wanted]
+        if removed:
+            cls.objects.filter(room_id=room_id, user_id__in=removed).delete()
+
+        created = []
+        changed = []
+        for user_id, p in wanted.items():
+            user_name, leader = p.get('user_name', ''), bool(p.get('leader'))
+            row = existing.get(user_id)
+            if row is None:
+                created.append(cls(room_id=room_id, user_id=user_id, user_name=user_name, leader=leader))
+            elif row.user_name != user_name or row.leader != leader:
+                row.user_name, row.leader = user_name, leader
+                changed.append(row)
+        if created:
+            cls.objects.bulk_create(created)
+        if changed:
+            cls.objects.bulk_update(changed, ['user_name', 'leader'])
+
+    def __str__(self):
+        return f"{self.user_name} in {self.room_id}"
+
 class ChatMessage(models.Model):
     room = models.ForeignKey(ChatRoom, on_delete=models.CASCADE, related_name="messages")
     user_id = models.CharField(max_length=100)
     user_name = models.CharField(max_length=100)
     message = models.TextField()
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # write-behind 저장 시 수신 시각을 그대로 쓰기 위해 auto_now_add 대신 기본값 사용
+    timestamp = models.DateTimeField(default=timezone_now, editable=False)
+    # write-behind 로 저장된 메시지의 Redis Stream 항목 id (재처리 시 중복 방지)
+    stream_id = models.CharField(max_length=40, null=True, blank=True, unique=True, editable=False)
+
+    class Meta:
+        # 메시지 기록은 (room, timestamp, id) 순서의 keyset 페이지로 조회
+        indexes = [
+            models.Index(fields=['room', 'timestamp', 'id'], name='chatmessage_room_ts_idx'),
+        ]
 
     def __str__(self):
         return f'{self.user_name} ({self.timestamp.strftime("%Y-%m-%d %H:%M:%S")}): {self.message[:20]}'
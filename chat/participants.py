@@ -0,0 +1,225 @@
+import json
+from typing import NamedTuple
+
+from django.db import connection, transaction
+
+# join()/leave()/update() 결과 상태
+JOINED = 'joined'
+ALREADY_JOINED = 'already_joined'
+FULL = 'full'
+CLOSED = 'closed'
+NOT_FOUND = 'not_found'
+LEFT = 'left'
+UPDATED = 'updated'
+NOT_MEMBER = 'not_member'
+
+
+class MutationResult(NamedTuple):
+    ok: bool
+    status: str
+    participants: list
+
+
+def like_escape(value):
+    # JSON_SEARCH 는 LIKE 패턴으로 비교하므로 %, _ 를 이스케이프
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+class ParticipantList:
+    """
+    Atomic join/leave on a model's participants JSON column.
+
+    On MySQL each mutation is a single conditional UPDATE built from JSON
+    functions. It writes only the participants and count columns, and its
+    WHERE clause carries the membership, closed and capacity checks, so
+    concurrent joins can neither lose each other's writes nor overfill a
+    room. Other backends fall back to a short select_for_update transaction.
+
+    `capacity` is either a number or the name of a column holding it.
+    """
+
+    def __init__(self, model, field, count_field, closed_field, capacity):
+        self.model = model
+        self.field = field
+        self.count_field = count_field
+        self.closed_field = closed_field
+        self.capacity = capacity
+
+    def join(self, pk, user_id, user_name, **extra):
+        """Append the user unless already present, the room is closed, or it is full."""
+        user_id = str(user_id)
+        entry = {'user_id': user_id, 'user_name': user_name, **extra}
+        with transaction.atomic():
+            if connection.vendor == 'mysql':
+                updated = self._execute_join(pk, entry)
+            else:
+                updated = self._locked_update(pk, lambda row: self._join_in_python(row, entry))
+            row = self._fetch(pk)
+            if row is None:
+                return MutationResult(False, NOT_FOUND, [])
+            participants = row[self.field]
+            if updated:
+                return MutationResult(True, JOINED, participants)
+
+        if any(p.get('user_id') == user_id for p in participants):
+            return MutationResult(True, ALREADY_JOINED, participants)
+        if row[self.closed_field]:
+            return MutationResult(False, CLOSED, participants)
+        return MutationResult(False, FULL, participants)
+
+    def leave(self, pk, user_id):
+        """Remove the user."""
+        user_id = str(user_id)
+        with transaction.atomic():
+            if connection.vendor == 'mysql':
+                updated = self._execute_leave(pk, user_id)
+            else:
+                updated = self._locked_update(pk, lambda row: self._leave_in_python(row, user_id))
+            row = self._fetch(pk)
+            if row is None:
+                return MutationResult(False, NOT_FOUND, [])
+            participants = row[self.field]
+            if updated:
+                return MutationResult(True, LEFT, participants)
+        return MutationResult(False, NOT_MEMBER, participants)
+
+    def update(self, pk, user_id, **fields):
+        """Set fields on the user's entry (e.g. ready=True). Returns ok=False with NOT_MEMBER if the user is absent."""
+        user_id = str(user_id)
+        with transaction.atomic():
+            if connection.vendor == 'mysql':
+                updated = self._execute_update(pk, user_id, fields)
+            else:
+                updated = self._locked_update(pk, lambda row: self._update_in_python(row, user_id, fields))
+            row = self._fetch(pk)
+        if row is None:
+            return MutationResult(False, NOT_FOUND, [])
+        participants = row[self.field]
+        if updated or any(p.get('user_id') == user_id for p in participants):
+            return MutationResult(True, UPDATED, participants)
+        return MutationResult(False, NOT_MEMBER, participants)
+
+    def close(self, pk):
+        """Mark the list closed and return the participants it was closed with (None if the row does not exist)."""
+        with transaction.atomic():
+            # UPDATE 가 행을 잠그므로 이후 join 은 닫힌 상태를 보고 실패
+            if not self.model.objects.filter(pk=pk).update(**{self.closed_field: True}):
+                return None
+            return self._fetch(pk)[self.field]
+
+    def _fetch(self, pk):
+        fields = [self.field, self.closed_field]
+        return self.model.objects.filter(pk=pk).values(*fields).first()
+
+    # MySQL: JSON 함수로 조건부 UPDATE 한 번
+
+    def _sql_names(self):
+        qn = connection.ops.quote_name
+        meta = self.model._meta
+        names = {
+            'table': qn(meta.db_table),
+            'pk': qn(meta.pk.column),
+            'p': qn(meta.get_field(self.field).column),
+            'count': qn(meta.get_field(self.count_field).column),
+            'closed': qn(meta.get_field(self.closed_field).column),
+        }
+        if isinstance(self.capacity, str):
+            names['capacity'] = qn(meta.get_field(self.capacity).column)
+        else:
+            names['capacity'] = '%(capacity)s'
+        return names
+
+    def _params(self, pk, user_id, **extra):
+        pk_field = self.model._meta.pk
+        return {
+            'pk': pk_field.get_db_prep_value(pk, connection),
+            'user': like_escape(user_id),
+            'capacity': self.capacity,
+            **extra,
+        }
+
+    def _execute_join(self, pk, entry):
+        n = self._sql_names()
+        p = n['p']
+        element = 'CAST(%(entry)s AS JSON)'
+        # MySQL 은 SET 을 왼쪽부터 적용하므로 count 는 바뀐 목록의 길이
+        sql = (
+            f"UPDATE {n['table']} SET {p} = JSON_ARRAY_APPEND({p}, '$', {element}), {n['count']} = JSON_LENGTH({p}) "
+            f"WHERE {n['pk']} = %(pk)s AND NOT {n['closed']} AND JSON_LENGTH({p}) < {n['capacity']} "
+            f"AND JSON_SEARCH({p}, 'one', CONVERT(%(user)s USING utf8mb4) COLLATE utf8mb4_bin, NULL, '$[*].user_id') IS NULL"
+        )
+        params = self._params(pk, entry['user_id'], entry=json.dumps(entry, ensure_ascii=False))
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.rowcount
+
+    def _execute_leave(self, pk, user_id):
+        n = self._sql_names()
+        p = n['p']
+        found = f"JSON_SEARCH({p}, 'one', CONVERT(%(user)s USING utf8mb4) COLLATE utf8mb4_bin, NULL, '$[*].user_id')"
+        # '$[2].user_id' -> '$[2]'
+        element = f"SUBSTRING_INDEX(JSON_UNQUOTE({found}), '.', 1)"
+        value = f"JSON_REMOVE({p}, {element})"
+        sql = (
+            f"UPDATE {n['table']} SET {p} = {value}, {n['count']} = JSON_LENGTH({p}) "
+            f"WHERE {n['pk']} = %(pk)s AND {found} IS NOT NULL"
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, self._params(pk, user_id))
+            return cursor.rowcount
+
+    def _execute_update(self, pk, user_id, fields):
+        n = self._sql_names()
+        p = n['p']
+        found = f"JSON_SEARCH({p}, 'one', CONVERT(%(user)s USING utf8mb4) COLLATE utf8mb4_bin, NULL, '$[*].user_id')"
+        element = f"SUBSTRING_INDEX(JSON_UNQUOTE({found}), '.', 1)"
+        assignments = ', '.join(
+            f"CONCAT({element}, '.{key}'), CAST(%(value_{i})s AS JSON)" for i, key in enumerate(fields)
+        )
+        sql = (
+            f"UPDATE {n['table']} SET {p} = JSON_SET({p}, {assignments}) "
+            f"WHERE {n['pk']} = %(pk)s AND {found} IS NOT NULL"
+        )
+        values = {f'value_{i}': json.dumps(value, ensure_ascii=False) for i, value in enumerate(fields.values())}
+        with connection.cursor() as cursor:
+            cursor.execute(sql, self._params(pk, user_id, **values))
+            return cursor.rowcount
+
+    # 그 외 DB: 행을 잠그고 Python 에서 같은 규칙 적용
+
+    def _locked_update(self, pk, mutate):
+        fields = [self.field, self.closed_field]
+        if isinstance(self.capacity, str):
+            fields.append(self.capacity)
+        row = self.model.objects.select_for_update().filter(pk=pk).values(*fields).first()
+        if row is None:
+            return 0
+        participants = mutate(row)
+        if participants is None:
+            return 0
+        return self.model.objects.filter(pk=pk).update(**{self.field: participants, self.count_field: len(participants)})
+
+    def _join_in_python(self, row, entry):
+        participants = row[self.field]
+        capacity = row[self.capacity] if isinstance(self.capacity, str) else self.capacity
+        if row[self.closed_field] or len(participants) >= capacity:
+            return None
+        if any(p.get('user_id') == entry['user_id'] for p in participants):
+            return None
+        return participants + [entry]
+
+    def _leave_in_python(self, row, user_id):
+        participants = row[self.field]
+        index = next((i for i, p in enumerate(participants) if p.get('user_id') == user_id), None)
+        if index is None:
+            return None
+        participants.pop(index)
+        return participants
+
+    def _update_in_python(self, row, user_id, fields):
+        participants = row[self.field]
+        for participant in participants:
+            if participant.get('user_id') == user_id:
+                participant.update(fields)
+                return participants
+        return None
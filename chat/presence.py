@@ -0,0 +1,204 @@
+import asyncio
+import json
+import logging
+from typing import NamedTuple
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# 연결별 접속 기록의 유효 시간 (초). 하트비트가 끊긴 연결 (죽은 워커) 은 이 시간 뒤 스위퍼가 나간 것으로 처리
+PRESENCE_TTL = getattr(settings, 'CHAT_PRESENCE_TTL', 60)
+PRESENCE_HEARTBEAT_INTERVAL = getattr(settings, 'CHAT_PRESENCE_HEARTBEAT_INTERVAL', 20)
+PRESENCE_SWEEP_INTERVAL = getattr(settings, 'CHAT_PRESENCE_SWEEP_INTERVAL', 10)
+
+PRESENCE_KEY_PREFIX = 'presence:'
+# 접속 기록이 있는 그룹 목록 (스위퍼가 순회)
+PRESENCE_GROUPS_KEY = 'presence:groups'
+
+# 그룹마다 sorted set 하나: 멤버 '<channel_name>|<user_id>', 점수는 만료 시각 (ms).
+# 사용자 정보가 필요한 그룹은 user_id -> JSON 해시를 함께 둠.
+# KEYS = [sorted set, 그룹 목록, 사용자 정보 해시]
+# 시각은 워커 시계가 아니라 Redis TIME 을 사용 (워커 간 시계 차이로 살아 있는 연결이 만료되지 않도록).
+# 스크립트 안에서 TIME 을 부른 뒤 쓰기를 하면 Redis 3.2 미만에서 거부되므로, TIME 은 먼저 따로 읽어 ARGV 로 넘김.
+# sorted set 에는 TTL 을 두지 않음: 스위퍼가 오래 멈췄다 돌아와도 만료된 연결을 찾아 나감 처리할 수 있어야 함
+COMMON_LUA = """
+local function user_of(member)
+  return string.sub(member, string.find(member, '|', 1, true) + 1)
+end
+local function live_users(key, now)
+  local users, count = {}, 0
+  for _, member in ipairs(redis.call('ZRANGEBYSCORE', key, now, '+inf')) do
+    local user = user_of(member)
+    if not users[user] then
+      users[user] = true
+      count = count + 1
+    end
+  end
+  return users, count
+end
+"""
+
+# ARGV = [user_id, channel_name, now, ttl_ms, 사용자 정보 JSON 또는 '']
+CONNECT_SCRIPT = COMMON_LUA + """
+local now, ttl = tonumber(ARGV[3]), tonumber(ARGV[4])
+local users = live_users(KEYS[1], now)
+local was_present = users[ARGV[1]]
+redis.call('ZADD', KEYS[1], now + ttl, ARGV[2] .. '|' .. ARGV[1])
+redis.call('SADD', KEYS[2], KEYS[1])
+if ARGV[5] ~= '' then
+  redis.call('HSET', KEYS[3], ARGV[1], ARGV[5])
+  redis.call('PEXPIRE', KEYS[3], 2 * ttl)
+end
+local _, count = live_users(KEYS[1], now)
+return {was_present and 0 or 1, count, redis.call('HVALS', KEYS[3])}
+"""
+
+# ARGV = [channel_name|user_id, now, ttl_ms]. 이미 스윕된 연결이면 0
+HEARTBEAT_SCRIPT = """
+local ttl = tonumber(ARGV[3])
+if not redis.call('ZSCORE', KEYS[1], ARGV[1]) then return 0 end
+redis.call('ZADD', KEYS[1], tonumber(ARGV[2]) + ttl, ARGV[1])
+if redis.call('EXISTS', KEYS[2]) == 1 then redis.call('PEXPIRE', KEYS[2], 2 * ttl) end
+return 1
+"""
+
+# ARGV = [user_id, channel_name, now]. 사용자의 마지막 연결일 때만 나간 것으로 처리
+DISCONNECT_SCRIPT = COMMON_LUA + """
+local now = tonumber(ARGV[3])
+local removed = redis.call('ZREM', KEYS[1], ARGV[2] .. '|' .. ARGV[1])
+local users, count = live_users(KEYS[1], now)
+local left = 0
+if removed == 1 and not users[ARGV[1]] then
+  left = 1
+  redis.call('HDEL', KEYS[3], ARGV[1])
+  -- 같은 사용자의 만료된 연결은 스위퍼가 다시 나감 처리하지 않도록 함께 제거
+  for _, member in ipairs(redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', '(' .. now)) do
+    if user_of(member) == ARGV[1] then redis.call('ZREM', KEYS[1], member) end
+  end
+end
+if redis.call('ZCARD', KEYS[1]) == 0 then redis.call('SREM', KEYS[2], KEYS[1]) end
+return {left, count, redis.call('HVALS', KEYS[3])}
+"""
+
+# ARGV = [now]. 만료된 연결을 지우고, 살아 있는 연결이 하나도 남지 않은 사용자를 반환
+SWEEP_SCRIPT = COMMON_LUA + """
+local now = tonumber(ARGV[1])
+local expired = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', '(' .. now)
+local gone = {}
+if #expired > 0 then
+  redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', '(' .. now)
+  local users = live_users(KEYS[1], now)
+  local seen = {}
+  for _, member in ipairs(expired) do
+    local user = user_of(member)
+    if not users[user] and not seen[user] then
+      seen[user] = true
+      table.insert(gone, user)
+      redis.call('HDEL', KEYS[3], user)
+    end
+  end
+end
+if redis.call('ZCARD', KEYS[1]) == 0 then redis.call('SREM', KEYS[2], KEYS[1]) end
+return {gone, redis.call('HVALS', KEYS[3])}
+"""
+
+
+class PresenceChange(NamedTuple):
+    # connect: 사용자가 새로 들어옴 (False 면 다른 연결이 살아 있던 재접속), disconnect: 사용자의 마지막 연결이 끊김
+    changed: bool
+    count: int
+    members: list = []
+
+
+class PresenceSweep(NamedTuple):
+    gone: list
+    members: list
+
+
+def _text(value):
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def presence_keys(group):
+    return [PRESENCE_KEY_PREFIX + group, PRESENCE_GROUPS_KEY, PRESENCE_KEY_PREFIX + group + ':data']
+
+
+class RoomPresence:
+    """
+    Who is connected to a channel-layer group, one entry per connection.
+
+    Every transition is a single Lua script call. Entries expire PRESENCE_TTL
+    seconds (by the Redis server clock) after the last heartbeat, so connections of a crashed worker
+    disappear on their own: sweep() removes them and reports the users who
+    have no live connection left, for the caller to announce as leaves.
+    """
+
+    def __init__(self, client, ttl=PRESENCE_TTL):
+        self.redis = client
+        self.ttl_ms = int(ttl * 1000)
+        self._connect = client.register_script(CONNECT_SCRIPT)
+        self._heartbeat = client.register_script(HEARTBEAT_SCRIPT)
+        self._disconnect = client.register_script(DISCONNECT_SCRIPT)
+        self._sweep = client.register_script(SWEEP_SCRIPT)
+
+    async def now_ms(self):
+        """Current time on the Redis server clock (ms)."""
+        seconds, microseconds = await self.redis.time()
+        return seconds * 1000 + microseconds // 1000
+
+    async def connect(self, group, user_id, connection, data=None):
+        """Record this connection; `data` (if given) is stored per user and returned in members."""
+        payload = json.dumps(data) if data is not None else ''
+        changed, count, values = await self._connect(
+            keys=presence_keys(group), args=[user_id, connection, await self.now_ms(), self.ttl_ms, payload]
+        )
+        return PresenceChange(bool(changed), count, [json.loads(value) for value in values])
+
+    async def heartbeat(self, group, user_id, connection):
+        """Push this connection's expiry forward. False if it has already been swept."""
+        keys = presence_keys(group)
+        alive = await self._heartbeat(keys=[keys[0], keys[2]], args=[f'{connection}|{user_id}', await self.now_ms(), self.ttl_ms])
+        return bool(alive)
+
+    async def disconnect(self, group, user_id, connection):
+        changed, count, values = await self._disconnect(keys=presence_keys(group), args=[user_id, connection, await self.now_ms()])
+        return PresenceChange(bool(changed), count, [json.loads(value) for value in values])
+
+    async def sweep(self, group):
+        gone, values = await self._sweep(keys=presence_keys(group), args=[await self.now_ms()])
+        return PresenceSweep([_text(user_id) for user_id in gone], [json.loads(value) for value in values])
+
+    async def groups(self):
+        """Groups that currently have presence entries."""
+        keys = await self.redis.smembers(PRESENCE_GROUPS_KEY)
+        return [_text(key)[len(PRESENCE_KEY_PREFIX):] for key in keys]
+
+
+class PresenceHeartbeat:
+    """Consumer mixin that keeps the connection's presence entry alive until disconnect."""
+
+    presence_task = None
+
+    def start_presence_heartbeat(self, presence, group):
+        self.presence_task = asyncio.create_task(self._presence_heartbeat(presence, group))
+
+    def stop_presence_heartbeat(self):
+        if self.presence_task:
+            self.presence_task.cancel()
+            self.presence_task = None
+
+    async def _presence_heartbeat(self, presence, group):
+        while True:
+            await asyncio.sleep(PRESENCE_HEARTBEAT_INTERVAL)
+            try:
+                alive = await presence.heartbeat(group, self.user_id, self.channel_name)
+            except Exception as e:
+                logger.error("Presence heartbeat failed for %s in %s: %s", self.user_id, group, str(e))
+                continue
+            if not alive:
+                # 하트비트가 늦어 이미 나간 것으로 처리된 연결: 닫아서 클라이언트가 다시 접속하도록 함
+                logger.info("Presence of %s in %s expired, closing connection", self.user_id, group)
+                self.presence_task = None
+                await self.close()
+                return
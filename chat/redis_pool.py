@@ -0,0 +1,169 @@
+import threading
+import time
+
+from django.conf import settings
+
+# URL 마다 프로세스당 하나씩 두는 Redis 연결 풀 (consumers 는 redis.asyncio, views/관리 명령은 redis-py)
+REDIS_URL = getattr(settings, 'CHAT_REDIS_URL', 'redis://127.0.0.1:6379/0')
+# 풀 하나가 여는 최대 연결 수. 모두 사용 중이면 POOL_TIMEOUT 초까지 기다린 뒤 ConnectionError
+REDIS_MAX_CONNECTIONS = getattr(settings, 'CHAT_REDIS_MAX_CONNECTIONS', 64)
+REDIS_POOL_TIMEOUT = getattr(settings, 'CHAT_REDIS_POOL_TIMEOUT', 5.0)
+# 이 시간 (초) 이상 쉬던 연결은 쓰기 전에 PING 으로 확인
+REDIS_HEALTH_CHECK_INTERVAL = getattr(settings, 'CHAT_REDIS_HEALTH_CHECK_INTERVAL', 30)
+
+
+class PoolMetrics:
+    """Checkout counters for a connection pool."""
+
+    def __init__(self, max_connections):
+        self.max_connections = max_connections
+        self._lock = threading.Lock()
+        self._stats = {
+            'created': 0, 'in_use': 0, 'peak_in_use': 0, 'acquired': 0, 'timeouts': 0, 'wait_total': 0.0, 'wait_max': 0.0,
+        }
+
+    def created(self):
+        with self._lock:
+            self._stats['created'] += 1
+
+    def acquired(self, waited):
+        with self._lock:
+            self._stats['in_use'] += 1
+            self._stats['peak_in_use'] = max(self._stats['peak_in_use'], self._stats['in_use'])
+            self._stats['acquired'] += 1
+            self._stats['wait_total'] += waited
+            self._stats['wait_max'] = max(self._stats['wait_max'], waited)
+
+    def released(self):
+        with self._lock:
+            self._stats['in_use'] -= 1
+
+    def timed_out(self):
+        with self._lock:
+            self._stats['timeouts'] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        return {
+            'max_connections': self.max_connections,
+            'created': stats['created'],
+            'in_use': stats['in_use'],
+            'peak_in_use': stats['peak_in_use'],
+            'acquired': stats['acquired'],
+            'timeouts': stats['timeouts'],
+            'avg_wait_ms': round(stats['wait_total'] * 1000 / stats['acquired'], 3) if stats['acquired'] else 0.0,
+            'max_wait_ms': round(stats['wait_max'] * 1000, 3),
+        }
+
+
+def _async_pool_class():
+    import redis.asyncio
+
+    class MeteredAsyncPool(redis.asyncio.BlockingConnectionPool):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.metrics = PoolMetrics(self.max_connections)
+
+        async def get_connection(self, command_name, *keys, **options):
+            started = time.monotonic()
+            try:
+                connection = await super().get_connection(command_name, *keys, **options)
+            except redis.asyncio.ConnectionError:
+                if time.monotonic() - started >= self.timeout:
+                    self.metrics.timed_out()
+                raise
+            self.metrics.acquired(time.monotonic() - started)
+            return connection
+
+        async def release(self, connection):
+            self.metrics.released()
+            await super().release(connection)
+
+        def make_connection(self):
+            self.metrics.created()
+            return super().make_connection()
+
+        def stats(self):
+            return self.metrics.stats()
+
+    return MeteredAsyncPool
+
+
+def _sync_pool_class():
+    import redis
+
+    class MeteredPool(redis.BlockingConnectionPool):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.metrics = PoolMetrics(self.max_connections)
+
+        def get_connection(self, command_name, *keys, **options):
+            started = time.monotonic()
+            try:
+                connection = super().get_connection(command_name, *keys, **options)
+            except redis.ConnectionError:
+                if time.monotonic() - started >= self.timeout:
+                    self.metrics.timed_out()
+                raise
+            self.metrics.acquired(time.monotonic() - started)
+            return connection
+
+        def release(self, connection):
+            self.metrics.released()
+            super().release(connection)
+
+        def make_connection(self):
+            self.metrics.created()
+            return super().make_connection()
+
+        def stats(self):
+            return self.metrics.stats()
+
+    return MeteredPool
+
+
+def _pool_options():
+    return {
+        'max_connections': REDIS_MAX_CONNECTIONS,
+        'timeout': REDIS_POOL_TIMEOUT,
+        'health_check_interval': REDIS_HEALTH_CHECK_INTERVAL,
+    }
+
+
+_async_clients = {}
+_clients = {}
+_lock = threading.Lock()
+
+
+def get_async_redis(url=None):
+    """Process-wide redis.asyncio client for `url` (default CHAT_REDIS_URL) on a bounded, health-checked pool (consumers)."""
+    url = url or REDIS_URL
+    with _lock:
+        if url not in _async_clients:
+            import redis.asyncio
+            pool = _async_pool_class().from_url(url, **_pool_options())
+            _async_clients[url] = redis.asyncio.Redis(connection_pool=pool)
+        return _async_clients[url]
+
+
+def get_redis(url=None):
+    """Process-wide redis-py client for `url` (default CHAT_REDIS_URL) on a bounded, health-checked pool (views, commands)."""
+    url = url or REDIS_URL
+    with _lock:
+        if url not in _clients:
+            import redis
+            pool = _sync_pool_class().from_url(url, **_pool_options())
+            _clients[url] = redis.Redis(connection_pool=pool)
+        return _clients[url]
+
+
+def pool_stats():
+    """Usage of the pools created so far in this process, by URL."""
+    with _lock:
+        pools = [('async', url, client) for url, client in _async_clients.items()]
+        pools += [('sync', url, client) for url, client in _clients.items()]
+    stats = {}
+    for kind, url, client in pools:
+        stats.setdefault(url, {})[kind] = client.connection_pool.stats()
+    return stats
@@ -0,0 +1,103 @@
+import functools
+import hashlib
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+logger = logging.getLogger(__name__)
+
+# 캐시된 응답의 최대 보관 시간 (초). 보통은 태그 무효화로 먼저 버려짐
+RESPONSE_CACHE_TIMEOUT = getattr(settings, 'CHAT_RESPONSE_CACHE_TIMEOUT', 300)
+
+ROOM_LIST_TAG = 'room-list'
+TAG_KEY_PREFIX = 'chat:tag:'
+RESPONSE_KEY_PREFIX = 'chat:resp:'
+# 캐시 키에 포함할 응답 헤더 (페이지 커서 등)
+CACHED_HEADERS = ('X-Next-Cursor', 'Link')
+
+
+def room_tag(room_id):
+    return f'room:{room_id}'
+
+
+def invalidate(*tags):
+    """Bump the version of each tag so every response tagged with it is missed from now on."""
+    try:
+        for tag in tags:
+            key = TAG_KEY_PREFIX + tag
+            # 버전 키가 축출되어도 예전 응답이 되살아나지 않도록 시각 기반 값으로 시작
+            if not cache.add(key, time.time_ns(), timeout=None):
+                cache.incr(key)
+    except Exception as e:
+        logger.error("Failed to invalidate response cache tags %s: %s", tags, str(e))
+
+
+def invalidate_room(room_id, room_list=True):
+    """Invalidate a room's detail responses and, by default, the room listing."""
+    if room_list:
+        invalidate(room_tag(room_id), ROOM_LIST_TAG)
+    else:
+        invalidate(room_tag(room_id))
+
+
+def tag_versions(tags):
+    keys = [TAG_KEY_PREFIX + tag for tag in tags]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, time.time_ns(), timeout=None)
+            versions[key] = cache.get(key)
+    return [str(versions[key]) for key in keys]
+
+
+def cached_response(get_tags):
+    """
+    Cache successful GET responses of a view in the Django cache.
+
+    `get_tags(request, *args, **kwargs)` names the tags the response depends
+    on. The current version of every tag is part of the cache key, so
+    invalidate() on any of them makes the next request render afresh.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'GET':
+                return view(request, *args, **kwargs)
+            try:
+                versions = tag_versions(get_tags(request, *args, **kwargs))
+                raw = '|'.join([view.__name__, request.get_full_path(), request.META.get('HTTP_ACCEPT', '')] + versions)
+                key = RESPONSE_KEY_PREFIX + hashlib.sha1(raw.encode()).hexdigest()
+                cached = cache.get(key)
+            except Exception as e:
+                logger.error("Response cache lookup failed: %s", str(e))
+                return view(request, *args, **kwargs)
+
+            if cached is not None:
+                content, content_type, headers = cached
+                response = HttpResponse(content, content_type=content_type)
+                for name, value in headers.items():
+                    response[name] = value
+                return response
+
+            response = view(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+
+            def store(response):
+                headers = {name: response[name] for name in CACHED_HEADERS if response.has_header(name)}
+                try:
+                    cache.set(key, (response.content, response['Content-Type'], headers), RESPONSE_CACHE_TIMEOUT)
+                except Exception as e:
+                    logger.error("Failed to store cached response: %s", str(e))
+
+            # DRF Response 는 렌더링된 뒤에 본문이 생김
+            if getattr(response, 'is_rendered', True):
+                store(response)
+            else:
+                response.add_post_render_callback(store)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,301 @@
+import json
+import logging
+from typing import NamedTuple, Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+
+from .models import MAX_PARTICIPANTS, ChatParticipant, ChatRoom
+from .participants import ALREADY_JOINED, JOINED, LEFT, NOT_FOUND
+from .redis_pool import get_redis
+from .response_cache import invalidate_room
+
+logger = logging.getLogger(__name__)
+
+# 마지막 변경 후 이 시간 (초) 동안 쓰이지 않은 방 상태는 Redis 에서 사라지고 다음 접근 때 DB 에서 다시 읽음
+ROOM_STATE_TTL = getattr(settings, 'CHAT_ROOM_STATE_TTL', 86400)
+
+ROOM_STATE_KEY_PREFIX = 'chat:room:'
+STATE_FIELDS = ('participants', 'recruitment_complete', 'settlement_complete', 'version')
+FLAGS = ('recruitment_complete', 'settlement_complete')
+
+# leave() 에서 방장이 나갔을 때 다음 참가자에게 넘기는 조건
+REASSIGN_ALWAYS = 'always'
+REASSIGN_OPEN = 'open'  # 모집 완료 전에만
+REASSIGN_NEVER = 'never'
+
+# 키가 없을 때만 DB 스냅샷으로 채움 (먼저 채운 상태를 덮어쓰지 않음).
+# 여러 필드를 한 번에 쓰는 HSET 은 Redis 4.0 부터라 HMSET 사용
+LOAD_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+  redis.call('HMSET', KEYS[1], 'participants', ARGV[1], 'recruitment_complete', ARGV[2],
+             'settlement_complete', ARGV[3], 'version', ARGV[4])
+end
+redis.call('EXPIRE', KEYS[1], ARGV[5])
+return redis.call('HMGET', KEYS[1], 'participants', 'recruitment_complete', 'settlement_complete', 'version')
+"""
+
+# ARGV[5] == '1' 이면 모집 완료/정원 검사를 건너뜀 (연결이 끊겨 빠졌던 확정 참가자의 재입장)
+JOIN_SCRIPT = """
+local state = redis.call('HMGET', KEYS[1], 'participants', 'recruitment_complete', 'version')
+if not state[1] then return {'missing'} end
+local participants = cjson.decode(state[1])
+local has_leader = false
+for _, p in ipairs(participants) do
+  if p['user_id'] == ARGV[1] then return {'already_joined', state[1], state[3]} end
+  if p['leader'] == true then has_leader = true end
+end
+if ARGV[5] ~= '1' then
+  if state[2] == '1' then return {'closed', state[1], state[3]} end
+  if #participants >= tonumber(ARGV[3]) then return {'full', state[1], state[3]} end
+end
+table.insert(participants, {user_id = ARGV[1], user_name = ARGV[2], leader = false})
+-- 방장이 없으면 (빈 방이거나 모집 완료 후 방장이 나감) 맨 앞 참가자가 방장
+if not has_leader then participants[1]['leader'] = true end
+local encoded = cjson.encode(participants)
+local version = redis.call('HINCRBY', KEYS[1], 'version', 1)
+redis.call('HSET', KEYS[1], 'participants', encoded)
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+return {'joined', encoded, version}
+"""
+
+LEAVE_SCRIPT = """
+local state = redis.call('HMGET', KEYS[1], 'participants', 'recruitment_complete', 'version')
+if not state[1] then return {'missing'} end
+local participants = cjson.decode(state[1])
+local index
+for i, p in ipairs(participants) do
+  if p['user_id'] == ARGV[1] then index = i break end
+end
+if not index then return {'not_member', state[1], state[3]} end
+local removed = table.remove(participants, index)
+local new_leader = ''
+local reassign = ARGV[2] == 'always' or (ARGV[2] == 'open' and state[2] ~= '1')
+if reassign and removed['leader'] == true and #participants > 0 then
+  participants[1]['leader'] = true
+  if type(participants[1]['user_name']) == 'string' then new_leader = participants[1]['user_name'] end
+end
+-- cjson 은 빈 테이블을 {} 로 쓰므로 빈 목록은 직접 기록
+local encoded = '[]'
+if #participants > 0 then encoded = cjson.encode(participants) end
+local version = redis.call('HINCRBY', KEYS[1], 'version', 1)
+redis.call('HSET', KEYS[1], 'participants', encoded)
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return {'left', encoded, version, new_leader}
+"""
+
+SET_FLAG_SCRIPT = """
+local state = redis.call('HMGET', KEYS[1], 'participants', 'recruitment_complete', 'settlement_complete', 'version')
+if not state[1] then return false end
+redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return state
+"""
+
+
+class RoomState(NamedTuple):
+    participants: list
+    recruitment_complete: bool
+    settlement_complete: bool
+    version: int
+
+    @property
+    def leader(self):
+        return next((p for p in self.participants if p.get('leader')), None)
+
+    def is_leader(self, user_id):
+        return any(p.get('leader') for p in self.participants if p.get('user_id') == user_id)
+
+
+class Transition(NamedTuple):
+    ok: bool
+    status: str
+    participants: list
+    version: int = 0
+    new_leader: Optional[str] = None
+
+
+def state_key(room_id):
+    return f'{ROOM_STATE_KEY_PREFIX}{room_id}'
+
+
+def _text(value):
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def _state(values):
+    participants, recruitment, settlement, version = (_text(v) for v in values)
+    return RoomState(json.loads(participants), recruitment == '1', settlement == '1', int(version or 0))
+
+
+def _transition(reply):
+    status = _text(reply[0])
+    participants = json.loads(_text(reply[1]))
+    version = int(_text(reply[2]) or 0)
+    new_leader = _text(reply[3]) if len(reply) > 3 else ''
+    return Transition(status in (JOINED, ALREADY_JOINED, LEFT), status, participants, version, new_leader or None)
+
+
+def db_snapshot(room_id):
+    """LOAD_SCRIPT arguments (without the TTL) for a room as stored in ChatRoom, or None if the room does not exist."""
+    row = (
+        ChatRoom.objects.filter(room_id=room_id)
+        .values('participants', 'recruitment_complete', 'settlement_complete', 'state_version')
+        .first()
+    )
+    if row is None:
+        return None
+    return [
+        json.dumps(row['participants'], ensure_ascii=False),
+        int(row['recruitment_complete']),
+        int(row['settlement_complete']),
+        row['state_version'],
+    ]
+
+
+def flush_participants(room_id, participants, version):
+    """
+    Write a participants snapshot back to ChatRoom (and ChatParticipant).
+
+    The UPDATE only applies if the row holds an older state_version, so
+    flushes that finish out of order never roll the row back.
+    """
+    with transaction.atomic():
+        updated = ChatRoom.objects.filter(room_id=room_id, state_version__lt=version).update(
+            participants=participants, participant_count=len(participants), state_version=version,
+        )
+        if updated:
+            ChatParticipant.sync_room(room_id, participants)
+    if updated:
+        invalidate_room(room_id)
+    return bool(updated)
+
+
+def flush_transition(room_id, transition):
+    """Persist a successful join/leave; failures are logged and caught up by the next transition."""
+    if transition.status not in (JOINED, LEFT):
+        return
+    try:
+        flush_participants(room_id, transition.participants, transition.version)
+    except Exception as e:
+        logger.error("Failed to flush room state for %s: %s", room_id, str(e))
+
+
+class RoomStateStore:
+    """
+    Live room state (participants, leader, recruitment/settlement flags)
+    kept in one Redis hash per room and changed only by Lua scripts, so
+    every join, leave and flag change is atomic and needs no database
+    round-trip. A room is loaded from ChatRoom on first access, and each
+    join/leave is flushed back with flush_transition().
+
+    This is the sync store used by the views; AsyncRoomStateStore wraps an
+    redis.asyncio client for the consumers.
+    """
+
+    def __init__(self, client, capacity=MAX_PARTICIPANTS, ttl=ROOM_STATE_TTL):
+        self.redis = client
+        self.capacity = capacity
+        self.ttl = ttl
+        self._load = client.register_script(LOAD_SCRIPT)
+        self._join = client.register_script(JOIN_SCRIPT)
+        self._leave = client.register_script(LEAVE_SCRIPT)
+        self._set_flag = client.register_script(SET_FLAG_SCRIPT)
+
+    def load(self, room_id):
+        args = db_snapshot(room_id)
+        if args is None:
+            return None
+        return self._load(keys=[state_key(room_id)], args=args + [self.ttl])
+
+    def get(self, room_id):
+        """Current RoomState, or None if the room does not exist."""
+        values = self.redis.hmget(state_key(room_id), STATE_FIELDS)
+        if values[0] is None:
+            values = self.load(room_id)
+            if values is None:
+                return None
+        return _state(values)
+
+    def join(self, room_id, user_id, user_name, rejoin=False):
+        """Add a participant; with rejoin=True the closed/full checks are skipped."""
+        return self._mutate(room_id, self._join, [str(user_id), user_name or '', self.capacity, self.ttl, int(rejoin)])
+
+    def leave(self, room_id, user_id, reassign=REASSIGN_ALWAYS):
+        return self._mutate(room_id, self._leave, [str(user_id), reassign, self.ttl])
+
+    def set_flag(self, room_id, flag, value=True):
+        """Set a flag and return the RoomState just before the change (None if the room does not exist)."""
+        assert flag in FLAGS
+        args = [flag, int(value), self.ttl]
+        values = self._set_flag(keys=[state_key(room_id)], args=args)
+        if values is None:
+            if self.load(room_id) is None:
+                return None
+            values = self._set_flag(keys=[state_key(room_id)], args=args)
+        return _state(values)
+
+    def _mutate(self, room_id, script, args):
+        reply = script(keys=[state_key(room_id)], args=args)
+        if reply[0] in (b'missing', 'missing'):
+            if self.load(room_id) is None:
+                return Transition(False, NOT_FOUND, [])
+            reply = script(keys=[state_key(room_id)], args=args)
+        return _transition(reply)
+
+
+class AsyncRoomStateStore(RoomStateStore):
+    """RoomStateStore on a redis.asyncio client; the ChatRoom read on a miss runs in a thread."""
+
+    async def load(self, room_id):
+        args = await sync_to_async(db_snapshot)(room_id)
+        if args is None:
+            return None
+        return await self._load(keys=[state_key(room_id)], args=args + [self.ttl])
+
+    async def get(self, room_id):
+        values = await self.redis.hmget(state_key(room_id), STATE_FIELDS)
+        if values[0] is None:
+            values = await self.load(room_id)
+            if values is None:
+                return None
+        return _state(values)
+
+    async def join(self, room_id, user_id, user_name, rejoin=False):
+        return await self._mutate(room_id, self._join, [str(user_id), user_name or '', self.capacity, self.ttl, int(rejoin)])
+
+    async def leave(self, room_id, user_id, reassign=REASSIGN_ALWAYS):
+        return await self._mutate(room_id, self._leave, [str(user_id), reassign, self.ttl])
+
+    async def set_flag(self, room_id, flag, value=True):
+        assert flag in FLAGS
+        args = [flag, int(value), self.ttl]
+        values = await self._set_flag(keys=[state_key(room_id)], args=args)
+        if values is None:
+            if await self.load(room_id) is None:
+                return None
+            values = await self._set_flag(keys=[state_key(room_id)], args=args)
+        return _state(values)
+
+    async def _mutate(self, room_id, script, args):
+        reply = await script(keys=[state_key(room_id)], args=args)
+        if reply[0] in (b'missing', 'missing'):
+            if await self.load(room_id) is None:
+                return Transition(False, NOT_FOUND, [])
+            reply = await script(keys=[state_key(room_id)], args=args)
+        return _transition(reply)
+
+    async def flush(self, room_id, transition):
+        await sync_to_async(flush_transition)(room_id, transition)
+
+
+_live_rooms = None
+
+
+def live_rooms():
+    """Process-wide RoomStateStore for the views (shared redis-py pool, created on first use)."""
+    global _live_rooms
+    if _live_rooms is None:
+        _live_rooms = RoomStateStore(get_redis())
+    return _live_rooms
@@ -1,3 +1,270 @@
-from django.test import TestCase
+import threading
+import unittest
 
-# Create your tests here.
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+
+from quick_chat.models import QuickChatRoom, quick_room_participants
+
+from .models import ChatParticipant, ChatRoom
+from .participants import ALREADY_JOINED, CLOSED, FULL, JOINED, LEFT, NOT_FOUND, NOT_MEMBER, UPDATED
+from .presence import RoomPresence
+from .room_state import REASSIGN_NEVER, REASSIGN_OPEN, RoomStateStore, flush_participants, state_key
+
+
+def fake_redis(asyncio=False):
+    """In-memory Redis with Lua support for the script tests; skipped if fakeredis/lupa are not installed."""
+    try:
+        import fakeredis
+        import lupa  # noqa: F401 (fakeredis 의 EVAL 에 필요)
+    except ImportError:
+        raise unittest.SkipTest('fakeredis with lupa is required for the Redis script tests')
+    return fakeredis.aioredis.FakeRedis() if asyncio else fakeredis.FakeRedis()
+
+
+class ParticipantListTests(TestCase):
+    """
+    join/leave/update on QuickChatRoom.quick_participants.
+
+    On MySQL these run the conditional JSON UPDATEs; on other backends the
+    select_for_update fallback, which must follow the same rules.
+    """
+
+    def setUp(self):
+        self.room = QuickChatRoom.objects.create(quick_max_participants=2)
+
+    def join(self, user_id):
+        return quick_room_participants.join(self.room.pk, user_id, f'name-{user_id}', ready=False)
+
+    def test_join_appends_and_counts(self):
+        result = self.join('a')
+        self.assertEqual((result.ok, result.status), (True, JOINED))
+        self.assertEqual(result.participants, [{'user_id': 'a', 'user_name': 'name-a', 'ready': False}])
+        self.assertEqual(QuickChatRoom.objects.get(pk=self.room.pk).quick_participant_count, 1)
+
+    def test_join_at_capacity_is_refused(self):
+        self.join('a')
+        self.join('b')
+        result = self.join('c')
+        self.assertEqual((result.ok, result.status), (False, FULL))
+        self.assertEqual([p['user_id'] for p in result.participants], ['a', 'b'])
+        self.assertEqual(QuickChatRoom.objects.get(pk=self.room.pk).quick_participant_count, 2)
+
+    def test_duplicate_join_is_a_no_op(self):
+        self.join('a')
+        result = self.join('a')
+        self.assertEqual((result.ok, result.status), (True, ALREADY_JOINED))
+        self.assertEqual(len(result.participants), 1)
+
+    def test_user_id_match_is_exact(self):
+        # JSON_SEARCH 는 LIKE 패턴이므로 '_' / '%' 가 다른 사용자와 겹치면 안 됨
+        self.join('a_1')
+        self.assertEqual(self.join('a%1').status, JOINED)
+
+    def test_join_closed_room_is_refused(self):
+        self.assertEqual(quick_room_participants.close(self.room.pk), [])
+        self.assertEqual(self.join('a').status, CLOSED)
+
+    def test_leave(self):
+        self.join('a')
+        self.join('b')
+        result = quick_room_participants.leave(self.room.pk, 'a')
+        self.assertEqual((result.ok, result.status), (True, LEFT))
+        self.assertEqual([p['user_id'] for p in result.participants], ['b'])
+        self.assertEqual(QuickChatRoom.objects.get(pk=self.room.pk).quick_participant_count, 1)
+        self.assertEqual(quick_room_participants.leave(self.room.pk, 'a').status, NOT_MEMBER)
+
+    def test_update_sets_fields_on_one_entry(self):
+        self.join('a')
+        self.join('b')
+        result = quick_room_participants.update(self.room.pk, 'b', ready=True)
+        self.assertEqual((result.ok, result.status), (True, UPDATED))
+        self.assertEqual([p['ready'] for p in result.participants], [False, True])
+        self.assertEqual(quick_room_participants.update(self.room.pk, 'c', ready=True).status, NOT_MEMBER)
+
+
+@unittest.skipUnless(connection.vendor == 'mysql', 'row-level concurrency is only meaningful on MySQL')
+class ParticipantListConcurrencyTests(TransactionTestCase):
+
+    def test_concurrent_joins_for_the_last_seat(self):
+        room = QuickChatRoom.objects.create(quick_max_participants=2)
+        quick_room_participants.join(room.pk, 'a', 'A')
+        barrier = threading.Barrier(2)
+        statuses = []
+
+        def join(user_id):
+            try:
+                barrier.wait()
+                statuses.append(quick_room_participants.join(room.pk, user_id, user_id).status)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=join, args=(user_id,)) for user_id in ('b', 'c')]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sorted(statuses), [FULL, JOINED])
+        room.refresh_from_db()
+        self.assertEqual(len(room.quick_participants), 2)
+        self.assertEqual(room.quick_participant_count, 2)
+
+
+class RoomStateStoreTests(TestCase):
+    """JOIN/LEAVE/SET_FLAG scripts on a room loaded from ChatRoom."""
+
+    def setUp(self):
+        self.redis = fake_redis()
+        self.rooms = RoomStateStore(self.redis, capacity=2)
+        self.room = ChatRoom.objects.create()
+
+    def join(self, user_id, **kwargs):
+        return self.rooms.join(self.room.room_id, user_id, f'name-{user_id}', **kwargs)
+
+    def test_first_join_loads_the_room_and_becomes_leader(self):
+        ChatRoom.objects.filter(pk=self.room.pk).update(state_version=5)
+        result = self.join('a')
+        self.assertEqual((result.ok, result.status, result.version), (True, JOINED, 6))
+        self.assertEqual(result.participants, [{'user_id': 'a', 'user_name': 'name-a', 'leader': True}])
+        self.assertTrue(self.rooms.get(self.room.room_id).is_leader('a'))
+
+    def test_unknown_room(self):
+        result = self.rooms.join('00000000-0000-0000-0000-000000000000', 'a', 'A')
+        self.assertEqual((result.ok, result.status), (False, NOT_FOUND))
+
+    def test_join_full_room_is_refused(self):
+        self.join('a')
+        self.join('b')
+        result = self.join('c')
+        self.assertEqual((result.ok, result.status), (False, FULL))
+        self.assertEqual([p['user_id'] for p in result.participants], ['a', 'b'])
+
+    def test_duplicate_join_does_not_bump_the_version(self):
+        version = self.join('a').version
+        result = self.join('a')
+        self.assertEqual((result.ok, result.status, result.version), (True, ALREADY_JOINED, version))
+
+    def test_join_closed_room_is_refused_unless_rejoining(self):
+        self.join('a')
+        before = self.rooms.set_flag(self.room.room_id, 'recruitment_complete')
+        self.assertFalse(before.recruitment_complete)
+        self.assertTrue(self.rooms.get(self.room.room_id).recruitment_complete)
+        self.assertEqual(self.join('b').status, CLOSED)
+        self.assertEqual(self.join('b', rejoin=True).status, JOINED)
+
+    def test_rejoin_skips_the_capacity_check(self):
+        self.join('a')
+        self.join('b')
+        self.assertEqual(self.join('c', rejoin=True).status, JOINED)
+
+    def test_leader_leaving_hands_over_to_the_next_participant(self):
+        self.join('a')
+        self.join('b')
+        result = self.rooms.leave(self.room.room_id, 'a')
+        self.assertEqual((result.ok, result.status, result.new_leader), (True, LEFT, 'name-b'))
+        self.assertEqual(result.participants, [{'user_id': 'b', 'user_name': 'name-b', 'leader': True}])
+
+    def test_no_hand_over_after_recruitment_with_reassign_open(self):
+        self.join('a')
+        self.join('b')
+        self.rooms.set_flag(self.room.room_id, 'recruitment_complete')
+        result = self.rooms.leave(self.room.room_id, 'a', reassign=REASSIGN_OPEN)
+        self.assertIsNone(result.new_leader)
+        self.assertIsNone(self.rooms.get(self.room.room_id).leader)
+        # 방장이 없는 방에 다시 들어오면 맨 앞 참가자가 방장
+        self.join('a', rejoin=True)
+        self.assertEqual(self.rooms.get(self.room.room_id).leader['user_id'], 'b')
+
+    def test_no_hand_over_with_reassign_never(self):
+        self.join('a')
+        self.join('b')
+        result = self.rooms.leave(self.room.room_id, 'a', reassign=REASSIGN_NEVER)
+        self.assertIsNone(result.new_leader)
+        self.assertFalse(result.participants[0]['leader'])
+
+    def test_last_leave_stores_an_empty_list(self):
+        self.join('a')
+        result = self.rooms.leave(self.room.room_id, 'a')
+        self.assertEqual(result.participants, [])
+        self.assertEqual(self.redis.hget(state_key(self.room.room_id), 'participants'), b'[]')
+        self.assertEqual(self.rooms.leave(self.room.room_id, 'a').status, NOT_MEMBER)
+
+    def test_flush_never_rolls_back_to_an_older_version(self):
+        joined = self.join('a')
+        second = self.join('b')
+        self.assertTrue(flush_participants(self.room.room_id, second.participants, second.version))
+        self.assertFalse(flush_participants(self.room.room_id, joined.participants, joined.version))
+        self.room.refresh_from_db()
+        self.assertEqual((self.room.participant_count, self.room.state_version), (2, second.version))
+        self.assertEqual(ChatParticipant.objects.filter(room_id=self.room.room_id).count(), 2)
+
+
+class RoomPresenceTests(SimpleTestCase):
+    """Presence scripts with the server clock replaced by self.now (ms)."""
+
+    def setUp(self):
+        self.presence = RoomPresence(fake_redis(asyncio=True), ttl=60)
+        self.now = 1000000
+
+        async def now_ms():
+            return self.now
+        self.presence.now_ms = now_ms
+
+    async def test_connect_reports_only_the_first_connection_of_a_user(self):
+        first = await self.presence.connect('room', 'u1', 'c1', data={'user_id': 'u1'})
+        self.assertEqual(first, (True, 1, [{'user_id': 'u1'}]))
+        second = await self.presence.connect('room', 'u1', 'c2', data={'user_id': 'u1'})
+        self.assertEqual((second.changed, second.count), (False, 1))
+        other = await self.presence.connect('room', 'u2', 'c3')
+        self.assertEqual((other.changed, other.count), (True, 2))
+        self.assertEqual(await self.presence.groups(), ['room'])
+
+    async def test_disconnect_reports_only_the_last_connection_of_a_user(self):
+        await self.presence.connect('room', 'u1', 'c1', data={'user_id': 'u1'})
+        await self.presence.connect('room', 'u1', 'c2', data={'user_id': 'u1'})
+        first = await self.presence.disconnect('room', 'u1', 'c1')
+        self.assertEqual((first.changed, first.count), (False, 1))
+        last = await self.presence.disconnect('room', 'u1', 'c2')
+        self.assertEqual(last, (True, 0, []))
+        self.assertEqual(await self.presence.groups(), [])
+
+    async def test_disconnect_of_an_unknown_connection_is_not_a_leave(self):
+        await self.presence.connect('room', 'u1', 'c1')
+        change = await self.presence.disconnect('room', 'u1', 'other')
+        self.assertEqual((change.changed, change.count), (False, 1))
+
+    async def test_heartbeat_keeps_the_connection_past_its_ttl(self):
+        await self.presence.connect('room', 'u1', 'c1')
+        self.now += 50000
+        self.assertTrue(await self.presence.heartbeat('room', 'u1', 'c1'))
+        self.now += 50000
+        self.assertEqual((await self.presence.sweep('room')).gone, [])
+
+    async def test_sweep_reports_users_without_a_live_connection(self):
+        await self.presence.connect('room', 'u1', 'c1', data={'user_id': 'u1'})
+        await self.presence.connect('room', 'u2', 'c2', data={'user_id': 'u2'})
+        self.now += 30000
+        await self.presence.connect('room', 'u2', 'c3', data={'user_id': 'u2'})
+        self.now += 40000
+        sweep = await self.presence.sweep('room')
+        self.assertEqual(sweep, (['u1'], [{'user_id': 'u2'}]))
+        # 이미 스윕된 연결의 하트비트는 실패 (소비자가 연결을 닫음)
+        self.assertFalse(await self.presence.heartbeat('room', 'u1', 'c1'))
+        self.assertEqual((await self.presence.sweep('room')).gone, [])
+
+    async def test_sweep_of_the_last_connection_forgets_the_group(self):
+        await self.presence.connect('room', 'u1', 'c1')
+        self.now += 61000
+        self.assertEqual((await self.presence.sweep('room')).gone, ['u1'])
+        self.assertEqual(await self.presence.groups(), [])
+
+    async def test_disconnect_drops_expired_connections_of_the_leaving_user(self):
+        await self.presence.connect('room', 'u1', 'c1')
+        self.now += 30000
+        await self.presence.connect('room', 'u1', 'c2')
+        self.now += 40000  # c1 만료, c2 는 살아 있음
+        change = await self.presence.disconnect('room', 'u1', 'c2')
+        self.assertEqual((change.changed, change.count), (True, 0))
+        # 스위퍼가 같은 사용자를 다시 나감 처리하지 않음
+        self.assertEqual((await self.presence.sweep('room')).gone, [])
@@ -1,13 +1,21 @@
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
+from django.conf import settings
+from django.db.models import Q
 from django.shortcuts import get_object_or_404, render
-from .models import ChatRoom, ChatMessage
-from signup.models import UserInfo
-from .serializers import ChatRoomSerializer, ChatMessageSerializer
+from .models import MAX_PARTICIPANTS, ChatRoom, ChatMessage, ChatParticipant
+from .participants import CLOSED, FULL, NOT_FOUND
+from .redis_pool import pool_stats
+from .room_state import flush_transition, live_rooms
+from signup.profiles import get_user_profile_or_404
+from taxi.eta import eta_for_trip
+from .serializers import ChatRoomSerializer
+from .response_cache import ROOM_LIST_TAG, cached_response, invalidate, invalidate_room, room_tag
 from channels.layers import get_channel_layer
 from asgiref.sync import async_to_sync
 from uuid import UUID
+import base64
 import json
 from django.http import JsonResponse
 import logging
@@ -19,6 +27,13 @@ logger = logging.getLogger(__name__)
 # Define Korean Standard Time (KST) timezone
 KST = timezone(timedelta(hours=9))
 
+# 채팅방 목록 한 페이지의 기본/최대 크기
+ROOM_PAGE_SIZE = getattr(settings, 'CHAT_ROOM_PAGE_SIZE', 50)
+ROOM_MAX_PAGE_SIZE = getattr(settings, 'CHAT_ROOM_MAX_PAGE_SIZE', 200)
+# 메시지 기록 한 페이지의 기본/최대 크기
+MESSAGE_PAGE_SIZE = getattr(settings, 'CHAT_MESSAGE_PAGE_SIZE', 50)
+MESSAGE_MAX_PAGE_SIZE = getattr(settings, 'CHAT_MESSAGE_MAX_PAGE_SIZE', 200)
+
 def generate_kakaopay_deeplink(base_link, amount_hex):
     return f"{base_link}{amount_hex}"
 
@@ -42,9 +57,12 @@ def create_room(request):
     data['departure_time'] = stored_departure_time
     serializer = ChatRoomSerializer(data=data)
     if serializer.is_valid():
-        chat_room = serializer.save()
-        chat_room.participants.append({'user_id': user_id, 'user_name': user_name, 'leader': True})
-        chat_room.save()
+        # 방장을 첫 INSERT 에 함께 기록하고 그 참가를 상태 버전 1 로 둠 (첫 접근 때 이 값으로 Redis 방 상태를 적재)
+        chat_room = serializer.save(
+            participants=[{'user_id': user_id, 'user_name': user_name, 'leader': True}],
+            state_version=1,
+        )
+        invalidate(ROOM_LIST_TAG)
 
         response_data = {
             'room_id': str(chat_room.room_id),
@@ -56,6 +74,7 @@ def create_room(request):
                 'destination': chat_room.destination,
                 'departure_time': departure_time.isoformat() if chat_room.departure_time else None,
                 'participants': chat_room.participants,
+                'eta': eta_for_trip(data),  # 출발/도착 좌표가 있으면 도로망 기준 예상 소요 시간
             }
         }
         return Response(response_data, status=status.HTTP_201_CREATED)
@@ -63,38 +82,166 @@ def create_room(request):
     logger.error(f"Create Room Validation Error: {serializer.errors}")
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+# 목록 응답에 필요한 컬럼만 조회
+ROOM_LIST_FIELDS = (
+    'room_id', 'room_name', 'departure', 'destination', 'departure_time',
+    'participants', 'recruitment_complete',
+)
+
+def room_list_data(room):
+    """Lobby representation of a room row fetched with values(*ROOM_LIST_FIELDS)."""
+    return {
+        'room_id': str(room['room_id']),
+        'room_name': room['room_name'],
+        'departure': room['departure'],
+        'destination': room['destination'],
+        'departure_time': room['departure_time'].astimezone(KST).isoformat() if room['departure_time'] else None,
+        'participants': room['participants'],
+        'recruitment_complete': room['recruitment_complete'],
+    }
+
+def to_stored_time(value):
+    """Convert an ISO datetime from the client to the naive value stored in departure_time."""
+    parsed = parser.isoparse(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=KST)
+    # 목록 응답이 저장값을 astimezone(KST) 로 변환하므로 그 역변환
+    return parsed.astimezone().replace(tzinfo=None)
+
+def encode_cursor(when, key):
+    """Opaque keyset cursor for a (datetime, tie-breaker key) position."""
+    raw = f"{when.isoformat()}|{key}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """Return (datetime, key string) from encode_cursor, or raise ValueError."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        when, key = raw.split('|')
+        return datetime.fromisoformat(when), key
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
+
+def parse_limit(params, default, maximum):
+    """Page size from ?limit=, capped at maximum. Raises ValueError if not a positive integer."""
+    limit = int(params.get('limit', default))
+    if limit < 1:
+        raise ValueError("limit must be a positive integer")
+    return min(limit, maximum)
+
+@cached_response(lambda request: [ROOM_LIST_TAG])
 @api_view(['GET'])
 def get_chat_rooms(request):
-    chat_rooms = ChatRoom.objects.filter(active=True)
-    chat_rooms_data = []
-    
-    for room in chat_rooms:
-        room_data = {
-            'room_id': str(room.room_id),
-            'room_name': room.room_name,
-            'departure': room.departure,
-            'destination': room.destination,
-            'departure_time': room.departure_time.astimezone(KST).isoformat() if room.departure_time else None,
-            'participants': room.participants,
-            'recruitment_complete': room.recruitment_complete,
-        }
-        chat_rooms_data.append(room_data)
-    
-    return Response(chat_rooms_data)
+    # 활성화된 채팅방을 출발 시간순으로 한 페이지씩 반환
+    # 다음 페이지 커서는 X-Next-Cursor / Link 헤더로 전달 (본문은 기존처럼 목록)
+    params = request.query_params
+    try:
+        limit = parse_limit(params, ROOM_PAGE_SIZE, ROOM_MAX_PAGE_SIZE)
+    except ValueError:
+        return Response({'error': 'limit must be a positive integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+    # departure / destination 필터에 맞는 복합 인덱스를 타도록 active 부터 조건을 건다
+    chat_rooms = ChatRoom.objects.filter(active=True, departure_time__isnull=False)
+    if params.get('departure'):
+        chat_rooms = chat_rooms.filter(departure=params['departure'])
+    if params.get('destination'):
+        chat_rooms = chat_rooms.filter(destination=params['destination'])
+    try:
+        if params.get('departure_after'):
+            chat_rooms = chat_rooms.filter(departure_time__gte=to_stored_time(params['departure_after']))
+        if params.get('departure_before'):
+            chat_rooms = chat_rooms.filter(departure_time__lt=to_stored_time(params['departure_before']))
+    except ValueError:
+        return Response({'error': 'Invalid date format'}, status=status.HTTP_400_BAD_REQUEST)
+    if params.get('not_full') in ('1', 'true'):
+        chat_rooms = chat_rooms.filter(recruitment_complete=False, participant_count__lt=MAX_PARTICIPANTS)
+    if params.get('cursor'):
+        try:
+            last_time, last_id = decode_cursor(params['cursor'])
+            last_id = UUID(last_id)
+        except ValueError:
+            return Response({'error': 'Invalid cursor'}, status=status.HTTP_400_BAD_REQUEST)
+        chat_rooms = chat_rooms.filter(
+            Q(departure_time__gt=last_time) | Q(departure_time=last_time, room_id__gt=last_id)
+        )
+
+    rooms = list(chat_rooms.order_by('departure_time', 'room_id').values(*ROOM_LIST_FIELDS)[:limit + 1])
+    has_next = len(rooms) > limit
+    rooms = rooms[:limit]
+
+    response = Response([room_list_data(room) for room in rooms])
+    if has_next:
+        cursor = encode_cursor(rooms[-1]['departure_time'], rooms[-1]['room_id'].hex)
+        query = params.copy()
+        query['cursor'] = cursor
+        response['X-Next-Cursor'] = cursor
+        response['Link'] = f'<{request.build_absolute_uri(request.path)}?{query.urlencode()}>; rel="next"'
+    return response
+
+MESSAGE_FIELDS = ('id', 'user_id', 'user_name', 'message', 'timestamp', 'room_id')
+
+def message_data(message):
+    """Same shape as ChatMessageSerializer, built from a values(*MESSAGE_FIELDS) row."""
+    return {
+        'id': message['id'],
+        'user_id': message['user_id'],
+        'user_name': message['user_name'],
+        'message': message['message'],
+        'timestamp': message['timestamp'].isoformat(),
+        'room': str(message['room_id']),
+    }
 
 @api_view(['GET'])
 def get_chat_room_data(request, room_id):
+    # 메시지를 (room, timestamp, id) 인덱스로 한 페이지씩 조회 (기본은 가장 최근 페이지)
+    # before=<커서> 는 더 오래된 메시지, after=<커서> 는 더 새로운 메시지. 페이지 안은 항상 시간순
+    # 이어지는 커서는 X-Before-Cursor / X-After-Cursor 헤더로 전달
+    params = request.query_params
     try:
-        chat_room = ChatRoom.objects.get(room_id=room_id)
-    except ChatRoom.DoesNotExist:
-        return Response({'message': 'Room not found.'}, status=status.HTTP_404_NOT_FOUND)
+        limit = parse_limit(params, MESSAGE_PAGE_SIZE, MESSAGE_MAX_PAGE_SIZE)
+        before = decode_cursor(params['before']) if params.get('before') else None
+        after = decode_cursor(params['after']) if params.get('after') else None
+        if before and after:
+            raise ValueError("Only one of before/after may be given")
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-    chat_messages = ChatMessage.objects.filter(room=chat_room).order_by('timestamp')
-    if not chat_messages.exists():
+    chat_messages = ChatMessage.objects.filter(room_id=room_id)
+    try:
+        if after:
+            when, message_id = after[0], int(after[1])
+            chat_messages = chat_messages.filter(
+                Q(timestamp__gt=when) | Q(timestamp=when, id__gt=message_id)
+            ).order_by('timestamp', 'id')
+        else:
+            chat_messages = chat_messages.order_by('-timestamp', '-id')
+            if before:
+                when, message_id = before[0], int(before[1])
+                chat_messages = chat_messages.filter(Q(timestamp__lt=when) | Q(timestamp=when, id__lt=message_id))
+    except ValueError:
+        return Response({'error': 'Invalid cursor'}, status=status.HTTP_400_BAD_REQUEST)
+
+    messages = list(chat_messages.values(*MESSAGE_FIELDS)[:limit + 1])
+    has_more = len(messages) > limit
+    messages = messages[:limit]
+    if not after:
+        messages.reverse()
+
+    if not messages and not (before or after):
+        if not ChatRoom.objects.filter(room_id=room_id).exists():
+            return Response({'message': 'Room not found.'}, status=status.HTTP_404_NOT_FOUND)
         return Response({'message': 'No messages found for this room.'}, status=status.HTTP_404_NOT_FOUND)
 
-    serializer = ChatMessageSerializer(chat_messages, many=True)
-    return Response(serializer.data, status=status.HTTP_200_OK, content_type="application/json; charset=utf-8")
+    response = Response([message_data(message) for message in messages], status=status.HTTP_200_OK,
+                        content_type="application/json; charset=utf-8")
+    # after 로 조회했으면 커서 이전, before 로 조회했으면 커서 이후에 메시지가 더 있음
+    has_older = bool(after) or (has_more and not after)
+    has_newer = bool(before) or (has_more and bool(after))
+    if messages and has_older:
+        response['X-Before-Cursor'] = encode_cursor(messages[0]['timestamp'], messages[0]['id'])
+    if messages and has_newer:
+        response['X-After-Cursor'] = encode_cursor(messages[-1]['timestamp'], messages[-1]['id'])
+    return response
 
 @api_view(['POST'])
 def join_room(request, room_id):
@@ -104,26 +251,16 @@ def join_room(request, room_id):
     # Fetch the chat room
     chat_room = get_object_or_404(ChatRoom, room_id=room_id)
 
-    # Check if recruitment is complete
-    if chat_room.recruitment_complete:
+    # 모집 완료/정원 확인과 추가를 Redis 방 상태에서 한 번에 처리 (동시 참가에도 정원 초과 없음)
+    result = live_rooms().join(room_id, user_id, user_name)
+    if result.status == NOT_FOUND:
+        return Response({'message': 'Room not found.'}, status=status.HTTP_404_NOT_FOUND)
+    if result.status == CLOSED:
         return Response({'message': 'Room recruitment is complete, no more participants can join'}, status=status.HTTP_403_FORBIDDEN)
-
-    # Check if the room is full
-    if len(chat_room.participants) >= 4:
+    if result.status == FULL:
         return Response({'message': 'Room is full'}, status=status.HTTP_403_FORBIDDEN)
-
-    # Remove the user if already in the list to avoid duplicate entries
-    chat_room.participants = [p for p in chat_room.participants if p['user_id'] != user_id]
-
-    # Add the new participant as a non-leader
-    chat_room.participants.append({'user_id': user_id, 'user_name': user_name, 'leader': False})
-    
-    # Assign the first participant as the leader if there is no leader
-    if not any(p['leader'] for p in chat_room.participants):
-        chat_room.participants[0]['leader'] = True
-
-    # Save changes to the chat room
-    chat_room.save()
+    chat_room.participants = result.participants
+    flush_transition(room_id, result)
 
     # Prepare response data with the updated room information
     response_data = {
@@ -147,23 +284,13 @@ def exit_room(request):
 
     # Fetch the chat room and user
     chat_room = get_object_or_404(ChatRoom, room_id=room_id)
-    user = get_object_or_404(UserInfo, user_id=user_id)
+    user = get_user_profile_or_404(user_id)
     user_name = user.name
 
-    # Check if the user leaving is the leader
-    is_leader = any(p['leader'] for p in chat_room.participants if p['user_id'] == user_id)
-
-    # Remove the user from participants list
-    chat_room.participants = [p for p in chat_room.participants if p['user_id'] != user_id]
-
-    # Reassign the leader if the current leader is leaving and there are remaining participants
-    new_leader_name = None
-    if is_leader and chat_room.participants:
-        chat_room.participants[0]['leader'] = True
-        new_leader_name = chat_room.participants[0]['user_name']
-
-    # Save changes to the chat room
-    chat_room.save()
+    # Remove the user (and hand the leader role to the next participant) in the Redis room state
+    result = live_rooms().leave(room_id, user_id)
+    chat_room.participants = result.participants
+    new_leader_name = result.new_leader
 
     # Send a real-time update to the WebSocket group
     try:
@@ -195,6 +322,9 @@ def exit_room(request):
     except Exception as e:
         logger.error("Failed to send participants_update to WebSocket: %s", str(e))
 
+    # 알림을 먼저 보낸 뒤 DB 에 반영
+    flush_transition(room_id, result)
+
     # Structure the response data similar to join_room
     response_data = {
         'message': 'Exited room successfully',
@@ -213,11 +343,13 @@ def exit_room(request):
 @api_view(['POST'])
 def complete_recruitment(request, room_id):
     user_id = request.data.get('user_id')
-    chat_room = get_object_or_404(ChatRoom, room_id=room_id)
-    leader = next((p for p in chat_room.participants if p['leader']), None)
+    room_state = live_rooms().get(room_id)
+    if room_state is None:
+        return Response({'message': 'Room not found.'}, status=status.HTTP_404_NOT_FOUND)
+    leader = room_state.leader
 
     # Ensure there are at least 2 participants to complete recruitment
-    if len(chat_room.participants) < 2:
+    if len(room_state.participants) < 2:
         return Response(
             {'message': 'At least 2 participants are required to complete recruitment.'},
             status=status.HTTP_403_FORBIDDEN
@@ -230,10 +362,12 @@ def complete_recruitment(request, room_id):
             status=status.HTTP_403_FORBIDDEN
         )
 
-    # Mark recruitment as complete and save to the database
-    chat_room.recruitment_complete = True
-    chat_room.final_participants = chat_room.participants.copy()  # Save current participants to final_participants
-    chat_room.save()  # Ensure changes are saved immediately
+    # Redis 방 상태에 먼저 표시해 이후 참가를 바로 막고, 그 시점의 참가자를 final_participants 로 저장
+    room_state = live_rooms().set_flag(room_id, 'recruitment_complete')
+    ChatRoom.objects.filter(room_id=room_id).update(
+        recruitment_complete=True, final_participants=room_state.participants,
+    )
+    invalidate_room(room_id)
 
     # Notify participants of recruitment completion via WebSocket
     try:
@@ -259,22 +393,25 @@ def settle_payment(request, room_id):
     if not total_amount:
         return Response({'message': 'Total amount is required for settlement.'}, status=status.HTTP_400_BAD_REQUEST)
 
-    chat_room = get_object_or_404(ChatRoom, room_id=room_id)
-    user = get_object_or_404(UserInfo, user_id=user_id)
+    room_state = live_rooms().get(room_id)
+    if room_state is None:
+        return Response({'message': 'Room not found.'}, status=status.HTTP_404_NOT_FOUND)
+    user = get_user_profile_or_404(user_id)
 
     # Check if recruitment has been completed
-    if not chat_room.recruitment_complete:
+    if not room_state.recruitment_complete:
         return Response({'message': 'Recruitment must be completed before settling payment.'}, status=status.HTTP_403_FORBIDDEN)
 
-    participants_count = len(chat_room.participants)
+    participants_count = len(room_state.participants)
     per_person_amount = total_amount / participants_count
     amount_hex = hex(int(per_person_amount * 524288)).upper().replace('0X', '')
 
     deeplink = f"{user.kakaopay_deeplink}{amount_hex}"
 
-    # Mark settlement as complete in the database
-    chat_room.settlement_complete = True
-    chat_room.save()
+    # Mark settlement as complete in the room state and the database
+    live_rooms().set_flag(room_id, 'settlement_complete')
+    ChatRoom.objects.filter(room_id=room_id).update(settlement_complete=True)
+    invalidate_room(room_id, room_list=False)  # 목록에는 정산 여부가 없음
 
     # Notify participants of settlement completion via WebSocket
     channel_layer = get_channel_layer()
@@ -297,14 +434,17 @@ def settle_payment(request, room_id):
 
 @api_view(['GET'])
 def get_room_participants(request, room_id):
-    chat_room = get_object_or_404(ChatRoom, room_id=room_id)
+    # 현재 참가자는 Redis 방 상태에서 바로 읽음
+    room_state = live_rooms().get(room_id)
+    if room_state is None:
+        return Response({'message': 'Room not found.'}, status=status.HTTP_404_NOT_FOUND)
     participants_info = [
         {
             'user_id': participant['user_id'],
             'user_name': participant['user_name'],
             'leader': participant['leader']
         }
-        for participant in chat_room.participants
+        for participant in room_state.participants
     ]
 
     return Response(participants_info, status=status.HTTP_200_OK)
@@ -341,6 +481,7 @@ def get_final_participants(request, room_id):
         'final_participants': chat_room.final_participants,
     }, status=status.HTTP_200_OK)
 
+@cached_response(lambda request, room_id: [room_tag(room_id)])
 @api_view(['GET'])
 def get_final_participants(request, room_id):
     chat_room = get_object_or_404(ChatRoom, room_id=room_id)
@@ -375,23 +516,30 @@ def calculate_and_deeplink(request):
 @api_view(['POST'])
 def leave_all_rooms(request, user_id):
     try:
-        # 사용자가 참가 중인 모든 채팅방 가져오기
-        chat_rooms = ChatRoom.objects.filter(participants__contains=[{'user_id': user_id}])
-        
-        for room in chat_rooms:
-            # 사용자 제거
-            room.participants = [p for p in room.participants if p['user_id'] != user_id]
-            
-            # 방장이 떠나면 새로운 방장 지정
-            if not any(p['leader'] for p in room.participants) and room.participants:
-                room.participants[0]['leader'] = True
-            
-            room.save()
-
+        # 사용자가 참가 중인 채팅방만 ChatParticipant (user_id, room) 인덱스로 조회
+        room_ids = list(ChatParticipant.objects.filter(user_id=user_id).values_list('room_id', flat=True))
+        rooms = live_rooms()
+        for room_id in room_ids:
+            # 사용자 제거, 방장이 떠나면 새로운 방장 지정 (방마다 Redis 방 상태에서 원자적으로)
+            flush_transition(room_id, rooms.leave(room_id, user_id))
         return Response({'message': 'Successfully left all chat rooms'}, status=status.HTTP_200_OK)
     except Exception as e:
         logger.error(f"Error leaving all rooms: {str(e)}")
         return Response({'error': 'Failed to leave all rooms'}, status=status.HTTP_400_BAD_REQUEST)
 
+@api_view(['GET'])
+def my_rooms(request, user_id):
+    # 사용자가 참가 중인 활성 채팅방 (ChatParticipant 인덱스 사용, 전체 방 수와 무관)
+    rooms = (
+        ChatRoom.objects.filter(memberships__user_id=user_id, active=True)
+        .order_by('departure_time', 'room_id')
+        .values(*ROOM_LIST_FIELDS)
+    )
+    return Response([room_list_data(room) for room in rooms])
+
+def redis_pool_stats(request):
+    # 이 프로세스의 Redis 연결 풀 사용량 (사용 중/최대/대기 시간)
+    return JsonResponse(pool_stats())
+
 def map_view(request):
     return render(request, 'map.html')
@@ -1,18 +1,21 @@
 import json
 import logging
 from channels.generic.websocket import AsyncWebsocketConsumer
-from quick_chat.models import QuickChatRoom, QuickChatMessage
+from quick_chat.models import QuickChatRoom, QuickChatMessage, quick_room_participants
 from asgiref.sync import sync_to_async
 from django.apps import apps
 import asyncio
-import aioredis
 from datetime import datetime, timezone
+from signup.profiles import aget_user_profile
+from chat.participants import ALREADY_JOINED
+from chat.presence import PresenceHeartbeat, RoomPresence
+from chat.redis_pool import get_async_redis
 
 logger = logging.getLogger(__name__)
 
 logging.basicConfig(level=logging.INFO)
 
-REDIS_URL = 'redis://127.0.0.1:6379'
+room_presence = RoomPresence(get_async_redis())
 
 class QuickChatConsumer(AsyncWebsocketConsumer):
     countdown_task = None
@@ -23,7 +26,8 @@ class QuickChatConsumer(AsyncWebsocketConsumer):
         self.user_id = self.scope["query_string"].decode().split("user_id=")[1]
         self.room_group_name = f"quick_chat_{self.room_id}"
 
-        self.redis = await aioredis.from_url(REDIS_URL)
+        # 프로세스 공용 풀을 사용 (연결마다 새로 열고 닫지 않음)
+        self.redis = get_async_redis()
 
         QuickChatRoom = apps.get_model("quick_chat", "QuickChatRoom")
         try:
@@ -38,7 +42,8 @@ class QuickChatConsumer(AsyncWebsocketConsumer):
             await self.close()
             return
 
-        await self.add_participant()
+        if not await self.add_participant():
+            return
         await self.channel_layer.group_add(self.room_group_name, self.channel_name)
         await self.accept()
 
@@ -57,43 +62,44 @@ class QuickChatConsumer(AsyncWebsocketConsumer):
 
         await self.remove_participant()
         await self.channel_layer.group_discard(self.room_group_name, self.channel_name)
-        if self.redis:
-            await self.redis.close()
 
     async def add_participant(self):
-        if any(p["user_id"] == self.user_id for p in self.room.quick_participants):
-            logger.info(f"[{self.room_id}] User {self.user_id} is already a participant.")
-            return
-
-        if len(self.room.quick_participants) >= 4:
-            logger.info(f"[{self.room_id}] Room is full. User {self.user_id} cannot join.")
+        """Join with one conditional UPDATE (closed/full/duplicate checks in the database). False if refused."""
+        user = await aget_user_profile(self.user_id)
+        if user is None:
+            logger.info(f"[{self.room_id}] Unknown user {self.user_id}. Closing connection.")
             await self.close()
-            return
+            return False
 
-        user = await sync_to_async(apps.get_model("signup", "UserInfo").objects.get)(user_id=self.user_id)
-        participant_data = {"user_id": self.user_id, "user_name": user.name, "ready": False}
-        self.room.quick_participants.append(participant_data)
-        await sync_to_async(self.room.save)()
-        logger.info(f"[{self.room_id}] User {self.user_id} joined. Current participants: {self.room.quick_participants}")
+        result = await sync_to_async(quick_room_participants.join)(self.room_id, self.user_id, user.name, ready=False)
+        self.room.quick_participants = result.participants
+        if not result.ok:
+            logger.info(f"[{self.room_id}] User {self.user_id} cannot join: {result.status}")
+            await self.close()
+            return False
+        if result.status == ALREADY_JOINED:
+            logger.info(f"[{self.room_id}] User {self.user_id} is already a participant.")
+        else:
+            logger.info(f"[{self.room_id}] User {self.user_id} joined. Current participants: {self.room.quick_participants}")
+        return True
 
     async def mark_ready(self):
-        for participant in self.room.quick_participants:
-            if participant["user_id"] == self.user_id:
-                participant["ready"] = True
-        await sync_to_async(self.room.save)()
+        result = await sync_to_async(quick_room_participants.update)(self.room_id, self.user_id, ready=True)
+        self.room.quick_participants = result.participants
 
     async def remove_participant(self):
-        self.room.quick_participants = [
-            p for p in self.room.quick_participants if p["user_id"] != self.user_id
-        ]
-        await sync_to_async(self.room.save)()
+        result = await sync_to_async(quick_room_participants.leave)(self.room_id, self.user_id)
+        self.room.quick_participants = result.participants
         await self.broadcast_participants_update()
 
         participant_count = len(self.room.quick_participants)
 
         if participant_count == 0:
             try:
-                await sync_to_async(self.room.delete)()
+                # 그 사이 누군가 들어왔으면 지우지 않음
+                await sync_to_async(
+                    QuickChatRoom.objects.filter(quick_room_id=self.room_id, quick_participant_count=0).delete
+                )()
                 logger.info(f"[{self.room_id}] Room deleted as it became empty.")
             except Exception:
                 logger.error(f"[{self.room_id}] Error deleting room.")
@@ -160,11 +166,18 @@ class QuickChatConsumer(AsyncWebsocketConsumer):
 
     async def complete_recruitment(self):
         await asyncio.sleep(2)  # 안정성 추가
+        # 모집을 닫아 이후 참가를 막고, 닫힌 시점의 참가자를 최종 참가자로 저장 (바뀐 필드만 UPDATE)
+        participants = await sync_to_async(quick_room_participants.close)(self.room_id)
+        if participants is None:
+            return
         self.room.quick_recruitment_complete = True
+        self.room.quick_participants = participants
+        self.room.quick_final_participants = list(participants)
+        await sync_to_async(QuickChatRoom.objects.filter(quick_room_id=self.room_id).update)(
+            quick_final_participants=self.room.quick_final_participants,
+        )
 
         # 참가자 목록 저장 후 확인 로그
-        self.room.quick_final_participants = self.room.quick_participants.copy()
-        await sync_to_async(self.room.save)()
         logger.info(f"[{self.room_id}] Final participants saved: {self.room.quick_final_participants}")
 
         await self.transfer_to_quickquick_chat()
@@ -243,14 +256,14 @@ class QuickChatConsumer(AsyncWebsocketConsumer):
 
 
 
-class QuickQuickChatConsumer(AsyncWebsocketConsumer):
+class QuickQuickChatConsumer(PresenceHeartbeat, AsyncWebsocketConsumer):
     async def connect(self):
         self.room_id = self.scope['url_route']['kwargs']['room_id']
         self.room_group_name = f'quickquick_chat_{self.room_id}'
         self.user_id = self.scope['query_string'].decode().split('user_id=')[1]
 
-        # Initialize Redis connection
-        self.redis = await aioredis.from_url(REDIS_URL)
+        # Shared per-process Redis pool
+        self.redis = get_async_redis()
 
         # Fetch the QuickQuickChatRoom instance
         try:
@@ -267,26 +280,30 @@ class QuickQuickChatConsumer(AsyncWebsocketConsumer):
         self.user_name = user_info.get('user_name', 'Unknown')
 
         # Add user to participants list in Redis
-        await self.add_participant_to_redis()
+        presence = await self.add_participant_to_redis()
 
         # Join the WebSocket group
         await self.channel_layer.group_add(self.room_group_name, self.channel_name)
         await self.accept()
 
+        # Keep this connection's presence entry alive while the socket is open
+        self.start_presence_heartbeat(room_presence, self.room_group_name)
+
         # Broadcast updated participants list
-        await self.broadcast_participants_update()
+        await self.broadcast_participants_update(presence.members)
         logger.info(f"[{self.room_id}] User {self.user_name} connected to QuickQuickChat.")
 
     async def disconnect(self, close_code):
+        self.stop_presence_heartbeat()
+
         # Remove user from participants list in Redis
-        await self.remove_participant_from_redis()
+        presence = await self.remove_participant_from_redis()
 
-        # Leave the WebSocket group and close Redis connection
+        # Leave the WebSocket group
         await self.channel_layer.group_discard(self.room_group_name, self.channel_name)
-        await self.redis.close()
 
         # Broadcast updated participants list
-        await self.broadcast_participants_update()
+        await self.broadcast_participants_update(presence.members)
         logger.info(f"[{self.room_id}] User {self.user_name} disconnected.")
 
     async def receive(self, text_data):
@@ -389,11 +406,8 @@ class QuickQuickChatConsumer(AsyncWebsocketConsumer):
             'participants': participants
         }))
 
-    async def broadcast_participants_update(self):
-        """Broadcast updated participant list from Redis."""
-        participants = await self.redis.hgetall(f'participants_{self.room_id}')
-        participants_list = [json.loads(value) for value in participants.values()]
-
+    async def broadcast_participants_update(self, participants_list):
+        """Broadcast the participant list returned by the last presence change."""
         logger.info(f"[{self.room_id}] Broadcasting participants: {participants_list}")
         await self.channel_layer.group_send(self.room_group_name, {
             'type': 'participants_update',
@@ -401,15 +415,15 @@ class QuickQuickChatConsumer(AsyncWebsocketConsumer):
         })
 
     async def add_participant_to_redis(self):
-        """Add participant to Redis using unique keys."""
-        await self.redis.hset(
-            f'participants_{self.room_id}', self.user_id,
-            json.dumps({'user_id': self.user_id, 'user_name': self.user_name})
+        """Add participant to Redis and get the full list back in the same round-trip."""
+        return await room_presence.connect(
+            self.room_group_name, self.user_id, self.channel_name,
+            data={'user_id': self.user_id, 'user_name': self.user_name}
         )
 
     async def remove_participant_from_redis(self):
-        """Remove participant from Redis."""
-        await self.redis.hdel(f'participants_{self.room_id}', self.user_id)
+        """Remove participant from Redis and get the remaining list back."""
+        return await room_presence.disconnect(self.room_group_name, self.user_id, self.channel_name)
 
     async def save_message_to_storage(self, message, link=None):
         """Save message to Redis and the database."""
@@ -442,11 +456,9 @@ class QuickQuickChatConsumer(AsyncWebsocketConsumer):
                 return True
         return False
 
-    @sync_to_async
-    def get_user_info(self, user_id):
-        """Retrieve user information from UserInfo model."""
-        User = apps.get_model('signup', 'UserInfo')
-        user = User.objects.filter(user_id=user_id).first()
+    async def get_user_info(self, user_id):
+        """Retrieve user information from the cached user profile."""
+        user = await aget_user_profile(user_id)
         if user:
             return {'user_name': user.name, 'kakaopay_deeplink': user.kakaopay_deeplink}
         return {'user_name': 'Unknown', 'kakaopay_deeplink': ''}
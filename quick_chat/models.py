@@ -1,6 +1,7 @@
 from django.db import models
 import uuid
 from datetime import datetime
+from chat.participants import ParticipantList
 
 # QuickChatRoom for quick_match_chat_page.dart
 class QuickChatRoom(models.Model):
@@ -111,3 +112,9 @@ class QuickQuickChatMessage(models.Model):
 
     def __str__(self):
         return f'{self.user_name}: {self.quickquick_message[:20]}'
+
+
+# update_participants/quick_exit_room 에서 쓰는 원자적 참가자 변경 API
+quick_room_participants = ParticipantList(
+    QuickChatRoom, 'quick_participants', 'quick_participant_count', 'quick_recruitment_complete', 'quick_max_participants',
+)
@@ -7,8 +7,10 @@ from rest_framework.response import Response
 from rest_framework import status
 from .models import QuickQuickChatRoom 
 from asgiref.sync import async_to_sync
-from .models import QuickChatRoom
-from signup.models import UserInfo
+from .models import QuickChatRoom, quick_room_participants
+from chat.participants import CLOSED, FULL, NOT_FOUND
+from signup.profiles import get_user_profile_or_404
+from taxi.eta import eta_for_trip
 from channels.layers import get_channel_layer
 from django.apps import apps
 import json
@@ -17,12 +19,13 @@ import logging
 logger = logging.getLogger(__name__)
 # Helper function: Update participants in a room
 def update_participants(room, user_id, user_name=None, action="add"):
-    """Add or remove participants in a room."""
-    if action == "add" and user_id not in [p['user_id'] for p in room.quick_participants]:
-        room.quick_participants.append({'user_id': user_id, 'user_name': user_name, 'ready': False})
-    elif action == "remove":
-        room.quick_participants = [p for p in room.quick_participants if p['user_id'] != user_id]
-    room.save()
+    """Add or remove participants in a room with one conditional UPDATE. Returns the MutationResult."""
+    if action == "add":
+        result = quick_room_participants.join(room.quick_room_id, user_id, user_name, ready=False)
+    else:
+        result = quick_room_participants.leave(room.quick_room_id, user_id)
+    room.quick_participants = result.participants
+    return result
 
 # Helper function: Generate KakaoPay deeplink
 def generate_kakaopay_deeplink(base_link, amount_hex):
@@ -81,7 +84,7 @@ def match_or_create_room(request):
             return JsonResponse({'error': 'Missing required fields'}, status=400)
 
         if not user_name:
-            user_name = get_object_or_404(UserInfo, user_id=user_id).name
+            user_name = get_user_profile_or_404(user_id).name
 
         channel_layer = get_channel_layer()
 
@@ -106,7 +109,16 @@ def match_or_create_room(request):
             logger.info(f"Created new room: {room.quick_room_id}")
 
         # Add user to the room if not already present
-        update_participants(room, user_id, user_name, action="add")
+        if not update_participants(room, user_id, user_name, action="add").ok:
+            # 그 사이 다른 사용자가 방을 채웠거나 모집이 끝났으면 새 방을 만든다
+            room = QuickChatRoom.objects.create(
+                quick_departure=departure,
+                quick_destination=destination,
+                quick_room_name=f'{departure} - {destination}'
+            )
+            created = True
+            logger.info(f"Created new room: {room.quick_room_id}")
+            update_participants(room, user_id, user_name, action="add")
         logger.info(f"User {user_id} joined room {room.quick_room_id}")
 
         # Notify WebSocket group about the new participant
@@ -129,12 +141,13 @@ def match_or_create_room(request):
                 }
             )
 
-        user = get_object_or_404(UserInfo, user_id=user_id)
+        user = get_user_profile_or_404(user_id)
         return JsonResponse({
             'room_id': str(room.quick_room_id),
             'participants': room.quick_participants,
             'kakaopay_deeplink': user.kakaopay_deeplink,
             'created': created,  # Indicate if a new room was created
+            'eta': eta_for_trip(data),  # Road-network ETA when coordinates are provided
         })
 
     except json.JSONDecodeError:
@@ -162,13 +175,19 @@ def quick_join_room(request, room_id):
             return JsonResponse({'error': 'Room recruitment is complete'}, status=403)
 
         if not user_name:
-            user_name = get_object_or_404(UserInfo, user_id=user_id).name
+            user_name = get_user_profile_or_404(user_id).name
 
-        update_participants(room, user_id, user_name, action="add")
+        result = update_participants(room, user_id, user_name, action="add")
+        if result.status == NOT_FOUND:
+            return JsonResponse({'error': 'Room not found'}, status=404)
+        if result.status == CLOSED:
+            return JsonResponse({'error': 'Room recruitment is complete'}, status=403)
+        if result.status == FULL:
+            return JsonResponse({'error': 'Room is full'}, status=403)
 
         finalize_recruitment_if_needed(room)
 
-        user = get_object_or_404(UserInfo, user_id=user_id)
+        user = get_user_profile_or_404(user_id)
         return JsonResponse({
             'participants': room.quick_participants,
             'kakaopay_deeplink': user.kakaopay_deeplink
@@ -204,15 +223,14 @@ def quick_exit_room(request):
             return JsonResponse({'status': 'room_already_deleted'})
 
         # 참가자 제거 (이미 나갔는지 확인)
-        if user_id not in [p["user_id"] for p in room.quick_participants]:
+        result = update_participants(room, user_id, action="remove")
+        if result.status == NOT_FOUND:
+            logger.warning(f"Room {room_id} does not exist. Skipping.")
+            return JsonResponse({'status': 'room_already_deleted'})
+        if not result.ok:
             logger.info(f"User {user_id} already left room {room_id}. Skipping.")
             return JsonResponse({'status': 'user_already_left'})
 
-        room.quick_participants = [
-            p for p in room.quick_participants if p["user_id"] != user_id
-        ]
-        room.save()
-
         logger.info(f"User {user_id} left room {room_id}. Remaining participants: {len(room.quick_participants)}")
 
         # 남은 참가자 수에 따른 추가 처리
@@ -252,7 +270,7 @@ def calculate_and_deeplink(request):
         amount_hex = hex(int(per_person_amount * 524288)).upper().replace('0X', '')
 
         # Retrieve the initiating user's KakaoPay deeplink base URL
-        user = get_object_or_404(UserInfo, user_id=user_id)
+        user = get_user_profile_or_404(user_id)
         deeplink = generate_kakaopay_deeplink(user.kakaopay_deeplink, amount_hex)
 
         # Update the room's settlement status
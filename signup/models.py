@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 
 class UserInfo(models.Model):
     user_id = models.CharField(max_length=50, unique=True, primary_key=True)
@@ -10,3 +10,18 @@ class UserInfo(models.Model):
     class Meta:
         managed = True
         db_table = 'user'
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self.invalidate_profile()
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        self.invalidate_profile()
+        return result
+
+    def invalidate_profile(self):
+        # 커밋 후에 캐시를 비워야 다른 요청이 이전 값을 다시 캐시하지 않음
+        from .profiles import invalidate_user_profile
+        user_id = self.user_id
+        transaction.on_commit(lambda: invalidate_user_profile(user_id))
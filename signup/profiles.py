@@ -0,0 +1,124 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import Http404
+
+from .models import UserInfo
+
+logger = logging.getLogger(__name__)
+
+# 프로세스 내 LRU 크기와 보관 시간 (다른 프로세스의 변경은 이 시간 안에 반영됨)
+PROFILE_LRU_SIZE = getattr(settings, 'SIGNUP_PROFILE_LRU_SIZE', 2048)
+PROFILE_LRU_TTL = getattr(settings, 'SIGNUP_PROFILE_LRU_TTL', 30)
+# Redis(CACHES) 에 보관하는 시간 (초)
+PROFILE_CACHE_TIMEOUT = getattr(settings, 'SIGNUP_PROFILE_CACHE_TIMEOUT', 3600)
+
+PROFILE_KEY_PREFIX = 'signup:profile:'
+
+
+class UserProfile(NamedTuple):
+    """Public, cacheable part of UserInfo (never the password hash)."""
+    user_id: str
+    name: str
+    kakaopay_deeplink: str
+
+
+class ProfileLRU:
+    """Small thread-safe LRU of user_id -> (UserProfile, cached_at)."""
+
+    def __init__(self, size=PROFILE_LRU_SIZE, ttl=PROFILE_LRU_TTL):
+        self.size = size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            profile, cached_at = entry
+            if time.monotonic() - cached_at > self.ttl:
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return profile
+
+    def put(self, profile):
+        with self._lock:
+            self._entries[profile.user_id] = (profile, time.monotonic())
+            self._entries.move_to_end(profile.user_id)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def discard(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+
+_lru = ProfileLRU()
+
+
+def get_user_profile(user_id):
+    """
+    UserProfile for user_id, or None if there is no such user.
+
+    Lookups go process LRU -> Redis -> MySQL, filling the faster layers on
+    the way back. Missing users are not cached, so a fresh signup is seen
+    immediately.
+    """
+    user_id = str(user_id)
+    profile = _lru.get(user_id)
+    if profile is not None:
+        return profile
+
+    key = PROFILE_KEY_PREFIX + user_id
+    try:
+        cached = cache.get(key)
+    except Exception as e:
+        logger.error("User profile cache lookup failed: %s", str(e))
+        cached = None
+    if cached is not None:
+        profile = UserProfile(*cached)
+    else:
+        row = UserInfo.objects.filter(user_id=user_id).values_list('user_id', 'name', 'kakaopay_deeplink').first()
+        if row is None:
+            return None
+        profile = UserProfile(*row)
+        try:
+            cache.set(key, tuple(profile), PROFILE_CACHE_TIMEOUT)
+        except Exception as e:
+            logger.error("Failed to cache user profile: %s", str(e))
+    _lru.put(profile)
+    return profile
+
+
+async def aget_user_profile(user_id):
+    """Async get_user_profile; LRU hits are answered without leaving the event loop."""
+    profile = _lru.get(str(user_id))
+    if profile is not None:
+        return profile
+    return await sync_to_async(get_user_profile)(user_id)
+
+
+def get_user_profile_or_404(user_id):
+    profile = get_user_profile(user_id)
+    if profile is None:
+        raise Http404("No UserInfo matches the given query.")
+    return profile
+
+
+def invalidate_user_profile(user_id):
+    """Drop a user's cached profile from this process and from Redis."""
+    user_id = str(user_id)
+    _lru.discard(user_id)
+    try:
+        cache.delete(PROFILE_KEY_PREFIX + user_id)
+    except Exception as e:
+        logger.error("Failed to invalidate user profile %s: %s", user_id, str(e))
@@ -4,6 +4,7 @@ from rest_framework.parsers import JSONParser
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, parser_classes
 from .models import UserInfo
+from .profiles import get_user_profile_or_404
 from .serializers import UserInfoSerializers
 from .crawl import Crawl, CustomException
 from django.http import JsonResponse
@@ -80,7 +81,7 @@ def login_user(request):
         
 @api_view(['GET'])
 def get_user_info(request, user_id):
-    user = get_object_or_404(UserInfo, user_id=user_id)
+    user = get_user_profile_or_404(user_id)
     data = {
         'user_id': user.user_id,
         'user_name': user.name,
@@ -92,7 +93,7 @@ def get_user_info(request, user_id):
 def get_user_info2(request, user_id):
     try:
         # UserInfo 모델에서 user_id로 사용자 정보 가져오기
-        user = get_object_or_404(UserInfo, user_id=user_id)
+        user = get_user_profile_or_404(user_id)
         
         # 사용자 정보 데이터 구성
         data = {
@@ -0,0 +1,106 @@
+import threading
+
+import numpy as np
+from django.conf import settings
+
+from .linktable import get_link_table
+
+# 카카오맵 level 은 숫자가 클수록 축소(넓은 지역). 이 level 보다 크면 링크 대신 클러스터 반환
+CLUSTER_LEVEL = getattr(settings, 'TAXI_CLUSTER_LEVEL', 5)
+# level 1 에서의 클러스터 격자 크기 (도 단위), level 이 1 오를 때마다 두 배
+CLUSTER_BASE_CELL_DEG = getattr(settings, 'TAXI_CLUSTER_BASE_CELL_DEG', 0.0005)
+MAX_LEVEL = 14
+
+
+def parse_zoom(value):
+    """Parse a Kakao map level (1-14)."""
+    try:
+        level = int(value)
+    except (TypeError, ValueError):
+        raise ValueError("zoom must be an integer map level")
+    if not 1 <= level <= MAX_LEVEL:
+        raise ValueError(f"zoom must be between 1 and {MAX_LEVEL}")
+    return level
+
+
+def should_cluster(level):
+    return level is not None and level > CLUSTER_LEVEL
+
+
+class ZoomClusters:
+    """
+    Link midpoints snapped to a per-level grid, computed once per level.
+
+    `membership[i]` is the cluster index of link i; centroids and counts are
+    per cluster. Congestion is aggregated on top of this at request time.
+    """
+
+    def __init__(self, table, level):
+        self.table = table
+        self.level = level
+        cell = CLUSTER_BASE_CELL_DEG * (2 ** (level - 1))
+
+        mid_lat = (np.frombuffer(table.s_lat, dtype=np.float64) + np.frombuffer(table.d_lat, dtype=np.float64)) / 2
+        mid_lng = (np.frombuffer(table.s_long, dtype=np.float64) + np.frombuffer(table.d_long, dtype=np.float64)) / 2
+        keys = np.stack([np.floor(mid_lat / cell), np.floor(mid_lng / cell)], axis=1).astype(np.int64)
+
+        if len(keys):
+            _, membership, counts = np.unique(keys, axis=0, return_inverse=True, return_counts=True)
+            membership = membership.reshape(-1)
+        else:
+            membership = np.zeros(0, dtype=np.int64)
+            counts = np.zeros(0, dtype=np.int64)
+        self.membership = membership
+        self.counts = counts
+        self.lat = np.bincount(membership, weights=mid_lat, minlength=len(counts)) / np.maximum(counts, 1)
+        self.lng = np.bincount(membership, weights=mid_lng, minlength=len(counts)) / np.maximum(counts, 1)
+
+    def select(self, bbox=None):
+        """Boolean mask of clusters whose centroid lies in bbox (all clusters if None)."""
+        if bbox is None:
+            return np.ones(len(self.counts), dtype=bool)
+        min_lng, min_lat, max_lng, max_lat = bbox
+        return (self.lng >= min_lng) & (self.lng <= max_lng) & (self.lat >= min_lat) & (self.lat <= max_lat)
+
+    def aggregate(self, selected, grades):
+        """
+        Build cluster dicts for the selected clusters.
+
+        `grades` is a float array of congGrade per link, NaN where unknown.
+        """
+        known = ~np.isnan(grades)
+        n = len(self.counts)
+        graded_counts = np.bincount(self.membership[known], minlength=n)
+        grade_sums = np.bincount(self.membership[known], weights=grades[known], minlength=n)
+        worst = np.full(n, -1.0)
+        np.maximum.at(worst, self.membership[known], grades[known])
+
+        clusters = []
+        for c in np.flatnonzero(selected):
+            graded = graded_counts[c]
+            clusters.append({
+                'lat': round(float(self.lat[c]), 6),
+                'lng': round(float(self.lng[c]), 6),
+                'count': int(self.counts[c]),
+                'worst_cong_grade': int(worst[c]) if graded else None,
+                'avg_cong_grade': round(float(grade_sums[c] / graded), 2) if graded else None,
+            })
+        return clusters
+
+
+_clusters = {}
+_clusters_table = None
+_clusters_lock = threading.Lock()
+
+
+def get_zoom_clusters(level):
+    """Return the cached clusters for a level, dropping the cache when the link table reloads."""
+    global _clusters_table
+    table = get_link_table()
+    with _clusters_lock:
+        if _clusters_table is not table:
+            _clusters.clear()
+            _clusters_table = table
+        if level not in _clusters:
+            _clusters[level] = ZoomClusters(table, level)
+        return _clusters[level]
@@ -0,0 +1,314 @@
+import json
+import logging
+import threading
+import time
+from hashlib import blake2b
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+
+from .timeseries import record_samples
+from .traffic import FANOUT_DEADLINE, circuit_breaker, fetch_cong_grades
+
+logger = logging.getLogger(__name__)
+
+# congGrade 캐시 설정 (settings 에서 덮어쓸 수 있음)
+CACHE_BACKEND = getattr(settings, 'TAXI_CONGESTION_CACHE', 'memory')  # 'memory' 또는 'redis'
+CACHE_REDIS_URL = getattr(settings, 'TAXI_CONGESTION_REDIS_URL', 'redis://127.0.0.1:6379/0')
+CACHE_TTL = getattr(settings, 'TAXI_CONGESTION_TTL', 120)  # 이 시간이 지나면 백그라운드 갱신 (초)
+CACHE_MAX_STALE = getattr(settings, 'TAXI_CONGESTION_MAX_STALE', 900)  # 이 시간이 지나면 캐시 미스로 처리 (초)
+
+REDIS_KEY_PREFIX = 'taxi:cong:'
+REDIS_VERSION_KEY = 'taxi:cong-version'
+
+# 혼잡도 변경 알림을 받는 WebSocket 그룹
+CONGESTION_GROUP = 'taxi_congestion'
+PUBLISH_BATCH_SIZE = 500
+
+
+def is_valid_grade(value):
+    """Only real congGrade values are cached, never error strings."""
+    return isinstance(value, str) and value.isdigit()
+
+
+def _grade_digest(link_id, grade):
+    return int.from_bytes(blake2b(f'{link_id}:{grade}'.encode(), digest_size=8).digest(), 'big')
+
+
+class MemoryBackend:
+    """Per-process dict of link_id -> (cong_grade, fetched_at)."""
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        # 저장된 (link_id, 등급) 쌍 해시의 XOR. 같은 등급을 가진 프로세스끼리는 같은 버전이 되어
+        # 다른 워커가 만든 ETag 로도 304 를 줄 수 있음
+        self._version = 0
+
+    def get_many(self, link_ids):
+        with self._lock:
+            return {link_id: self._entries[link_id] for link_id in link_ids if link_id in self._entries}
+
+    def set_many(self, entries):
+        """Store entries and return {link_id: cong_grade} for the grades that changed."""
+        with self._lock:
+            changed = {
+                link_id: grade
+                for link_id, (grade, _) in entries.items()
+                if link_id not in self._entries or self._entries[link_id][0] != grade
+            }
+            for link_id, grade in changed.items():
+                if link_id in self._entries:
+                    self._version ^= _grade_digest(link_id, self._entries[link_id][0])
+                self._version ^= _grade_digest(link_id, grade)
+            self._entries.update(entries)
+        return changed
+
+    def version(self):
+        return format(self._version, '016x')
+
+
+class RedisBackend:
+    """Shared entries stored as one Redis key per link_id, expired after MAX_STALE."""
+
+    def __init__(self, url):
+        # chat 과 같은 프로세스 공용 연결 풀 사용 (URL 별로 하나)
+        from chat.redis_pool import get_redis
+        self._redis = get_redis(url)
+
+    def get_many(self, link_ids):
+        link_ids = list(link_ids)
+        if not link_ids:
+            return {}
+        values = self._redis.mget([REDIS_KEY_PREFIX + link_id for link_id in link_ids])
+        entries = {}
+        for link_id, value in zip(link_ids, values):
+            if value is not None:
+                data = json.loads(value)
+                entries[link_id] = (data['g'], data['t'])
+        return entries
+
+    def set_many(self, entries):
+        """Store entries and return {link_id: cong_grade} for the grades that changed."""
+        if not entries:
+            return {}
+        pipe = self._redis.pipeline(transaction=True)
+        for link_id, (grade, fetched_at) in entries.items():
+            # GETSET 으로 이전 값을 함께 받아 실제로 등급이 바뀌었는지 확인
+            # (SET ... GET 은 Redis 6.2 부터라 MULTI 안에서 GETSET + EXPIRE)
+            key = REDIS_KEY_PREFIX + link_id
+            pipe.getset(key, json.dumps({'g': grade, 't': fetched_at}))
+            pipe.expire(key, int(CACHE_MAX_STALE))
+        previous = pipe.execute()[::2]
+        changed = {
+            link_id: grade
+            for old, (link_id, (grade, _)) in zip(previous, entries.items())
+            if old is None or json.loads(old)['g'] != grade
+        }
+        if changed:
+            self._redis.incr(REDIS_VERSION_KEY)
+        return changed
+
+    def version(self):
+        return (self._redis.get(REDIS_VERSION_KEY) or b'0').decode()
+
+
+class CongestionCache:
+    """
+    TTL cache of congGrade per link_id with stale-while-revalidate.
+
+    Entries younger than ttl are served as-is. Entries between ttl and
+    max_stale are served marked stale while a background refresh runs.
+    Anything older (or absent) is fetched from the traffic API inline.
+    """
+
+    def __init__(self, backend, ttl=CACHE_TTL, max_stale=CACHE_MAX_STALE):
+        self.backend = backend
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self._refreshing = set()
+        self._refresh_lock = threading.Lock()
+        self._refresh_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='traffic-refresh')
+        self._stats_lock = threading.Lock()
+        self._stats = {'hits': 0, 'stale_hits': 0, 'misses': 0, 'refreshes': 0, 'age_total': 0.0, 'age_max': 0.0}
+
+    def get_cong_grades(self, link_ids):
+        """Return {link_id: (cong_grade, stale)}, calling upstream only for misses."""
+        link_ids = list(dict.fromkeys(link_ids))
+        now = time.time()
+        cached = self.backend.get_many(link_ids)
+
+        results = {}
+        expired = []
+        missing = []
+        ages = []
+        for link_id in link_ids:
+            entry = cached.get(link_id)
+            age = now - entry[1] if entry else None
+            if entry is None or age > self.max_stale:
+                missing.append(link_id)
+            elif age > self.ttl:
+                results[link_id] = (entry[0], True)
+                expired.append(link_id)
+                ages.append(age)
+            else:
+                results[link_id] = (entry[0], False)
+                ages.append(age)
+
+        self._record(hits=len(ages) - len(expired), stale_hits=len(expired), misses=len(missing), ages=ages)
+
+        if expired:
+            self.refresh_in_background(expired)
+        if missing:
+            results.update(self.refresh(missing))
+        return results
+
+    def version(self):
+        """Opaque snapshot version, changed whenever any cached grade changes."""
+        return self.backend.version()
+
+    def cached_grades(self, link_ids):
+        """Return {link_id: cong_grade} for cached links only, never calling upstream inline."""
+        link_ids = list(link_ids)
+        now = time.time()
+        grades = {}
+        expired = []
+        for link_id, (grade, fetched_at) in self.backend.get_many(link_ids).items():
+            age = now - fetched_at
+            if age <= self.max_stale:
+                grades[link_id] = grade
+                if age > self.ttl:
+                    expired.append(link_id)
+        if expired:
+            self.refresh_in_background(expired)
+        return grades
+
+    def refresh(self, link_ids, deadline=FANOUT_DEADLINE, record=False):
+        """
+        Fetch link_ids from upstream and store every valid grade; lookups that
+        miss the deadline are stored when they finish. With record=True the
+        grades are also appended to the history (never on the request path).
+        """
+        started = time.time()
+        fetched = fetch_cong_grades(
+            link_ids, deadline=deadline,
+            on_late=lambda link_id, grade: self._store_late(link_id, grade, started, record),
+        )
+        self._store({
+            link_id: grade
+            for link_id, (grade, stale) in fetched.items()
+            if not stale and is_valid_grade(grade)
+        }, record=record)
+        return fetched
+
+    def _store(self, fresh, since=None, record=False):
+        """Cache, publish (and optionally record) fresh grades; with `since`, skip links already refreshed after that time."""
+        if since is not None and fresh:
+            cached = self.backend.get_many(fresh)
+            fresh = {link_id: grade for link_id, grade in fresh.items() if link_id not in cached or cached[link_id][1] < since}
+        if not fresh:
+            return
+        now = time.time()
+        changed = self.backend.set_many({link_id: (grade, now) for link_id, grade in fresh.items()})
+        if changed:
+            publish_changes(changed, self.version())
+        if not record:
+            return
+        try:
+            record_samples(fresh, now)
+        except Exception as e:
+            logger.error("Failed to record congestion samples: %s", str(e))
+
+    def _store_late(self, link_id, grade, started, record):
+        # 조회 스레드에서 불리므로 저장 (DB 기록 포함) 은 갱신 스레드로 넘김
+        if is_valid_grade(grade):
+            self._refresh_executor.submit(self._store, {link_id: grade}, started, record)
+
+    def refresh_in_background(self, link_ids):
+        with self._refresh_lock:
+            pending = [link_id for link_id in link_ids if link_id not in self._refreshing]
+            self._refreshing.update(pending)
+        if pending:
+            self._refresh_executor.submit(self._background_refresh, pending)
+
+    def _background_refresh(self, link_ids):
+        try:
+            # 요청 밖 (갱신 스레드) 이므로 이력도 함께 기록
+            self.refresh(link_ids, record=True)
+            self._record(refreshes=1)
+        except Exception:
+            logger.exception("Background congestion refresh failed for %d links", len(link_ids))
+        finally:
+            with self._refresh_lock:
+                self._refreshing.difference_update(link_ids)
+
+    def close(self):
+        """Wait for pending background refreshes and stop the refresh thread."""
+        self._refresh_executor.shutdown(wait=True)
+
+    def _record(self, hits=0, stale_hits=0, misses=0, refreshes=0, ages=()):
+        with self._stats_lock:
+            self._stats['hits'] += hits
+            self._stats['stale_hits'] += stale_hits
+            self._stats['misses'] += misses
+            self._stats['refreshes'] += refreshes
+            for age in ages:
+                self._stats['age_total'] += age
+                self._stats['age_max'] = max(self._stats['age_max'], age)
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        served = stats['hits'] + stats['stale_hits']
+        return {
+            'backend': type(self.backend).__name__,
+            'ttl': self.ttl,
+            'max_stale': self.max_stale,
+            'hits': stats['hits'],
+            'stale_hits': stats['stale_hits'],
+            'misses': stats['misses'],
+            'refreshes': stats['refreshes'],
+            'avg_age': round(stats['age_total'] / served, 2) if served else 0.0,
+            'max_age': round(stats['age_max'], 2),
+            'circuit': circuit_breaker.state,
+        }
+
+
+def publish_changes(changed, version):
+    """Push changed grades to connected map clients (taxi.consumers.TaxiConsumer)."""
+    try:
+        channel_layer = get_channel_layer()
+        items = list(changed.items())
+        for start in range(0, len(items), PUBLISH_BATCH_SIZE):
+            async_to_sync(channel_layer.group_send)(
+                CONGESTION_GROUP,
+                {
+                    'type': 'congestion_delta',
+                    'version': version,
+                    'changes': dict(items[start:start + PUBLISH_BATCH_SIZE]),
+                }
+            )
+    except Exception as e:
+        logger.error("Failed to publish congestion changes: %s", str(e))
+
+
+_cache = None
+
+
+def get_congestion_cache():
+    """Process-wide congestion cache built from settings."""
+    global _cache
+    if _cache is None:
+        backend = RedisBackend(CACHE_REDIS_URL) if CACHE_BACKEND == 'redis' else MemoryBackend()
+        _cache = CongestionCache(backend)
+    return _cache
+
+
+def reset_congestion_cache():
+    """Drop the process-wide cache so the next lookup starts cold (benchmark harness)."""
+    global _cache
+    if _cache is not None:
+        _cache.close()
+    _cache = None
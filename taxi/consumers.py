@@ -0,0 +1,71 @@
+from channels.generic.websocket import AsyncWebsocketConsumer
+from asgiref.sync import sync_to_async
+import json
+import logging
+
+from .congestion import CONGESTION_GROUP, get_congestion_cache
+from .linktable import get_link_table
+from .spatial import BBoxError, get_spatial_index, parse_bbox
+
+logger = logging.getLogger(__name__)
+
+class TaxiConsumer(AsyncWebsocketConsumer):
+    """
+    Pushes congGrade changes for the links inside the client's bounding box.
+
+    Client sends {"command": "subscribe", "bbox": "min_lng,min_lat,max_lng,max_lat"}
+    (or bbox as an object with those keys) and receives one snapshot frame, then delta frames for changed links only.
+    """
+
+    async def connect(self):
+        self.link_ids = set()
+        await self.channel_layer.group_add(CONGESTION_GROUP, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, close_code):
+        await self.channel_layer.group_discard(CONGESTION_GROUP, self.channel_name)
+
+    async def receive(self, text_data):
+        try:
+            data = json.loads(text_data)
+            if not isinstance(data, dict):
+                await self.send(text_data=json.dumps({'error': 'Message must be a JSON object'}))
+                return
+            command = data.get('command')
+
+            if command == 'subscribe':
+                bbox = parse_bbox(data['bbox'])
+                self.link_ids = await sync_to_async(self.links_in_bbox)(bbox)
+                grades = await sync_to_async(get_congestion_cache().cached_grades)(self.link_ids)
+                await self.send(text_data=json.dumps({
+                    'type': 'snapshot',
+                    'links': grades,
+                }))
+            elif command == 'unsubscribe':
+                self.link_ids = set()
+            else:
+                await self.send(text_data=json.dumps({'error': f"Unknown command: {command}"}))
+        except json.JSONDecodeError:
+            await self.send(text_data=json.dumps({'error': 'Invalid JSON'}))
+        except KeyError:
+            await self.send(text_data=json.dumps({'error': "Message missing 'bbox'"}))
+        except BBoxError as e:
+            await self.send(text_data=json.dumps({'error': str(e)}))
+
+    def links_in_bbox(self, bbox):
+        table = get_link_table()
+        return {table.link_id(i) for i in get_spatial_index().query(*bbox)}
+
+    async def congestion_delta(self, event):
+        """Forward only the changed links this client is watching."""
+        changes = {
+            link_id: grade
+            for link_id, grade in event['changes'].items()
+            if link_id in self.link_ids
+        }
+        if changes:
+            await self.send(text_data=json.dumps({
+                'type': 'delta',
+                'version': event.get('version'),
+                'links': changes,
+            }))
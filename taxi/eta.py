@@ -0,0 +1,181 @@
+import heapq
+import math
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from django.conf import settings
+
+from .congestion import get_congestion_cache
+from .linktable import get_link_table
+
+# congGrade 별 주행 속도 (km/h), 정보가 없으면 DEFAULT_SPEED_KMH
+SPEED_KMH = getattr(settings, 'TAXI_ETA_SPEED_KMH', {'1': 50.0, '2': 25.0, '3': 10.0})
+DEFAULT_SPEED_KMH = getattr(settings, 'TAXI_ETA_DEFAULT_SPEED_KMH', 30.0)
+# 출발/도착 좌표를 도로 노드에 붙일 수 있는 최대 거리 (m)
+MAX_SNAP_METERS = getattr(settings, 'TAXI_ETA_MAX_SNAP_METERS', 1000.0)
+ROUTE_CACHE_SIZE = getattr(settings, 'TAXI_ETA_CACHE_SIZE', 4096)
+
+EARTH_RADIUS_M = 6371000.0
+NODE_SCALE = 100000  # 끝점 좌표를 1e-5도 단위로 맞춰 같은 교차점을 한 노드로 취급
+
+
+def haversine_m(lat1, lng1, lat2, lng2):
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lng2 - lng1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+class RoadGraph:
+    """
+    Directed road graph built once from the link table.
+
+    Nodes are link endpoints, edges are links weighted by travel time at the
+    speed implied by the link's cached congGrade. Routes are answered with A*
+    (straight-line distance at the top speed as heuristic) and kept in an LRU
+    keyed by (source node, target node, congestion version).
+    """
+
+    def __init__(self, table):
+        self.table = table
+        node_ids = {}
+        node_lat = []
+        node_lng = []
+
+        def node(lat, lng):
+            key = (round(lat * NODE_SCALE), round(lng * NODE_SCALE))
+            if key not in node_ids:
+                node_ids[key] = len(node_lat)
+                node_lat.append(lat)
+                node_lng.append(lng)
+            return node_ids[key]
+
+        self.edge_from = []
+        self.edge_to = []
+        self.edge_length = []
+        for i in range(len(table)):
+            u = node(table.s_lat[i], table.s_long[i])
+            v = node(table.d_lat[i], table.d_long[i])
+            self.edge_from.append(u)
+            self.edge_to.append(v)
+            self.edge_length.append(haversine_m(table.s_lat[i], table.s_long[i], table.d_lat[i], table.d_long[i]))
+
+        self.node_lat = np.array(node_lat, dtype=np.float64)
+        self.node_lng = np.array(node_lng, dtype=np.float64)
+        self.adjacency = [[] for _ in node_lat]
+        for edge, u in enumerate(self.edge_from):
+            self.adjacency[u].append(edge)
+
+        self.link_ids = [table.link_id(i) for i in range(len(table))]
+        self.max_speed_ms = max(list(SPEED_KMH.values()) + [DEFAULT_SPEED_KMH]) / 3.6
+        self.weights_version = None
+        self.edge_seconds = None
+        self.routes = OrderedDict()
+        self.lock = threading.Lock()
+
+    def _weights(self, version):
+        """Edge travel times for a congestion version, recomputed once per version."""
+        with self.lock:
+            if version == self.weights_version:
+                return self.edge_seconds
+        # 계산은 잠금 밖에서 하고, 교체만 잠금 안에서 함 (리스트는 교체만 되고 수정되지 않음)
+        grades = get_congestion_cache().cached_grades(self.link_ids)
+        speeds = np.array(
+            [SPEED_KMH.get(grades.get(link_id), DEFAULT_SPEED_KMH) for link_id in self.link_ids],
+            dtype=np.float64,
+        ) / 3.6
+        edge_seconds = (np.array(self.edge_length, dtype=np.float64) / speeds).tolist()
+        with self.lock:
+            self.edge_seconds = edge_seconds
+            self.weights_version = version
+        return edge_seconds
+
+    def snap(self, lat, lng):
+        """Nearest graph node to a coordinate, or None if it is too far from any road."""
+        if not len(self.node_lat):
+            return None
+        # 가까운 후보는 평면 근사로 고르고, 거리 판정은 하버사인으로 함
+        scale = math.cos(math.radians(lat))
+        d2 = (self.node_lat - lat) ** 2 + ((self.node_lng - lng) * scale) ** 2
+        node = int(np.argmin(d2))
+        if haversine_m(lat, lng, self.node_lat[node], self.node_lng[node]) > MAX_SNAP_METERS:
+            return None
+        return node
+
+    def _heuristic(self, node, target):
+        distance = haversine_m(self.node_lat[node], self.node_lng[node], self.node_lat[target], self.node_lng[target])
+        return distance / self.max_speed_ms
+
+    def _astar(self, source, target, edge_seconds):
+        best = {source: 0.0}
+        distance = {source: 0.0}
+        queue = [(self._heuristic(source, target), 0.0, source)]
+        closed = set()
+        while queue:
+            _, seconds, node = heapq.heappop(queue)
+            if node == target:
+                return {'eta_seconds': round(seconds), 'distance_m': round(distance[node])}
+            if node in closed:
+                continue
+            closed.add(node)
+            for edge in self.adjacency[node]:
+                nxt = self.edge_to[edge]
+                cost = seconds + edge_seconds[edge]
+                if nxt not in closed and cost < best.get(nxt, math.inf):
+                    best[nxt] = cost
+                    distance[nxt] = distance[node] + self.edge_length[edge]
+                    heapq.heappush(queue, (cost + self._heuristic(nxt, target), cost, nxt))
+        return None
+
+    def route(self, from_lat, from_lng, to_lat, to_lng):
+        """ETA between two coordinates, or None if either end is off the network or unreachable."""
+        source = self.snap(from_lat, from_lng)
+        target = self.snap(to_lat, to_lng)
+        if source is None or target is None:
+            return None
+
+        version = get_congestion_cache().version()
+        key = (source, target, version)
+        with self.lock:
+            if key in self.routes:
+                self.routes.move_to_end(key)
+                return self.routes[key]
+
+        # 탐색은 가중치 스냅샷으로 잠금 없이 수행 (같은 키를 동시에 계산해도 결과는 같음)
+        result = self._astar(source, target, self._weights(version))
+        with self.lock:
+            self.routes[key] = result
+            if len(self.routes) > ROUTE_CACHE_SIZE:
+                self.routes.popitem(last=False)
+        return result
+
+
+_graph = None
+_graph_lock = threading.Lock()
+
+
+def get_road_graph():
+    """Process-wide road graph, rebuilt when the link table reloads."""
+    global _graph
+    table = get_link_table()
+    with _graph_lock:
+        if _graph is None or _graph.table is not table:
+            _graph = RoadGraph(table)
+        return _graph
+
+
+def estimate_eta(from_lat, from_lng, to_lat, to_lng):
+    """Convenience wrapper used by the chat apps. Returns None if no route is available."""
+    try:
+        return get_road_graph().route(float(from_lat), float(from_lng), float(to_lat), float(to_lng))
+    except (FileNotFoundError, TypeError, ValueError):
+        return None
+
+
+def eta_for_trip(data):
+    """ETA from departure_lat/lng to destination_lat/lng in request data, if all four are given."""
+    coords = [data.get(key) for key in ('departure_lat', 'departure_lng', 'destination_lat', 'destination_lng')]
+    if any(value in (None, '') for value in coords):
+        return None
+    return estimate_eta(*coords)
@@ -0,0 +1,96 @@
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# openapigits getRoadLinkTrafficInfo 와 같은 XML 구조
+RESPONSE_XML = (
+    '<?xml version="1.0" encoding="UTF-8"?>'
+    '<response><msgHeader><resultCode>0</resultCode></msgHeader>'
+    '<msgBody><itemList><linkId>{link_id}</linkId><congGrade>{grade}</congGrade></itemList></msgBody>'
+    '</response>'
+)
+LINK_ID_RE = re.compile(r'linkId=(\d+)')
+
+
+class FakeTrafficServer(ThreadingHTTPServer):
+    """
+    Local stand-in for the Gyeonggi traffic API, for load tests.
+
+    Each link keeps a stable grade that changes with probability `churn` per
+    request. `latency` seconds are added to every response and `error_rate`
+    of the requests fail with HTTP 500. GET /stats returns the call count.
+    """
+
+    daemon_threads = True
+    request_queue_size = 256  # 팬아웃 동시 연결을 거부하지 않도록 backlog 확대
+
+    def __init__(self, address, latency=0.05, error_rate=0.0, churn=0.0, seed=None):
+        super().__init__(address, FakeTrafficHandler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.churn = churn
+        self.random = random.Random(seed)
+        self.grades = {}
+        self.calls = 0
+        self.errors = 0
+        self.lock = threading.Lock()
+
+    def next_grade(self, link_id):
+        with self.lock:
+            self.calls += 1
+            if self.random.random() < self.error_rate:
+                self.errors += 1
+                return None
+            if link_id not in self.grades or self.random.random() < self.churn:
+                self.grades[link_id] = self.random.randint(1, 3)
+            return self.grades[link_id]
+
+    def stats(self):
+        with self.lock:
+            return {'calls': self.calls, 'errors': self.errors, 'links': len(self.grades)}
+
+    def reset_stats(self):
+        with self.lock:
+            self.calls = 0
+            self.errors = 0
+
+    def start_in_thread(self):
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+
+class FakeTrafficHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive (실제 API 와 같이 연결 재사용)
+
+    def do_GET(self):
+        if self.path.startswith('/stats'):
+            self.reply(200, 'application/json', json.dumps(self.server.stats()))
+            return
+
+        match = LINK_ID_RE.search(self.path)
+        if not match:
+            self.reply(400, 'text/plain', 'linkId is required')
+            return
+
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        grade = self.server.next_grade(match.group(1))
+        if grade is None:
+            self.reply(500, 'text/plain', 'injected error')
+            return
+        self.reply(200, 'application/xml', RESPONSE_XML.format(link_id=match.group(1), grade=grade))
+
+    def reply(self, status, content_type, body):
+        body = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # 부하 테스트 중 요청 로그 생략
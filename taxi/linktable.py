@@ -0,0 +1,226 @@
+import csv
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# 원본 CSV 와 컴파일된 바이너리 링크 테이블 경로
+LINK_CSV_PATH = getattr(settings, 'TAXI_LINK_CSV_PATH', os.path.join(settings.BASE_DIR, 'taxi_location.csv'))
+LINK_TABLE_PATH = getattr(settings, 'TAXI_LINK_TABLE_PATH', os.path.join(settings.BASE_DIR, 'taxi_location.bin'))
+LINK_CSV_ENCODING = getattr(settings, 'TAXI_LINK_CSV_ENCODING', 'cp949')
+# 파일 변경 (mtime) 확인 주기 (초). 그 사이의 요청은 stat 없이 현재 테이블을 사용
+LINK_TABLE_CHECK_INTERVAL = getattr(settings, 'TAXI_LINK_TABLE_CHECK_INTERVAL', 5.0)
+
+# 파일 구조 (little-endian):
+#   header: magic, version, reserved, count, string_count, blob_size, reserved
+#   int64   link_id[count]
+#   float64 s_lat[count], s_long[count], d_lat[count], d_long[count]
+#   uint32  road_name[count], regin[count]      (문자열 테이블 인덱스)
+#   uint32  string_offsets[string_count + 1]
+#   bytes   string_blob[blob_size]              (UTF-8)
+MAGIC = b'TXLK'
+VERSION = 1
+HEADER = struct.Struct('<4sHHIIII')
+COORD_COLUMNS = ('s_lat', 's_long', 'd_lat', 'd_long')
+
+
+class LinkTableError(Exception):
+    pass
+
+
+def build_link_table(csv_path=LINK_CSV_PATH, table_path=LINK_TABLE_PATH, encoding=LINK_CSV_ENCODING):
+    """Compile taxi_location.csv into the binary link table. Returns the row count."""
+    link_ids = []
+    coords = {column: [] for column in COORD_COLUMNS}
+    road_names = []
+    regins = []
+    strings = {}
+
+    def intern(value):
+        return strings.setdefault(value, len(strings))
+
+    with open(csv_path, newline='', encoding=encoding) as csvfile:
+        reader = csv.DictReader(csvfile)
+        for line_no, row in enumerate(reader, start=2):
+            link_id = (row.get('link_id') or '').strip()
+            if not link_id:
+                continue
+            try:
+                link_ids.append(int(link_id))
+                for column in COORD_COLUMNS:
+                    coords[column].append(float(row[column]))
+            except (TypeError, ValueError):
+                raise LinkTableError(f"{csv_path}:{line_no}: invalid link_id or coordinate")
+            road_names.append(intern((row.get('road_name') or '').strip()))
+            regins.append(intern((row.get('regin') or '').strip()))
+
+    blob = bytearray()
+    offsets = [0]
+    for value in strings:  # dict 는 삽입 순서 = 인덱스 순서
+        blob += value.encode('utf-8')
+        offsets.append(len(blob))
+
+    count = len(link_ids)
+    parts = [
+        HEADER.pack(MAGIC, VERSION, 0, count, len(strings), len(blob), 0),
+        struct.pack(f'<{count}q', *link_ids),
+    ]
+    parts += [struct.pack(f'<{count}d', *coords[column]) for column in COORD_COLUMNS]
+    parts += [
+        struct.pack(f'<{count}I', *road_names),
+        struct.pack(f'<{count}I', *regins),
+        struct.pack(f'<{len(offsets)}I', *offsets),
+        bytes(blob),
+    ]
+
+    # 다른 프로세스가 읽는 중일 수 있으므로 임시 파일에 쓴 뒤 교체
+    directory = os.path.dirname(os.path.abspath(table_path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            for part in parts:
+                f.write(part)
+        os.replace(tmp_path, table_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return count
+
+
+class LinkTable:
+    """Read-only, memory-mapped view over a compiled link table."""
+
+    def __init__(self, path):
+        self.path = path
+        self.mtime = os.stat(path).st_mtime
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        buf = memoryview(self._mmap)
+        magic, version, _, count, string_count, blob_size, _ = HEADER.unpack_from(buf)
+        if magic != MAGIC or version != VERSION:
+            raise LinkTableError(f"{path}: not a version {VERSION} link table")
+
+        self.count = count
+        offset = HEADER.size
+
+        def take(fmt, n, size):
+            nonlocal offset
+            view = buf[offset:offset + n * size].cast(fmt)
+            offset += n * size
+            return view
+
+        self.link_ids = take('q', count, 8)
+        self.s_lat = take('d', count, 8)
+        self.s_long = take('d', count, 8)
+        self.d_lat = take('d', count, 8)
+        self.d_long = take('d', count, 8)
+        self.road_name_index = take('I', count, 4)
+        self.regin_index = take('I', count, 4)
+        string_offsets = take('I', string_count + 1, 4)
+        blob = bytes(buf[offset:offset + blob_size])
+        # 도로명/지역명은 종류가 적으므로 한 번만 디코딩
+        self.strings = [
+            blob[string_offsets[i]:string_offsets[i + 1]].decode('utf-8')
+            for i in range(string_count)
+        ]
+        self._regin_rows = None
+
+    def __len__(self):
+        return self.count
+
+    def link_id(self, i):
+        return str(self.link_ids[i])
+
+    def road_name(self, i):
+        return self.strings[self.road_name_index[i]]
+
+    def regin(self, i):
+        return self.strings[self.regin_index[i]]
+
+    def links_in_regin(self, regin):
+        """Row indices of the links in `regin` (the map is built on first use, once per table)."""
+        if self._regin_rows is None:
+            rows = {}
+            for i, r in enumerate(self.regin_index):
+                rows.setdefault(r, []).append(i)
+            self._regin_rows = {self.strings[r]: indices for r, indices in rows.items()}
+        return self._regin_rows.get(regin, [])
+
+
+_table = None
+_table_lock = threading.Lock()
+_checked_at = None
+_rebuilding = False
+
+
+def use_link_table(csv_path, table_path):
+    """Point the process at another link set (benchmark harness)."""
+    global LINK_CSV_PATH, LINK_TABLE_PATH, _table, _checked_at
+    with _table_lock:
+        LINK_CSV_PATH, LINK_TABLE_PATH, _table, _checked_at = csv_path, table_path, None, None
+
+
+def _rebuild(csv_path, table_path):
+    global _rebuilding, _checked_at
+    try:
+        count = build_link_table(csv_path, table_path)
+        logger.info("Compiled %d road links into %s", count, table_path)
+    except Exception as e:
+        logger.error("Failed to rebuild link table %s: %s", table_path, str(e))
+    finally:
+        with _table_lock:
+            # 다음 요청에서 바로 새 파일을 확인하도록
+            _rebuilding, _checked_at = False, None
+
+
+def get_link_table():
+    """
+    Return the process-wide link table. The files are checked at most once
+    per LINK_TABLE_CHECK_INTERVAL; a newer CSV is recompiled in a background
+    thread while the current table keeps being served, and the table is
+    reloaded once the compiled file's mtime changes.
+    """
+    global _table, _checked_at, _rebuilding
+    table, checked_at = _table, _checked_at
+    if table is not None and checked_at is not None and time.monotonic() - checked_at < LINK_TABLE_CHECK_INTERVAL:
+        return table
+
+    with _table_lock:
+        if _table is not None and _checked_at is not None and time.monotonic() - _checked_at < LINK_TABLE_CHECK_INTERVAL:
+            return _table
+        try:
+            table_mtime = os.stat(LINK_TABLE_PATH).st_mtime
+        except FileNotFoundError:
+            table_mtime = None
+        try:
+            csv_mtime = os.stat(LINK_CSV_PATH).st_mtime
+        except FileNotFoundError:
+            csv_mtime = None
+
+        if csv_mtime is not None and (table_mtime is None or csv_mtime > table_mtime):
+            if table_mtime is None:
+                # 제공할 테이블이 없으면 (최초 실행) 기다려서 빌드
+                count = build_link_table(LINK_CSV_PATH, LINK_TABLE_PATH)
+                logger.info("Compiled %d road links into %s", count, LINK_TABLE_PATH)
+                table_mtime = os.stat(LINK_TABLE_PATH).st_mtime
+            elif not _rebuilding:
+                _rebuilding = True
+                threading.Thread(
+                    target=_rebuild, args=(LINK_CSV_PATH, LINK_TABLE_PATH),
+                    name='link-table-rebuild', daemon=True,
+                ).start()
+        if table_mtime is None:
+            raise FileNotFoundError(LINK_TABLE_PATH)
+
+        if _table is None or _table.mtime != table_mtime:
+            _table = LinkTable(LINK_TABLE_PATH)
+        _checked_at = time.monotonic()
+        return _table
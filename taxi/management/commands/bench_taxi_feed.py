@@ -0,0 +1,117 @@
+import csv
+import os
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+
+from taxi import congestion, linktable, traffic
+from taxi.congestion import reset_congestion_cache
+from taxi.fake_traffic import FakeTrafficServer
+from taxi.views import taxi_location_json
+
+GRID_STEP_DEG = 0.002
+
+
+def write_synthetic_links(path, count):
+    """Grid road network around Anyang: each grid edge becomes an A→B and a B→A link."""
+    side = max(2, int((count / 4) ** 0.5) + 2)
+    rows = []
+    for x in range(side):
+        for y in range(side):
+            for dx, dy in ((1, 0), (0, 1)):
+                if x + dx >= side or y + dy >= side:
+                    continue
+                a = (37.38 + y * GRID_STEP_DEG, 126.90 + x * GRID_STEP_DEG)
+                b = (37.38 + (y + dy) * GRID_STEP_DEG, 126.90 + (x + dx) * GRID_STEP_DEG)
+                rows.append((a, b))
+                rows.append((b, a))
+    with open(path, 'w', newline='', encoding=linktable.LINK_CSV_ENCODING) as f:
+        writer = csv.writer(f)
+        writer.writerow(['regin', 'link_id', 'road_name', 's_lat', 's_long', 'd_lat', 'd_long'])
+        for k, (start, end) in enumerate(rows[:count]):
+            writer.writerow([f'가상시 {k % 20}구', 3000000000 + k, f'가상로{k % 50}', *start, *end])
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark taxi_location_json against the local fake traffic API on synthetic link tables.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='15,1000,10000,100000', help='Comma-separated link counts')
+        parser.add_argument('--requests', type=int, default=20, help='Warm requests per size')
+        parser.add_argument('--concurrency', type=int, default=4, help='Concurrent clients for warm requests')
+        parser.add_argument('--query', default='', help="Extra query string, e.g. 'format=compact'")
+        parser.add_argument('--latency', type=float, default=0.02, help='Fake upstream latency (s)')
+        parser.add_argument('--error-rate', type=float, default=0.0)
+        parser.add_argument('--churn', type=float, default=0.0)
+
+    def handle(self, *args, **options):
+        server = FakeTrafficServer(('127.0.0.1', 0), latency=options['latency'],
+                                   error_rate=options['error_rate'], churn=options['churn'], seed=1)
+        server.start_in_thread()
+        # 끝나면 원래 업스트림 주소와 링크 테이블로 되돌림
+        api_url, link_paths = traffic.TRAFFIC_API_URL, (linktable.LINK_CSV_PATH, linktable.LINK_TABLE_PATH)
+        traffic.TRAFFIC_API_URL = (
+            f'http://127.0.0.1:{server.server_address[1]}/api/rest/getRoadLinkTrafficInfo?linkId={{link_id}}'
+        )
+        # 가상 링크의 이력을 DB 에 남기거나 접속 중인 지도에 알리지 않도록 저장/발행을 끔
+        record_samples, publish_changes = congestion.record_samples, congestion.publish_changes
+        congestion.record_samples = lambda grades, ts=None: None
+        congestion.publish_changes = lambda changed, version: None
+        factory = RequestFactory()
+        query = dict(part.split('=', 1) for part in options['query'].split('&') if '=' in part)
+
+        def call():
+            started = time.perf_counter()
+            response = taxi_location_json(factory.get('/taxi/api/taxi-location-json/', query))
+            return time.perf_counter() - started, len(response.content)
+
+        self.stdout.write(
+            f"{'links':>8} {'build s':>8} {'cold s':>8} {'cold up':>8} {'p50 ms':>8} {'p95 ms':>8} "
+            f"{'req/s':>8} {'warm up':>8} {'bytes':>10}"
+        )
+        try:
+            with tempfile.TemporaryDirectory() as tmp:
+                for size in (int(s) for s in options['sizes'].split(',')):
+                    csv_path = os.path.join(tmp, f'links_{size}.csv')
+                    write_synthetic_links(csv_path, size)
+                    linktable.use_link_table(csv_path, os.path.join(tmp, f'links_{size}.bin'))
+                    started = time.perf_counter()
+                    linktable.get_link_table()
+                    build_seconds = time.perf_counter() - started
+
+                    # 빈 캐시에서 첫 요청
+                    reset_congestion_cache()
+                    traffic.circuit_breaker.record_success()
+                    server.reset_stats()
+                    cold_seconds, _ = call()
+                    cold_calls = server.stats()['calls']
+
+                    # 캐시가 채워진 뒤 동시 요청
+                    server.reset_stats()
+                    started = time.perf_counter()
+                    with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+                        results = list(pool.map(lambda _: call(), range(options['requests'])))
+                    elapsed = time.perf_counter() - started
+                    latencies = [seconds * 1000 for seconds, _ in results]
+
+                    self.stdout.write(
+                        f"{size:>8} {build_seconds:>8.2f} {cold_seconds:>8.2f} {cold_calls:>8} "
+                        f"{statistics.median(latencies):>8.1f} {percentile(latencies, 0.95):>8.1f} "
+                        f"{len(results) / elapsed:>8.1f} {server.stats()['calls']:>8} {results[-1][1]:>10}"
+                    )
+        finally:
+            reset_congestion_cache()
+            congestion.record_samples, congestion.publish_changes = record_samples, publish_changes
+            traffic.TRAFFIC_API_URL = api_url
+            linktable.use_link_table(*link_paths)
+            server.shutdown()
+            server.server_close()
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from taxi.linktable import LINK_CSV_ENCODING, LINK_CSV_PATH, LINK_TABLE_PATH, LinkTableError, build_link_table
+
+
+class Command(BaseCommand):
+    help = 'Compile taxi_location.csv into the memory-mapped binary road-link table.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--csv', default=LINK_CSV_PATH, help='Source CSV path')
+        parser.add_argument('--output', default=LINK_TABLE_PATH, help='Binary link table path')
+        parser.add_argument('--encoding', default=LINK_CSV_ENCODING, help='CSV text encoding')
+
+    def handle(self, *args, **options):
+        try:
+            count = build_link_table(options['csv'], options['output'], options['encoding'])
+        except (OSError, LinkTableError, UnicodeDecodeError) as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(f"Wrote {count} links to {options['output']}"))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from taxi.fake_traffic import FakeTrafficServer
+
+
+class Command(BaseCommand):
+    help = 'Run a local stand-in for the openapigits traffic API (point TAXI_TRAFFIC_API_URL at it).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--latency', type=float, default=0.05, help='Seconds added to every response')
+        parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests answered with HTTP 500')
+        parser.add_argument('--churn', type=float, default=0.0, help='Probability a link changes grade per request')
+        parser.add_argument('--seed', type=int, default=None)
+
+    def handle(self, *args, **options):
+        server = FakeTrafficServer(
+            (options['host'], options['port']),
+            latency=options['latency'],
+            error_rate=options['error_rate'],
+            churn=options['churn'],
+            seed=options['seed'],
+        )
+        self.stdout.write(
+            f"Fake traffic API on http://{options['host']}:{options['port']}"
+            f"/api/rest/getRoadLinkTrafficInfo?linkId={{link_id}}"
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,73 @@
+import csv
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from taxi.linktable import LINK_CSV_ENCODING, LINK_CSV_PATH
+from taxi.models import RoadLink
+
+UPDATE_FIELDS = ['regin', 'road_name', 's_lat', 's_long', 'd_lat', 'd_long']
+
+
+class Command(BaseCommand):
+    help = 'Stream a road-link CSV into the RoadLink table with batched upserts.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv', nargs='?', default=LINK_CSV_PATH, help='Source CSV path')
+        parser.add_argument('--encoding', default=LINK_CSV_ENCODING, help='CSV text encoding (Korean columns are CP949)')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Rows per bulk upsert')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        chunk = []
+        total = 0
+        skipped = 0
+
+        try:
+            with open(options['csv'], newline='', encoding=options['encoding']) as csvfile:
+                # 파일 전체를 메모리에 올리지 않고 chunk 단위로 적재
+                for line_no, row in enumerate(csv.DictReader(csvfile), start=2):
+                    link = self.parse_row(row)
+                    if link is None:
+                        skipped += 1
+                        self.stderr.write(f"Skipping line {line_no}: invalid link_id or coordinate")
+                        continue
+                    chunk.append(link)
+                    if len(chunk) >= options['chunk_size']:
+                        total += self.flush(chunk)
+                        chunk = []
+                        self.stdout.write(f"{total} links loaded...")
+                if chunk:
+                    total += self.flush(chunk)
+        except (OSError, UnicodeDecodeError) as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Loaded {total} links ({skipped} skipped) in {time.monotonic() - started:.1f}s"
+        ))
+
+    def parse_row(self, row):
+        try:
+            return RoadLink(
+                link_id=int(row['link_id']),
+                regin=(row.get('regin') or '').strip(),
+                road_name=(row.get('road_name') or '').strip(),
+                s_lat=float(row['s_lat']),
+                s_long=float(row['s_long']),
+                d_lat=float(row['d_lat']),
+                d_long=float(row['d_long']),
+            )
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    def flush(self, chunk):
+        # link_id 가 이미 있으면 나머지 컬럼만 갱신 (MySQL: ON DUPLICATE KEY UPDATE)
+        with transaction.atomic():
+            RoadLink.objects.bulk_create(
+                chunk,
+                update_conflicts=True,
+                unique_fields=['link_id'],
+                update_fields=UPDATE_FIELDS,
+            )
+        return len(chunk)
@@ -0,0 +1,45 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from taxi.congestion import CACHE_TTL, get_congestion_cache
+from taxi.linktable import get_link_table
+from taxi.regions import refresh_region_summary
+from taxi.timeseries import downsample
+
+
+# 한 번에 갱신하는 링크 수. 요청 마감 시간 없이 조각마다 끝까지 기다림
+REFRESH_CHUNK_SIZE = getattr(settings, 'TAXI_REFRESH_CHUNK_SIZE', 1000)
+
+
+class Command(BaseCommand):
+    help = 'Periodically refresh congGrade for every road link, push changes to connected maps, summarize regions and downsample history.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=CACHE_TTL, help='Seconds between refresh cycles')
+        parser.add_argument('--once', action='store_true', help='Run a single refresh cycle and exit')
+        parser.add_argument('--chunk-size', type=int, default=REFRESH_CHUNK_SIZE, help='Links refreshed per batch')
+
+    def handle(self, *args, **options):
+        cache = get_congestion_cache()
+        while True:
+            started = time.monotonic()
+            table = get_link_table()
+            link_ids = [table.link_id(i) for i in range(len(table))]
+            chunk_size = max(1, options['chunk_size'])
+            stale = 0
+            for start in range(0, len(link_ids), chunk_size):
+                fetched = cache.refresh(link_ids[start:start + chunk_size], deadline=None, record=True)
+                stale += sum(1 for _, is_stale in fetched.values() if is_stale)
+            self.stdout.write(
+                f"Refreshed {len(link_ids)} links ({stale} stale) in {time.monotonic() - started:.2f}s, "
+                f"version {cache.version()}"
+            )
+            refresh_region_summary()
+            created = downsample()
+            if any(created.values()):
+                self.stdout.write(f"Downsampled {created['5m']} 5-minute and {created['1h']} hourly buckets")
+            if options['once']:
+                break
+            time.sleep(max(0.0, options['interval'] - (time.monotonic() - started)))
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.13 on 2026-10-19 03:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CongestionSample',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('link_id', models.BigIntegerField()),
+                ('ts', models.PositiveIntegerField()),
+                ('grade', models.PositiveSmallIntegerField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['link_id', 'ts'], name='taxi_conges_link_id_7c66f2_idx'), models.Index(fields=['ts'], name='taxi_conges_ts_49615e_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='CongestionBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resolution', models.PositiveIntegerField(choices=[(300, '5m'), (3600, '1h')])),
+                ('link_id', models.BigIntegerField()),
+                ('bucket_start', models.PositiveIntegerField()),
+                ('sample_count', models.PositiveIntegerField()),
+                ('grade_sum', models.PositiveIntegerField()),
+                ('grade_max', models.PositiveSmallIntegerField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['resolution', 'bucket_start'], name='taxi_conges_resolut_61f012_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='congestionbucket',
+            constraint=models.UniqueConstraint(fields=('resolution', 'link_id', 'bucket_start'), name='taxi_bucket_unique'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.13 on 2026-10-19 03:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('taxi', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoadLink',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('link_id', models.BigIntegerField(unique=True)),
+                ('regin', models.CharField(db_index=True, max_length=100)),
+                ('road_name', models.CharField(blank=True, max_length=100)),
+                ('s_lat', models.FloatField()),
+                ('s_long', models.FloatField()),
+                ('d_lat', models.FloatField()),
+                ('d_long', models.FloatField()),
+            ],
+        ),
+    ]
@@ -1,3 +1,56 @@
 from django.db import models
 
-# Create your models here.
+# 도로 링크 (taxi_location.csv 를 import_road_links 명령으로 적재)
+class RoadLink(models.Model):
+    link_id = models.BigIntegerField(unique=True)
+    regin = models.CharField(max_length=100, db_index=True)
+    road_name = models.CharField(max_length=100, blank=True)
+    s_lat = models.FloatField()
+    s_long = models.FloatField()
+    d_lat = models.FloatField()
+    d_long = models.FloatField()
+
+    def __str__(self):
+        return f'{self.link_id} ({self.regin} {self.road_name})'
+
+
+# 혼잡도 시계열 (정수형 좁은 테이블, 시각은 epoch 초)
+class CongestionSample(models.Model):
+    """Raw congGrade observed for a link at one refresh."""
+    link_id = models.BigIntegerField()
+    ts = models.PositiveIntegerField()
+    grade = models.PositiveSmallIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['link_id', 'ts']),
+            models.Index(fields=['ts']),
+        ]
+
+    def __str__(self):
+        return f'{self.link_id} @ {self.ts}: {self.grade}'
+
+
+class CongestionBucket(models.Model):
+    """Downsampled congGrade per link over a fixed window (5 minutes or 1 hour)."""
+    FIVE_MINUTES = 300
+    HOUR = 3600
+    RESOLUTION_CHOICES = [(FIVE_MINUTES, '5m'), (HOUR, '1h')]
+
+    resolution = models.PositiveIntegerField(choices=RESOLUTION_CHOICES)
+    link_id = models.BigIntegerField()
+    bucket_start = models.PositiveIntegerField()
+    sample_count = models.PositiveIntegerField()
+    grade_sum = models.PositiveIntegerField()
+    grade_max = models.PositiveSmallIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['resolution', 'link_id', 'bucket_start'], name='taxi_bucket_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['resolution', 'bucket_start']),
+        ]
+
+    def __str__(self):
+        return f'{self.link_id} @ {self.bucket_start} ({self.resolution}s): {self.grade_sum}/{self.sample_count}'
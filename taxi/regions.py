@@ -0,0 +1,65 @@
+import time
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+from .congestion import get_congestion_cache
+from .linktable import get_link_table
+
+# 이 등급 이상이면 정체 링크로 집계
+CONGESTED_GRADE = getattr(settings, 'TAXI_CONGESTED_GRADE', 3)
+REGION_SUMMARY_KEY = 'taxi:region-summary'
+REGION_SUMMARY_TIMEOUT = getattr(settings, 'TAXI_REGION_SUMMARY_TIMEOUT', 600)
+
+
+def compute_region_summary():
+    """
+    Mean grade, worst grade and congested-link count per regin, computed over
+    all links at once from the cached grades (no upstream calls).
+    """
+    table = get_link_table()
+    link_ids = [table.link_id(i) for i in range(len(table))]
+    cached = get_congestion_cache().cached_grades(link_ids)
+    grades = np.array([float(cached.get(link_id, 'nan')) for link_id in link_ids], dtype=np.float64)
+
+    # 지역은 문자열 테이블 인덱스로 그대로 묶음
+    regions = np.frombuffer(table.regin_index, dtype=np.uint32).astype(np.int64)
+    n = len(table.strings)
+    known = ~np.isnan(grades)
+
+    link_counts = np.bincount(regions, minlength=n)
+    graded_counts = np.bincount(regions[known], minlength=n)
+    grade_sums = np.bincount(regions[known], weights=grades[known], minlength=n)
+    congested = np.bincount(regions[known & (grades >= CONGESTED_GRADE)], minlength=n)
+    worst = np.full(n, -1.0)
+    np.maximum.at(worst, regions[known], grades[known])
+
+    summary = []
+    for r in np.flatnonzero(link_counts):
+        graded = int(graded_counts[r])
+        summary.append({
+            'regin': table.strings[r],
+            'links': int(link_counts[r]),
+            'graded': graded,
+            'avg_cong_grade': round(float(grade_sums[r] / graded), 2) if graded else None,
+            'worst_cong_grade': int(worst[r]) if graded else None,
+            'congested': int(congested[r]),
+        })
+    summary.sort(key=lambda region: region['regin'])
+    return {'updated_at': int(time.time()), 'regions': summary}
+
+
+def refresh_region_summary():
+    """Recompute the summary and store it for the endpoint (one cache read per request)."""
+    summary = compute_region_summary()
+    cache.set(REGION_SUMMARY_KEY, summary, REGION_SUMMARY_TIMEOUT)
+    return summary
+
+
+def get_region_summary():
+    summary = cache.get(REGION_SUMMARY_KEY)
+    if summary is None:
+        # 아직 배치가 돌지 않았으면 한 번 계산해서 저장
+        summary = refresh_region_summary()
+    return summary
@@ -0,0 +1,100 @@
+import math
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+
+from .linktable import get_link_table
+
+# 격자 한 칸의 크기 (도 단위, 약 1km)
+GRID_CELL_DEG = getattr(settings, 'TAXI_GRID_CELL_DEG', 0.01)
+# dict 로 받은 bbox 의 키 (문자열 bbox 의 순서와 같음)
+BBOX_KEYS = ('min_lng', 'min_lat', 'max_lng', 'max_lat')
+
+
+class BBoxError(ValueError):
+    pass
+
+
+def parse_bbox(value):
+    """Parse 'min_lng,min_lat,max_lng,max_lat' (west,south,east,north), or a dict with those keys."""
+    try:
+        if isinstance(value, str):
+            parts = value.split(',')
+        elif isinstance(value, dict):
+            parts = [value[key] for key in BBOX_KEYS]
+        else:
+            raise TypeError
+        min_lng, min_lat, max_lng, max_lat = (float(part) for part in parts)
+    except (ValueError, TypeError, KeyError):
+        raise BBoxError("bbox must be 'min_lng,min_lat,max_lng,max_lat'")
+    if not all(math.isfinite(v) for v in (min_lng, min_lat, max_lng, max_lat)):
+        raise BBoxError("bbox values must be finite numbers")
+    if min_lng > max_lng or min_lat > max_lat:
+        raise BBoxError("bbox minimum must not exceed maximum")
+    return min_lng, min_lat, max_lng, max_lat
+
+
+class GridIndex:
+    """
+    Uniform-grid spatial index over road-link segments.
+
+    Each segment is registered in every cell its bounding box touches, so a
+    viewport query only inspects the cells that overlap the viewport.
+    """
+
+    def __init__(self, table, cell_size=GRID_CELL_DEG):
+        self.table = table
+        self.cell_size = cell_size
+        self.cells = defaultdict(list)
+
+        for i in range(len(table)):
+            min_lng, min_lat, max_lng, max_lat = self.segment_bbox(i)
+            for cx in range(self._cell(min_lng), self._cell(max_lng) + 1):
+                for cy in range(self._cell(min_lat), self._cell(max_lat) + 1):
+                    self.cells[(cx, cy)].append(i)
+
+    def _cell(self, value):
+        return math.floor(value / self.cell_size)
+
+    def segment_bbox(self, i):
+        table = self.table
+        s_lat, s_long, d_lat, d_long = table.s_lat[i], table.s_long[i], table.d_lat[i], table.d_long[i]
+        return min(s_long, d_long), min(s_lat, d_lat), max(s_long, d_long), max(s_lat, d_lat)
+
+    def query(self, min_lng, min_lat, max_lng, max_lat):
+        """Return the sorted indices of segments whose bounding box intersects the bbox."""
+        x0, x1 = self._cell(min_lng), self._cell(max_lng)
+        y0, y1 = self._cell(min_lat), self._cell(max_lat)
+        candidates = set()
+        if (x1 - x0 + 1) * (y1 - y0 + 1) > len(self.cells):
+            # 화면이 매우 넓으면 채워진 칸만 훑는 편이 빠름
+            for (cx, cy), indices in self.cells.items():
+                if x0 <= cx <= x1 and y0 <= cy <= y1:
+                    candidates.update(indices)
+        else:
+            for cx in range(x0, x1 + 1):
+                for cy in range(y0, y1 + 1):
+                    candidates.update(self.cells.get((cx, cy), ()))
+
+        matches = []
+        for i in candidates:
+            s_min_lng, s_min_lat, s_max_lng, s_max_lat = self.segment_bbox(i)
+            if s_min_lng <= max_lng and s_max_lng >= min_lng and s_min_lat <= max_lat and s_max_lat >= min_lat:
+                matches.append(i)
+        matches.sort()
+        return matches
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_spatial_index():
+    """Return the grid index for the current link table, rebuilding it when the table reloads."""
+    global _index
+    table = get_link_table()
+    with _index_lock:
+        if _index is None or _index.table is not table:
+            _index = GridIndex(table)
+        return _index
@@ -1,3 +1,178 @@
-from django.test import TestCase
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from django.test import SimpleTestCase
+
+from . import traffic
+from .traffic import CircuitBreaker, fetch_cong_grades, get_inflight
+from .views import COORD_SCALE, compact_links
+
+
+class CircuitBreakerTests(SimpleTestCase):
+
+    def setUp(self):
+        self.breaker = CircuitBreaker(threshold=2, cooldown=30.0)
+
+    def expire_cooldown(self):
+        self.breaker.opened_at -= self.breaker.cooldown
+
+    def test_opens_after_threshold_consecutive_failures(self):
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+        self.assertTrue(self.breaker.allow_request())
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(self.breaker.allow_request())
+
+    def test_success_resets_the_failure_count(self):
+        self.breaker.record_failure()
+        self.breaker.record_success()
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_half_open_lets_one_trial_through(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.expire_cooldown()
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertTrue(self.breaker.allow_request())
+        self.assertFalse(self.breaker.allow_request())
+
+    def test_successful_trial_closes(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.expire_cooldown()
+        self.breaker.allow_request()
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+        self.assertTrue(self.breaker.allow_request())
+
+    def test_failed_trial_reopens(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.expire_cooldown()
+        self.breaker.allow_request()
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(self.breaker.allow_request())
+
+
+class InflightTests(SimpleTestCase):
+    """Concurrent lookups of one link share a single upstream call."""
+
+    def setUp(self):
+        self.release = threading.Event()
+        self.calls = []
+        # 작업자 1개: 첫 조회가 막혀 있는 동안 나머지는 대기열에 남음
+        executor = ThreadPoolExecutor(max_workers=1)
+        self.addCleanup(executor.shutdown, wait=True)
+        self.addCleanup(self.release.set)
+        for patcher in (
+            mock.patch.object(traffic, '_executor', executor),
+            mock.patch.object(traffic, 'fetch_cong_grade', self.fake_fetch),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def fake_fetch(self, link_id, timeout):
+        self.calls.append(link_id)
+        self.release.wait(5)
+        return '2'
+
+    def test_concurrent_requests_share_one_lookup(self):
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(fetch_cong_grades(['L1'], deadline=5)))
+            for _ in range(3)
+        ]
+        for thread in threads:
+            thread.start()
+        while traffic._waiters.get(traffic._inflight.get('L1'), 0) < 3:
+            threading.Event().wait(0.01)
+        self.release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.calls, ['L1'])
+        self.assertEqual(results, [{'L1': ('2', False)}] * 3)
+        self.assertNotIn('L1', traffic._inflight)
+
+    def test_queued_lookup_is_cancelled_when_nobody_waits(self):
+        get_inflight('busy')  # 작업자를 점유
+        queued = get_inflight('L1')
+        self.assertEqual(traffic._stop_waiting([queued]), 1)
+        self.assertTrue(queued.cancelled())
+        self.assertNotIn('L1', traffic._inflight)
+
+    def test_queued_lookup_survives_while_another_request_waits(self):
+        get_inflight('busy')
+        queued = get_inflight('L1')
+        self.assertIs(get_inflight('L1'), queued)
+        self.assertEqual(traffic._stop_waiting([queued]), 0)
+        self.assertFalse(queued.cancelled())
+        self.release.set()
+        self.assertEqual(queued.result(5), '2')
+
+    def test_deadline_marks_slow_links_stale_and_delivers_late_results(self):
+        late = []
+        delivered = threading.Event()
+
+        def on_late(link_id, grade):
+            late.append((link_id, grade))
+            delivered.set()
+
+        results = fetch_cong_grades(['L1'], deadline=0.05, on_late=on_late)
+        self.assertEqual(results, {'L1': (traffic.NOT_AVAILABLE, True)})
+        self.release.set()
+        self.assertTrue(delivered.wait(5))
+        self.assertEqual(late, [('L1', '2')])
+
+
+def link_table(*links):
+    """Stand-in for LinkTable with only the coordinate columns compact_links reads."""
+    return SimpleNamespace(
+        s_lat=[start[0] for start, _ in links],
+        s_long=[start[1] for start, _ in links],
+        d_lat=[end[0] for _, end in links],
+        d_long=[end[1] for _, end in links],
+    )
+
+
+class CompactLinksTests(SimpleTestCase):
+    A = (37.1, 127.1)
+    B = (37.2, 127.2)
+    C = (37.3, 127.3)
+
+    def compact(self, links, grades):
+        link_ids = [f'L{i}' for i in range(len(links))]
+        return compact_links(link_table(*links), range(len(links)), link_ids, dict(zip(link_ids, grades)))
+
+    def test_reverse_links_merge_into_one_segment(self):
+        data = self.compact([(self.A, self.B), (self.B, self.A)], [('1', False), ('3', True)])
+        self.assertEqual(data['a'], ['L0'])
+        self.assertEqual(data['b'], ['L1'])
+        self.assertEqual((data['ga'], data['gb']), ([1], [3]))
+        self.assertEqual(data['st'], [1])
+        self.assertEqual(
+            (data['y1'], data['x1'], data['y2'], data['x2']),
+            ([3710000], [12710000], [3720000], [12720000]),
+        )
+        self.assertEqual(data['scale'], COORD_SCALE)
+
+    def test_one_way_link_has_no_reverse(self):
+        data = self.compact([(self.A, self.B), (self.B, self.C)], [('2', False), ('N/A', True)])
+        self.assertEqual(data['a'], ['L0', 'L1'])
+        self.assertEqual(data['b'], [None, None])
+        self.assertEqual(data['ga'], [2, None])
+        self.assertEqual(data['st'], [0, 1])
+
+    def test_segment_takes_at_most_one_reverse_link(self):
+        # 같은 방향 링크가 중복되면 세 번째 링크는 새 구간이 됨
+        data = self.compact(
+            [(self.A, self.B), (self.B, self.A), (self.B, self.A)],
+            [('1', False), ('2', False), ('3', False)],
+        )
+        self.assertEqual(data['a'], ['L0', 'L2'])
+        self.assertEqual(data['b'], ['L1', None])
@@ -0,0 +1,125 @@
+import logging
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Max, Sum, Count
+
+from .models import CongestionBucket, CongestionSample
+
+logger = logging.getLogger(__name__)
+
+# 보관 기간 (초). 원본은 짧게, 5분 단위는 길게, 1시간 단위는 영구 보관
+RAW_RETENTION = getattr(settings, 'TAXI_HISTORY_RAW_RETENTION', 24 * 3600)
+FIVE_MINUTE_RETENTION = getattr(settings, 'TAXI_HISTORY_5M_RETENTION', 30 * 24 * 3600)
+# 구간이 끝나고 이 시간 (초) 이 지난 뒤에 집계. 늦게 커밋된 원본 (마감 뒤 도착한 조회 결과 등) 이 워터마크 뒤로 빠지지 않도록
+DOWNSAMPLE_GRACE = getattr(settings, 'TAXI_HISTORY_GRACE', 60)
+BATCH_SIZE = 1000
+
+RESOLUTIONS = {
+    'raw': None,
+    '5m': CongestionBucket.FIVE_MINUTES,
+    '1h': CongestionBucket.HOUR,
+}
+
+
+def record_samples(grades, ts=None):
+    """Append one raw sample per link. `grades` maps link_id -> congGrade string."""
+    ts = int(ts if ts is not None else time.time())
+    CongestionSample.objects.bulk_create(
+        [CongestionSample(link_id=int(link_id), ts=ts, grade=int(grade)) for link_id, grade in grades.items()],
+        batch_size=BATCH_SIZE,
+    )
+
+
+def _watermark(resolution):
+    """Start of the first bucket of this resolution that has not been aggregated yet."""
+    last = CongestionBucket.objects.filter(resolution=resolution).aggregate(last=Max('bucket_start'))['last']
+    return last + resolution if last is not None else 0
+
+
+def downsample(now=None):
+    """
+    Roll complete windows up: raw samples -> 5-minute buckets -> hourly buckets,
+    then drop raw samples and 5-minute buckets past their retention. A window
+    is only rolled up DOWNSAMPLE_GRACE seconds after it ends.
+    """
+    now = int(now if now is not None else time.time())
+    settled = now - DOWNSAMPLE_GRACE
+    five = CongestionBucket.FIVE_MINUTES
+    hour = CongestionBucket.HOUR
+    created = {}
+
+    with transaction.atomic():
+        # 원본 -> 5분 단위 (끝난 구간만)
+        start, end = _watermark(five), settled - settled % five
+        rows = (
+            CongestionSample.objects
+            .filter(ts__gte=start, ts__lt=end)
+            .annotate(bucket=F('ts') - F('ts') % five)
+            .values('link_id', 'bucket')
+            .annotate(count=Count('id'), total=Sum('grade'), worst=Max('grade'))
+        )
+        created['5m'] = len(CongestionBucket.objects.bulk_create([
+            CongestionBucket(resolution=five, link_id=row['link_id'], bucket_start=row['bucket'],
+                             sample_count=row['count'], grade_sum=row['total'], grade_max=row['worst'])
+            for row in rows
+        ], batch_size=BATCH_SIZE))
+
+        # 5분 단위 -> 1시간 단위 (끝난 구간만)
+        start, end = _watermark(hour), settled - settled % hour
+        rows = (
+            CongestionBucket.objects
+            .filter(resolution=five, bucket_start__gte=start, bucket_start__lt=end)
+            .annotate(bucket=F('bucket_start') - F('bucket_start') % hour)
+            .values('link_id', 'bucket')
+            .annotate(count=Sum('sample_count'), total=Sum('grade_sum'), worst=Max('grade_max'))
+        )
+        created['1h'] = len(CongestionBucket.objects.bulk_create([
+            CongestionBucket(resolution=hour, link_id=row['link_id'], bucket_start=row['bucket'],
+                             sample_count=row['count'], grade_sum=row['total'], grade_max=row['worst'])
+            for row in rows
+        ], batch_size=BATCH_SIZE))
+
+        # 집계가 끝난 오래된 데이터 삭제
+        raw_cutoff = min(now - RAW_RETENTION, _watermark(five))
+        CongestionSample.objects.filter(ts__lt=raw_cutoff).delete()
+        five_cutoff = min(now - FIVE_MINUTE_RETENTION, _watermark(hour))
+        CongestionBucket.objects.filter(resolution=five, bucket_start__lt=five_cutoff).delete()
+
+    return created
+
+
+def history(link_ids, start, end, resolution='5m'):
+    """
+    Congestion points for the given links between start and end (epoch seconds).
+
+    Several links (a region) are merged per timestamp: average over all
+    samples, worst grade over all links.
+    """
+    step = RESOLUTIONS[resolution]
+    link_ids = [int(link_id) for link_id in link_ids]
+    if step is None:
+        rows = (
+            CongestionSample.objects
+            .filter(link_id__in=link_ids, ts__gte=start, ts__lt=end)
+            .values('ts')
+            .annotate(count=Count('id'), total=Sum('grade'), worst=Max('grade'))
+            .order_by('ts')
+        )
+        return [
+            {'t': row['ts'], 'avg': round(row['total'] / row['count'], 2), 'max': row['worst'], 'count': row['count']}
+            for row in rows
+        ]
+
+    rows = (
+        CongestionBucket.objects
+        .filter(resolution=step, link_id__in=link_ids, bucket_start__gte=start, bucket_start__lt=end)
+        .values('bucket_start')
+        .annotate(count=Sum('sample_count'), total=Sum('grade_sum'), worst=Max('grade_max'))
+        .order_by('bucket_start')
+    )
+    return [
+        {'t': row['bucket_start'], 'avg': round(row['total'] / row['count'], 2), 'max': row['worst'], 'count': row['count']}
+        for row in rows
+    ]
@@ -0,0 +1,241 @@
+import logging
+import threading
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# 경기도 교통정보 API (도로 링크별 소통 정보)
+TRAFFIC_API_URL = getattr(
+    settings, 'TAXI_TRAFFIC_API_URL',
+    'https://openapigits.gg.go.kr/api/rest/getRoadLinkTrafficInfo?serviceKey=???linkId={link_id}'
+)
+
+# 기본값 (settings 에서 덮어쓸 수 있음)
+FANOUT_WORKERS = getattr(settings, 'TAXI_FANOUT_WORKERS', 32)
+LINK_TIMEOUT = getattr(settings, 'TAXI_LINK_TIMEOUT', 3.0)  # 링크 1개당 타임아웃 (초)
+FANOUT_DEADLINE = getattr(settings, 'TAXI_FANOUT_DEADLINE', 5.0)  # 전체 응답 마감 시간 (초)
+BREAKER_THRESHOLD = getattr(settings, 'TAXI_BREAKER_THRESHOLD', 5)  # 연속 실패 허용 횟수
+BREAKER_COOLDOWN = getattr(settings, 'TAXI_BREAKER_COOLDOWN', 30.0)  # 차단 유지 시간 (초)
+
+NOT_AVAILABLE = "N/A"
+
+_session = None
+_executor = None
+
+# 진행 중인 조회 (link_id -> Future), 같은 link_id 동시 요청은 하나의 조회를 공유
+_inflight = {}
+# Future 별로 결과를 기다리는 요청 수 (아무도 기다리지 않는 대기 중 조회는 취소)
+_waiters = {}
+# Future.cancel() 이 같은 스레드에서 _forget_inflight 를 부르므로 RLock
+_inflight_lock = threading.RLock()
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Stops calling the traffic API after repeated failures.
+
+    After `threshold` consecutive failures the breaker opens and every call is
+    refused for `cooldown` seconds. The first call after the cool-down is let
+    through as a trial (half-open); its outcome closes or re-opens the breaker.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, threshold=BREAKER_THRESHOLD, cooldown=BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self.opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self.opened_at < self.cooldown:
+            return self.OPEN
+        return self.HALF_OPEN
+
+    def allow_request(self):
+        with self._lock:
+            state = self._state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial_running or self.failures >= self.threshold:
+                if self.opened_at is None or self._trial_running:
+                    logger.warning("Traffic API circuit opened after %d failures", self.failures)
+                self.opened_at = time.monotonic()
+            self._trial_running = False
+
+
+circuit_breaker = CircuitBreaker()
+
+
+def get_session():
+    """Shared keep-alive session sized to the fan-out pool."""
+    global _session
+    if _session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=FANOUT_WORKERS)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        _session = session
+    return _session
+
+
+def get_executor():
+    """Process-wide bounded worker pool for upstream lookups."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=FANOUT_WORKERS, thread_name_prefix='traffic')
+    return _executor
+
+
+def fetch_cong_grade(link_id, timeout=LINK_TIMEOUT):
+    """Fetch the congGrade of a single road link from the traffic API."""
+    if not circuit_breaker.allow_request():
+        raise CircuitOpenError(link_id)
+
+    api_url = TRAFFIC_API_URL.format(link_id=link_id)
+    try:
+        response = get_session().get(api_url, timeout=timeout)
+        # 5xx / 429 는 업스트림 장애로 간주
+        if response.status_code >= 500 or response.status_code == 429:
+            circuit_breaker.record_failure()
+        else:
+            circuit_breaker.record_success()
+        if response.status_code == 200:
+            # XML 응답을 파싱하여 congGrade 값 추출
+            root = ET.fromstring(response.text)
+            item = root.find(".//msgBody/itemList/congGrade")
+            if item is not None:
+                return item.text
+            return "congGrade not found"
+        return f"Failed to fetch data. Status code: {response.status_code}"
+    except requests.RequestException as e:
+        circuit_breaker.record_failure()
+        return f"Error fetching data: {str(e)}"
+    except ET.ParseError as e:
+        return f"Error parsing data: {str(e)}"
+
+
+def get_inflight(link_id, timeout=LINK_TIMEOUT):
+    """Return the in-flight lookup for link_id, starting one if none is running."""
+    with _inflight_lock:
+        future = _inflight.get(link_id)
+        if future is None:
+            future = get_executor().submit(fetch_cong_grade, link_id, timeout)
+            _inflight[link_id] = future
+            future.add_done_callback(lambda f, link_id=link_id: _forget_inflight(link_id, f))
+        _waiters[future] = _waiters.get(future, 0) + 1
+        return future
+
+
+def _forget_inflight(link_id, future):
+    with _inflight_lock:
+        if _inflight.get(link_id) is future:
+            del _inflight[link_id]
+        _waiters.pop(future, None)
+
+
+def _stop_waiting(futures):
+    """Drop this request's interest in futures; queued lookups nobody else waits for are cancelled."""
+    cancelled = 0
+    with _inflight_lock:
+        for future in futures:
+            remaining = _waiters.get(future, 0) - 1
+            if remaining > 0:
+                _waiters[future] = remaining
+                continue
+            _waiters.pop(future, None)
+            if future.cancel():
+                # 이미 실행 중인 조회는 취소되지 않고 끝까지 진행 (on_late 로 결과 전달)
+                cancelled += 1
+    return cancelled
+
+
+def fetch_cong_grades(link_ids, link_timeout=LINK_TIMEOUT, deadline=FANOUT_DEADLINE, on_late=None):
+    """
+    Fetch congGrade for all link_ids concurrently.
+
+    Returns {link_id: (cong_grade, stale)}. Links that have not answered when
+    the overall deadline passes, or that were refused by the circuit breaker,
+    are returned as (N/A, True). At the deadline, lookups still queued that no
+    other request waits for are cancelled; those already running finish and,
+    if `on_late` is given, are passed to on_late(link_id, cong_grade) so their
+    upstream call is not wasted. deadline=None waits for every link.
+    """
+    link_ids = list(dict.fromkeys(link_ids))  # 중복 link_id 제거 (순서 유지)
+    if not link_ids:
+        return {}
+
+    started = time.monotonic()
+    futures = {get_inflight(link_id, link_timeout): link_id for link_id in link_ids}
+    done, not_done = wait(futures, timeout=deadline)
+
+    results = {}
+    for future in done:
+        if future.cancelled():
+            results[futures[future]] = (NOT_AVAILABLE, True)
+            continue
+        error = future.exception()
+        if isinstance(error, CircuitOpenError):
+            results[futures[future]] = (NOT_AVAILABLE, True)
+        elif error is not None:
+            results[futures[future]] = (f"Error fetching data: {str(error)}", False)
+        else:
+            results[futures[future]] = (future.result(), False)
+    for future in not_done:
+        results[futures[future]] = (NOT_AVAILABLE, True)
+    _stop_waiting(done)
+    cancelled = _stop_waiting(not_done)
+
+    if not_done:
+        if on_late is not None:
+            for future in not_done:
+                future.add_done_callback(lambda f, link_id=futures[future]: _deliver_late(on_late, link_id, f))
+        logger.warning(
+            "Traffic fan-out deadline exceeded: %d/%d links stale after %.2fs (%d queued lookups cancelled)",
+            len(not_done), len(link_ids), time.monotonic() - started, cancelled
+        )
+    return results
+
+
+def _deliver_late(on_late, link_id, future):
+    if future.cancelled() or future.exception() is not None:
+        return
+    try:
+        on_late(link_id, future.result())
+    except Exception:
+        logger.exception("Failed to handle late congGrade for link %s", link_id)
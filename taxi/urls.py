@@ -4,4 +4,9 @@ from . import views
 urlpatterns = [
     path('moving_taxi/', views.moving_taxi_view, name='moving_taxi_view'),
     path('api/taxi-location-json/', views.taxi_location_json, name='taxi_location_json'),  # JSON 데이터 엔드포인트
+    path('api/congestion-stats/', views.taxi_congestion_stats, name='taxi_congestion_stats'),  # 혼잡도 캐시 통계
+    path('api/congestion-history/', views.taxi_congestion_history, name='taxi_congestion_history'),  # 혼잡도 이력
+    path('api/eta/', views.taxi_eta, name='taxi_eta'),  # 예상 소요 시간
+    path('api/road-links/', views.taxi_road_links, name='taxi_road_links'),  # 지역별 도로 링크
+    path('api/region-summary/', views.taxi_region_summary, name='taxi_region_summary'),  # 지역별 혼잡도 요약
 ]
@@ -1,63 +1,251 @@
-import requests
-import xml.etree.ElementTree as ET
-from django.shortcuts import render
-import csv
-import os
+import hashlib
+import time
+import numpy as np
 from django.conf import settings
-from django.http import JsonResponse
+from django.shortcuts import render
+from django.http import HttpResponseNotModified, JsonResponse
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
+from django.views.decorators.gzip import gzip_page
+from .clustering import get_zoom_clusters, parse_zoom, should_cluster
+from .congestion import get_congestion_cache, is_valid_grade
+from .eta import get_road_graph
+from .linktable import get_link_table
+from .models import RoadLink
+from .regions import get_region_summary
+from .spatial import get_spatial_index, parse_bbox
+from .timeseries import RESOLUTIONS, history
+
+# compact 응답의 좌표 양자화 배율 (1e-5도 = 약 1m)
+COORD_SCALE = 100000
+# 피드 응답을 프록시/CDN 이 재검증 없이 재사용할 수 있는 시간 (초)
+FEED_MAX_AGE = getattr(settings, 'TAXI_FEED_MAX_AGE', 30)
 
 # HTML 템플릿을 렌더링하는 뷰
 def moving_taxi_view(request):
     return render(request, 'moving_taxi.html')
 
-def taxi_location_json(request):
-    # CSV 파일 경로 설정
-    csv_file_path = os.path.join(settings.BASE_DIR, 'taxi_location.csv')
-    results = []  # 각 link_id와 위치 정보를 저장할 리스트
+def feed_etag(request, table):
+    # 링크 테이블 + 혼잡도 캐시 버전 + 갱신 주기 번호 + 쿼리 파라미터로 만든 ETag (본문을 만들지 않고 계산 가능)
+    # 갱신 주기 (캐시 TTL) 가 바뀌면 ETag 도 바뀌므로 304 만 받는 클라이언트도 TTL 마다 본문을 다시 받고,
+    # 그 요청이 만료된 링크의 갱신을 시작함
+    cache = get_congestion_cache()
+    key = '|'.join([
+        str(table.mtime),
+        cache.version(),
+        str(int(time.time() // cache.ttl)),
+        '&'.join(sorted(f'{k}={v}' for k, v in request.GET.items())),
+    ])
+    return '"%s"' % hashlib.md5(key.encode()).hexdigest()
+
+def etag_matches(request, etag):
+    # gzip 적용 시 약한 ETag(W/"...") 로 바뀌므로 W/ 를 떼고 비교
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if not if_none_match:
+        return False
+    candidates = {tag[2:] if tag.startswith('W/') else tag for tag in parse_etags(if_none_match)}
+    return etag in candidates or '*' in candidates
 
-    # CSV 파일에서 link_id, s_lat, s_long, d_lat, d_long 값 읽기
+def feed_response(data, etag, stale):
+    response = JsonResponse(data, safe=False)
+    # stale 링크가 섞인 응답은 다음 요청에서 다시 채워야 하므로 ETag 를 붙이지 않음
+    if not stale:
+        response['ETag'] = etag
+        patch_cache_control(response, public=True, max_age=FEED_MAX_AGE)
+    else:
+        patch_cache_control(response, no_cache=True)
+    return response
+
+@gzip_page
+def taxi_location_json(request):
+    # 컴파일된 링크 테이블 (프로세스당 한 번 mmap, 파일 변경 시에만 다시 로드)
     try:
-        with open(csv_file_path, newline='', encoding='ISO-8859-1') as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                link_id = row.get('link_id')
-                s_lat = row.get('s_lat')
-                s_long = row.get('s_long')
-                d_lat = row.get('d_lat')
-                d_long = row.get('d_long')
-
-                if link_id:  # link_id 값이 있는 경우에만 추가
-                    # API 호출 URL 구성
-                    api_url = f'https://openapigits.gg.go.kr/api/rest/getRoadLinkTrafficInfo?serviceKey=???linkId={link_id}'
-                    cong_grade_value = "N/A"  # 기본값 설정
-
-                    try:
-                        # 외부 API 호출
-                        response = requests.get(api_url)
-                        if response.status_code == 200:
-                            # XML 응답을 파싱하여 congGrade 값 추출
-                            root = ET.fromstring(response.text)
-                            item = root.find(".//msgBody/itemList/congGrade")
-                            if item is not None:
-                                cong_grade_value = item.text
-                            else:
-                                cong_grade_value = "congGrade not found"
-                        else:
-                            cong_grade_value = f"Failed to fetch data. Status code: {response.status_code}"
-                    except requests.RequestException as e:
-                        cong_grade_value = f"Error fetching data: {str(e)}"
-
-                    # 각 link_id, 위치 정보, congGrade 값을 results 리스트에 추가
-                    results.append({
-                        'link_id': link_id,
-                        's_lat': s_lat,
-                        's_long': s_long,
-                        'd_lat': d_lat,
-                        'd_long': d_long,
-                        'cong_grade': cong_grade_value
-                    })
+        table = get_link_table()
     except FileNotFoundError:
         return JsonResponse({'error': "CSV file not found."}, status=404)
 
+    # bbox=min_lng,min_lat,max_lng,max_lat 가 있으면 화면 안의 링크만 반환
+    bbox = request.GET.get('bbox')
+    zoom = request.GET.get('zoom')
+    try:
+        bbox = parse_bbox(bbox) if bbox else None
+        level = parse_zoom(zoom) if zoom else None
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    # 혼잡도 스냅샷이 바뀌지 않았으면 본문 없이 304
+    etag = feed_etag(request, table)
+    if etag_matches(request, etag):
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        return response
+
+    # 축소된 화면에서는 개별 링크 대신 클러스터 반환
+    if should_cluster(level):
+        data = {'zoom': level, 'clusters': cluster_congestion(table, level, bbox)}
+        return feed_response(data, feed_etag(request, table), stale=False)
+
+    indices = get_spatial_index().query(*bbox) if bbox else range(len(table))
+
+    link_ids = [table.link_id(i) for i in indices]
+
+    # 캐시된 congGrade 사용, 캐시 미스만 외부 API 동시 조회 (만료/마감 초과 시 stale 표시)
+    cong_grades = get_congestion_cache().get_cong_grades(link_ids)
+
+    # format=compact: 양방향 링크를 한 구간으로 합친 열(column) 배열 응답
+    stale = any(link_stale for _, link_stale in cong_grades.values())
+    if request.GET.get('format') == 'compact':
+        data = compact_links(table, indices, link_ids, cong_grades)
+        return feed_response(data, feed_etag(request, table), stale)
+
+    results = []
+    for i, link_id in zip(indices, link_ids):
+        cong_grade_value, link_stale = cong_grades[link_id]
+        # 각 link_id, 위치 정보, congGrade 값을 results 리스트에 추가
+        results.append({
+            'link_id': link_id,
+            's_lat': repr(table.s_lat[i]),
+            's_long': repr(table.s_long[i]),
+            'd_lat': repr(table.d_lat[i]),
+            'd_long': repr(table.d_long[i]),
+            'cong_grade': cong_grade_value,
+            'stale': link_stale,
+        })
+
     # JSON 형식으로 결과 반환
-    return JsonResponse(results, safe=False)
+    return feed_response(results, feed_etag(request, table), stale)
+
+def compact_links(table, indices, link_ids, cong_grades):
+    """
+    Columnar payload with one entry per undirected segment.
+
+    A→B and B→A links share a segment: `a`/`ga` are the forward link id and
+    grade, `b`/`gb` the reverse ones (null if the reverse link is absent).
+    Coordinates are integers in units of 1/scale degree.
+    """
+    columns = {key: [] for key in ('a', 'b', 'y1', 'x1', 'y2', 'x2', 'ga', 'gb', 'st')}
+    segments = {}  # (start, end) -> 구간 번호
+
+    for i, link_id in zip(indices, link_ids):
+        start = (round(table.s_lat[i] * COORD_SCALE), round(table.s_long[i] * COORD_SCALE))
+        end = (round(table.d_lat[i] * COORD_SCALE), round(table.d_long[i] * COORD_SCALE))
+        grade, stale = cong_grades[link_id]
+        grade = int(grade) if is_valid_grade(grade) else None
+
+        k = segments.pop((end, start), None)
+        if k is not None and columns['b'][k] is None:
+            # 이미 나온 반대 방향 구간에 합침
+            columns['b'][k] = link_id
+            columns['gb'][k] = grade
+            columns['st'][k] = int(columns['st'][k] or stale)
+            continue
+
+        segments[(start, end)] = len(columns['a'])
+        columns['a'].append(link_id)
+        columns['b'].append(None)
+        columns['y1'].append(start[0])
+        columns['x1'].append(start[1])
+        columns['y2'].append(end[0])
+        columns['x2'].append(end[1])
+        columns['ga'].append(grade)
+        columns['gb'].append(None)
+        columns['st'].append(int(stale))
+
+    return {'scale': COORD_SCALE, **columns}
+
+def cluster_congestion(table, level, bbox):
+    # 캐시된 congGrade 만 사용 (클러스터 요약을 위해 업스트림을 호출하지 않음)
+    clusters = get_zoom_clusters(level)
+    selected = clusters.select(bbox)
+    indices = np.flatnonzero(selected[clusters.membership])
+    link_ids = [table.link_id(i) for i in indices]
+    cached = get_congestion_cache().cached_grades(link_ids)
+
+    grades = np.full(len(table), np.nan)
+    for i, link_id in zip(indices, link_ids):
+        grade = cached.get(link_id)
+        if grade is not None:
+            grades[i] = float(grade)
+    return clusters.aggregate(selected, grades)
+
+def taxi_congestion_stats(request):
+    # congGrade 캐시 적중/미스/경과 시간 통계
+    return JsonResponse(get_congestion_cache().stats())
+
+def taxi_congestion_history(request):
+    # 링크(link_id) 또는 지역(regin) 의 혼잡도 이력 (start/end 는 epoch 초, 기본 최근 24시간)
+    link_id = request.GET.get('link_id')
+    regin = request.GET.get('regin')
+    resolution = request.GET.get('resolution', '5m')
+    if bool(link_id) == bool(regin):
+        return JsonResponse({'error': "Exactly one of 'link_id' or 'regin' is required."}, status=400)
+    if resolution not in RESOLUTIONS:
+        return JsonResponse({'error': f"resolution must be one of {', '.join(RESOLUTIONS)}"}, status=400)
+    try:
+        end = int(request.GET.get('end', time.time()))
+        start = int(request.GET.get('start', end - 24 * 3600))
+    except ValueError:
+        return JsonResponse({'error': "start and end must be epoch seconds."}, status=400)
+
+    if link_id:
+        if not link_id.isdigit():
+            return JsonResponse({'error': "link_id must be numeric."}, status=400)
+        link_ids = [link_id]
+    else:
+        try:
+            table = get_link_table()
+        except FileNotFoundError:
+            return JsonResponse({'error': "CSV file not found."}, status=404)
+        link_ids = [table.link_id(i) for i in table.links_in_regin(regin)]
+        if not link_ids:
+            return JsonResponse({'error': "Region not found."}, status=404)
+
+    return JsonResponse({
+        'link_id': link_id,
+        'regin': regin,
+        'resolution': resolution,
+        'start': start,
+        'end': end,
+        'points': history(link_ids, start, end, resolution),
+    }, json_dumps_params={'ensure_ascii': False})
+
+def parse_point(value):
+    lat, lng = (float(part) for part in value.split(','))
+    return lat, lng
+
+def taxi_eta(request):
+    # 출발지 -> 도착지 예상 소요 시간 (from=lat,lng&to=lat,lng)
+    try:
+        from_lat, from_lng = parse_point(request.GET['from'])
+        to_lat, to_lng = parse_point(request.GET['to'])
+    except (KeyError, ValueError):
+        return JsonResponse({'error': "'from' and 'to' must be 'lat,lng'."}, status=400)
+    try:
+        result = get_road_graph().route(from_lat, from_lng, to_lat, to_lng)
+    except FileNotFoundError:
+        return JsonResponse({'error': "CSV file not found."}, status=404)
+    if result is None:
+        return JsonResponse({'error': "No route found."}, status=404)
+    return JsonResponse(result)
+
+def taxi_road_links(request):
+    # 지역(regin) 별 도로 링크 조회 (RoadLink 테이블의 regin 인덱스 사용)
+    regin = request.GET.get('regin')
+    if not regin:
+        return JsonResponse({'error': "'regin' is required."}, status=400)
+    links = list(
+        RoadLink.objects.filter(regin=regin)
+        .order_by('link_id')
+        .values('link_id', 'road_name', 's_lat', 's_long', 'd_lat', 'd_long')
+    )
+    for link in links:
+        link['link_id'] = str(link['link_id'])
+    return JsonResponse({'regin': regin, 'links': links}, json_dumps_params={'ensure_ascii': False})
+
+def taxi_region_summary(request):
+    # 지역별 혼잡도 요약 (배치에서 계산해 둔 값을 한 번에 반환)
+    try:
+        summary = get_region_summary()
+    except FileNotFoundError:
+        return JsonResponse({'error': "CSV file not found."}, status=404)
+    return JsonResponse(summary, json_dumps_params={'ensure_ascii': False})
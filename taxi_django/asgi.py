@@ -12,6 +12,7 @@ application = get_asgi_application()
 # Now import routing modules
 import quick_chat.routing
 import chat.routing
+import taxi.routing
 
 from channels.routing import ProtocolTypeRouter, URLRouter
 from channels.auth import AuthMiddlewareStack
@@ -22,7 +23,7 @@ application = ProtocolTypeRouter({
     "websocket": AllowedHostsOriginValidator(
         AuthMiddlewareStack(
             URLRouter(
-                chat.routing.websocket_urlpatterns + quick_chat.routing.websocket_urlpatterns
+                chat.routing.websocket_urlpatterns + quick_chat.routing.websocket_urlpatterns + taxi.routing.websocket_urlpatterns
             )
         )
     ),
@@ -4,13 +4,14 @@ from channels.security.websocket import AllowedHostsOriginValidator
 from django.core.asgi import get_asgi_application
 import chat.routing
 import quick_chat.routing  
+import taxi.routing
 
 application = ProtocolTypeRouter({
     "http": get_asgi_application(),
     "websocket": AllowedHostsOriginValidator(
         AuthMiddlewareStack(
             URLRouter(
-                chat.routing.websocket_urlpatterns + quick_chat.routing.websocket_urlpatterns
+                chat.routing.websocket_urlpatterns + quick_chat.routing.websocket_urlpatterns + taxi.routing.websocket_urlpatterns
             )
         )
     ),
@@ -122,3 +122,92 @@ CHANNEL_LAYERS = {
         },
     },
 }
+
+# Chat room lobby (keyset-paginated get_chat_rooms)
+CHAT_ROOM_PAGE_SIZE = 50
+CHAT_ROOM_MAX_PAGE_SIZE = 200
+CHAT_MESSAGE_PAGE_SIZE = 50
+CHAT_MESSAGE_MAX_PAGE_SIZE = 200
+# Write-behind chat messages: ChatConsumer appends to a Redis stream and
+# `manage.py flush_chat_messages` bulk-inserts them. Only enable with the
+# flusher running (and Redis AOF persistence for crash safety). Needs Redis 5.0+
+# (streams); the flusher checks the server version at startup.
+CHAT_MESSAGE_WRITE_BEHIND = False
+CHAT_MESSAGE_REDIS_URL = 'redis://127.0.0.1:6379/0'
+CHAT_MESSAGE_FLUSH_BATCH = 500
+CHAT_MESSAGE_FLUSH_INTERVAL_MS = 200
+CHAT_MESSAGE_CLAIM_IDLE_MS = 60000
+# Tag-invalidated response cache for the room list/detail endpoints (stored in CACHES)
+CHAT_RESPONSE_CACHE_TIMEOUT = 300
+# Live room state (participants, leader, recruitment/settlement flags) as one
+# Redis hash per room; ChatRoom is updated after each change
+CHAT_ROOM_STATE_TTL = 86400
+# Shared per-process Redis pools (one per URL) for the chat/quick_chat consumers,
+# views, the message flusher and the redis congestion cache
+# (usage at /chat/redis_pool_stats/)
+CHAT_REDIS_URL = 'redis://127.0.0.1:6379/0'
+CHAT_REDIS_MAX_CONNECTIONS = 64
+CHAT_REDIS_POOL_TIMEOUT = 5.0
+CHAT_REDIS_HEALTH_CHECK_INTERVAL = 30
+# Per-connection presence in chat/quickquick rooms: consumers refresh their entry
+# every HEARTBEAT_INTERVAL seconds; entries older than TTL (crashed workers) are
+# removed and announced as leaves by `manage.py sweep_chat_presence`
+CHAT_PRESENCE_TTL = 60
+CHAT_PRESENCE_HEARTBEAT_INTERVAL = 20
+CHAT_PRESENCE_SWEEP_INTERVAL = 10
+
+# User profile cache (process LRU in front of CACHES) for chat/quick_chat lookups
+SIGNUP_PROFILE_LRU_SIZE = 2048
+SIGNUP_PROFILE_LRU_TTL = 30
+SIGNUP_PROFILE_CACHE_TIMEOUT = 3600
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": "redis://127.0.0.1:6379/1",
+    },
+}
+
+# Taxi congestion feed (openapigits fan-out)
+# For load tests point this at `manage.py fake_traffic_server`,
+# e.g. 'http://127.0.0.1:8765/api/rest/getRoadLinkTrafficInfo?linkId={link_id}'
+TAXI_TRAFFIC_API_URL = 'https://openapigits.gg.go.kr/api/rest/getRoadLinkTrafficInfo?serviceKey=???linkId={link_id}'
+TAXI_FANOUT_WORKERS = 32
+TAXI_LINK_TIMEOUT = 3.0
+TAXI_FANOUT_DEADLINE = 5.0
+
+# Congestion cache ('memory' per process, or 'redis' shared between workers)
+TAXI_CONGESTION_CACHE = 'memory'
+TAXI_CONGESTION_REDIS_URL = 'redis://127.0.0.1:6379/0'
+TAXI_CONGESTION_TTL = 120
+TAXI_CONGESTION_MAX_STALE = 900
+TAXI_REFRESH_CHUNK_SIZE = 1000
+TAXI_BREAKER_THRESHOLD = 5
+TAXI_BREAKER_COOLDOWN = 30.0
+
+# Road-link table (CSV source, compiled binary built by `manage.py build_link_table`)
+TAXI_LINK_CSV_PATH = os.path.join(BASE_DIR, 'taxi_location.csv')
+TAXI_LINK_TABLE_PATH = os.path.join(BASE_DIR, 'taxi_location.bin')
+TAXI_LINK_CSV_ENCODING = 'cp949'
+# Seconds between mtime checks of the link files (a newer CSV is recompiled in the background)
+TAXI_LINK_TABLE_CHECK_INTERVAL = 5.0
+TAXI_GRID_CELL_DEG = 0.01
+TAXI_CLUSTER_LEVEL = 5
+TAXI_CLUSTER_BASE_CELL_DEG = 0.0005
+TAXI_FEED_MAX_AGE = 30
+
+# Congestion history retention (seconds); hourly buckets are kept forever
+TAXI_HISTORY_RAW_RETENTION = 24 * 3600
+TAXI_HISTORY_5M_RETENTION = 30 * 24 * 3600
+# Windows are rolled up this many seconds after they end, so late raw samples are included
+TAXI_HISTORY_GRACE = 60
+
+# Road-graph ETA engine
+TAXI_ETA_SPEED_KMH = {'1': 50.0, '2': 25.0, '3': 10.0}
+TAXI_ETA_DEFAULT_SPEED_KMH = 30.0
+TAXI_ETA_MAX_SNAP_METERS = 1000.0
+TAXI_ETA_CACHE_SIZE = 4096
+
+# Region congestion summary (computed by refresh_congestion)
+TAXI_CONGESTED_GRADE = 3
+TAXI_REGION_SUMMARY_TIMEOUT = 600